@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文本分块基准测试
+在几MB到几十MB的合成文本上对比原来的分块方式（逐级 split 重建列表、字符串拼接、逐个标点 rfind）
+与单遍的区间分块器（services/text_chunker.py）的耗时和吞吐量，并检查每个块的偏移与原文一致
+
+合成文本为中英文混合的段落，其中一部分是没有句末标点的超长段落（需要在逗号处强制切分）。
+不需要embedding模型和Qdrant。
+
+用法:
+    python benchmarks/bench_chunker.py --sizes 1,4,16 --chunk-size 1000 --overlap 200
+"""
+
+import sys
+import os
+import argparse
+import random
+import re
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.text_chunker import TextChunker
+from benchmarks.synthetic import random_paragraph
+
+CJK_WORDS = "合同 付款 发票 供应商 采购 订单 交货 验收 质量 保修 维护 服务 条款 设备 参数 型号 规格 安装 调试 报告".split()
+
+
+def make_text(megabytes: float, seed: int = 0) -> str:
+    """生成约 megabytes MB（按字符计）的中英文混合文本"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        kind = rng.random()
+        if kind < 0.4:
+            paragraph = "。".join("".join(rng.choices(CJK_WORDS, k=rng.randint(4, 12))) for _ in range(rng.randint(2, 30))) + "。"
+        elif kind < 0.8:
+            paragraph = ". ".join(random_paragraph(rng, rng.randint(2, 30), rng.randint(6, 14))) + "."
+        else:
+            # 没有句末标点的超长段落，只能在逗号处切分
+            paragraph = "，".join("".join(rng.choices(CJK_WORDS, k=rng.randint(3, 8))) for _ in range(rng.randint(100, 400)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def legacy_chunks(text: str, chunk_size: int) -> list:
+    """原来的分块方式（不支持重叠，不记录偏移），作为对照"""
+    chunks = []
+    paragraphs = [text]
+    for sep in ['\n\n', '\r\n\r\n', '\n\r\n\r']:
+        new_paragraphs = []
+        for para in paragraphs:
+            new_paragraphs.extend(para.split(sep))
+        paragraphs = new_paragraphs
+    for para in paragraphs:
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= chunk_size:
+            chunks.append(para)
+            continue
+        current_chunk = ""
+        for sentence in re.split(r'[。！？\n]|\.\s+|!\s+|\?\s+', para):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if len(current_chunk) + len(sentence) + 1 <= chunk_size:
+                current_chunk = current_chunk + " " + sentence if current_chunk else sentence
+                continue
+            if current_chunk:
+                chunks.append(current_chunk)
+            if len(sentence) > chunk_size:
+                start = 0
+                while start < len(sentence):
+                    end = start + chunk_size
+                    if end >= len(sentence):
+                        chunks.append(sentence[start:])
+                        break
+                    best_split = end
+                    for punct in ['，', ',', '；', ';', '、', '：', ':']:
+                        last_punct = sentence.rfind(punct, start, end)
+                        if last_punct > start:
+                            best_split = last_punct + 1
+                            break
+                    chunks.append(sentence[start:best_split])
+                    start = best_split
+                current_chunk = ""
+            else:
+                current_chunk = sentence
+        if current_chunk:
+            chunks.append(current_chunk)
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本分块基准测试")
+    parser.add_argument("--sizes", default="1,4,16", help="文本大小（MB），逗号分隔")
+    parser.add_argument("--chunk-size", type=int, default=Config.TEXT_CHUNK_SIZE, help="分块大小（字符）")
+    parser.add_argument("--overlap", type=int, default=Config.TEXT_CHUNK_OVERLAP, help="重叠大小（字符）")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"文本分块基准测试: 分块大小 {args.chunk_size}, 重叠 {args.overlap}")
+    print("=" * 60)
+
+    for megabytes in (float(value) for value in args.sizes.split(",")):
+        text = make_text(megabytes)
+        mb = len(text) / 1024 / 1024
+        runs = (
+            ("原分块", lambda: legacy_chunks(text, args.chunk_size)),
+            ("区间分块(无重叠)", lambda: list(TextChunker(args.chunk_size, 0).split(text))),
+            ("区间分块", lambda: list(TextChunker(args.chunk_size, args.overlap).split(text))),
+        )
+        for name, run in runs:
+            elapsed = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                chunks = run()
+                elapsed = min(elapsed, time.perf_counter() - start)
+            average = sum(len(chunk if isinstance(chunk, str) else chunk.text) for chunk in chunks) / len(chunks)
+            print(f"  {mb:>6.1f}MB {name:<16}: {elapsed * 1000:>8.1f}ms ({mb / elapsed:>6.1f} MB/s), {len(chunks)} 块, 平均 {average:.0f} 字符")
+
+        # 偏移检查：每个块都等于原文中对应区间的子串，且不超过分块大小
+        chunks = list(TextChunker(args.chunk_size, args.overlap).split(text))
+        assert all(text[chunk.start:chunk.end] == chunk.text for chunk in chunks), "块偏移与原文不一致"
+        assert all(len(chunk.text) <= args.chunk_size for chunk in chunks), "块超过分块大小"
+        print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+向量生成基准测试
+对比逐块生成向量（每个文本块单独调用一次模型/API）与批量生成向量的吞吐量
+
+不需要Qdrant，只使用 VectorService 的分块和向量生成部分。
+
+用法:
+    python benchmarks/bench_embedding.py --docs 20 --batch-size 32
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.vector_service import VectorService
+from benchmarks.synthetic import random_paragraph
+
+
+def make_documents(count: int, seed: int = 0) -> list:
+    """生成若干篇多段落的合成文档"""
+    rng = random.Random(seed)
+    return [
+        "\n\n".join(" ".join(random_paragraph(rng, 6, 14)) for _ in range(12))
+        for _ in range(count)
+    ]
+
+
+def run_single(service: VectorService, documents: list) -> tuple:
+    """逐块生成向量，返回(耗时, 块数)"""
+    start = time.perf_counter()
+    chunks = 0
+    for document in documents:
+        for chunk in service._split_text(document):
+            service._generate_embedding(chunk)
+            chunks += 1
+    return time.perf_counter() - start, chunks
+
+
+def run_batch(service: VectorService, documents: list, batch_size: int) -> tuple:
+    """按文档批量生成向量，返回(耗时, 块数)"""
+    start = time.perf_counter()
+    chunks = 0
+    for document in documents:
+        document_chunks = service._split_text(document)
+        service.embed_batch(document_chunks, batch_size)
+        chunks += len(document_chunks)
+    return time.perf_counter() - start, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量生成基准测试")
+    parser.add_argument("--docs", type=int, default=20, help="合成文档数")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE, help="批量生成时每批的文本数")
+    args = parser.parse_args()
+
+    service = VectorService()
+    if not service.embed_batch(["warm up"])[0]:
+        print("[ERROR] 无法生成向量：embedding模型和API都不可用")
+        sys.exit(1)
+
+    documents = make_documents(args.docs)
+
+    print("=" * 60)
+    print(f"向量生成基准测试: {args.docs} 篇文档, 模型: {Config.EMBEDDING_MODEL}")
+    print(f"后端: {'本地模型' if service.local_embedder else 'Embeddings API'}, 批大小: {args.batch_size}")
+    print("=" * 60)
+
+    single, chunks = run_single(service, documents)
+    batch, _ = run_batch(service, documents, args.batch_size)
+
+    print(f"  逐块生成: {single:.2f}s ({args.docs / single:.2f} 文档/秒, {chunks / single:.1f} 块/秒)")
+    print(f"  批量生成: {batch:.2f}s ({args.docs / batch:.2f} 文档/秒, {chunks / batch:.1f} 块/秒)")
+    print(f"  加速比:   {single / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+向量生成微批处理基准测试
+对比直接生成向量与经过微批分发线程合并请求时的并发吞吐量和单条查询延迟
+
+不需要Qdrant，只使用 VectorService 的向量生成部分。
+
+用法:
+    python benchmarks/bench_embedding_dispatch.py --threads 8 --queries 40
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.embedding_dispatcher import EmbeddingDispatcher
+from services.vector_service import VectorService
+from benchmarks.synthetic import random_paragraph
+
+
+def single_latency(service: VectorService, queries: list) -> float:
+    """逐条顺序生成查询向量，返回延迟中位数（毫秒）"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service.embed_batch([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def concurrent_throughput(service: VectorService, queries: list, threads: int) -> float:
+    """多个线程同时逐条生成查询向量，返回吞吐量（条/秒）"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda query: service.embed_batch([query]), queries))
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量生成微批处理基准测试")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--queries", type=int, default=40, help="每个线程的查询数")
+    args = parser.parse_args()
+
+    service = VectorService()
+    dispatcher = service.embedding_dispatcher or EmbeddingDispatcher(service._embed_texts)
+    if not service.embed_batch(["warm up"])[0]:
+        print("[ERROR] 无法生成向量：embedding模型和API都不可用")
+        sys.exit(1)
+
+    rng = random.Random(0)
+    queries = random_paragraph(rng, args.threads * args.queries, 6)
+
+    print("=" * 60)
+    print(f"微批处理基准测试: {args.threads} 个线程 x {args.queries} 条查询, 模型: {Config.EMBEDDING_MODEL}")
+    print(f"最大批量: {dispatcher.max_batch}, 最长等待: {dispatcher.max_wait * 1000:.1f}ms")
+    print("=" * 60)
+
+    results = {}
+    for name, mode in (("直接生成", None), ("微批处理", dispatcher)):
+        service.embedding_dispatcher = mode
+        latency = single_latency(service, queries[:args.queries])
+        throughput = concurrent_throughput(service, queries, args.threads)
+        results[name] = (latency, throughput)
+        print(f"  {name}: 单条延迟中位数 {latency:.1f}ms, 并发吞吐量 {throughput:.1f} 条/秒")
+
+    print("-" * 60)
+    print(f"  吞吐量提升: {results['微批处理'][1] / results['直接生成'][1]:.2f}x")
+    print(f"  单条延迟变化: {results['微批处理'][0] - results['直接生成'][0]:+.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
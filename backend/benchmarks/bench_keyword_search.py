@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+关键词搜索基准测试
+测量BM25倒排索引的建索引时间和查询延迟（不需要embedding模型和Qdrant）
+
+语料为随机拼接的中文词语和型号编码，文本块按用户和文件分布；查询分为中文词语和型号编码两类，
+型号编码查询同时检查目标文件是否排在第一位。索引写入临时文件，测试结束后删除。
+
+用法:
+    python benchmarks/bench_keyword_search.py --chunks 100000 --users 20
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.keyword_index import KeywordIndex
+
+WORDS = (
+    "合同 付款 发票 税率 供应商 采购 订单 交货 验收 质量 保修 维护 服务 条款 违约 赔偿 "
+    "设备 参数 型号 规格 电压 功率 温度 压力 安装 调试 培训 文档 说明书 报告 审计 预算"
+).split()
+
+
+def make_corpus(chunks: int, users: int, chunks_per_file: int, seed: int = 0) -> tuple:
+    """生成文本块：返回 ([(文件ID, 用户ID, [(块序号, 文本)])], {型号编码: 文件ID})"""
+    rng = random.Random(seed)
+    files = []
+    codes = {}
+    for pdf_file_id in range(chunks // chunks_per_file):
+        code = f"XK-{pdf_file_id:05d}{rng.choice('ABCDEF')}"
+        codes[code] = pdf_file_id
+        items = []
+        for chunk_index in range(chunks_per_file):
+            words = rng.choices(WORDS, k=60)
+            if chunk_index == 0:
+                words.insert(rng.randrange(len(words)), f"型号 {code}")
+            items.append((chunk_index, "，".join(words)))
+        files.append((pdf_file_id, pdf_file_id % users, items))
+    return files, codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词搜索基准测试")
+    parser.add_argument("--chunks", type=int, default=100000, help="文本块总数")
+    parser.add_argument("--users", type=int, default=20, help="用户数")
+    parser.add_argument("--chunks-per-file", type=int, default=50, help="每个文件的文本块数")
+    parser.add_argument("--queries", type=int, default=500, help="每类查询的次数")
+    parser.add_argument("--limit", type=int, default=10, help="返回的文件数量")
+    args = parser.parse_args()
+
+    files, codes = make_corpus(args.chunks, args.users, args.chunks_per_file)
+
+    print("=" * 60)
+    print(f"关键词搜索基准测试: {len(files) * args.chunks_per_file} 个文本块, {len(files)} 个文件, {args.users} 个用户")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory(prefix="bench_keyword_") as directory:
+        db_path = os.path.join(directory, "keyword_index.sqlite3")
+        start = time.perf_counter()
+        index = KeywordIndex(db_path)
+        for pdf_file_id, user_id, items in files:
+            index.add(pdf_file_id, user_id, f"文件{pdf_file_id}.pdf", items)
+        print(f"  建索引: {time.perf_counter() - start:.1f}s, {index.stats()}")
+
+        start = time.perf_counter()
+        KeywordIndex(db_path).load()
+        print(f"  重启加载: {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(1)
+        word_queries = [(" ".join(rng.sample(WORDS, 2)), None) for _ in range(args.queries)]
+        code_queries = [(code, pdf_file_id) for code, pdf_file_id in rng.sample(sorted(codes.items()), min(args.queries, len(codes)))]
+        for label, queries in (("中文词语", word_queries), ("型号编码", code_queries)):
+            latencies = []
+            top1 = 0
+            for query, expected in queries:
+                user_id = expected % args.users if expected is not None else rng.randrange(args.users)
+                start = time.perf_counter()
+                results = index.search(query, user_id, args.limit)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if expected is not None and results and results[0]["pdf_file_id"] == expected:
+                    top1 += 1
+            latencies.sort()
+            line = f"  {label}: 中位数 {statistics.median(latencies):.3f}ms, P95 {latencies[int(len(latencies) * 0.95)]:.3f}ms"
+            if label == "型号编码":
+                line += f", 目标文件排第一 {top1}/{len(queries)}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+OCR基准测试
+在合成的扫描件上对比固定200 DPI识别、预处理+自适应DPI识别和快速模式的速度与字符准确率
+（通过 PDFParser.iter_pages 识别，与入库任务相同的代码路径）
+
+需要已安装poppler和Tesseract（见 OCR_SETUP.md）。为保证各模式的配置生效，OCR在当前进程中逐页执行。
+
+用法:
+    python benchmarks/bench_ocr.py --pages 6 --scan-dpi 300
+"""
+
+import sys
+import os
+import argparse
+import difflib
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services import ocr_engine
+from services.pdf_parser import PDFParser
+from benchmarks.synthetic import make_scanned_pdf
+
+# 各模式的配置：(名称, 预处理, 自适应DPI, 快速模式)
+MODES = [
+    ("固定200 DPI", False, False, False),
+    ("预处理+自适应DPI", True, True, False),
+    ("快速模式", True, True, True),
+]
+
+
+def accuracy(truth: str, text: str) -> float:
+    """字符准确率（忽略空白差异）"""
+    truth = " ".join(truth.split())
+    text = " ".join(text.split())
+    return difflib.SequenceMatcher(None, truth, text, autojunk=False).ratio()
+
+
+def run(file_path: str, truths: list, preprocess: bool, adaptive: bool, fast: bool) -> tuple:
+    """按指定配置识别一次，返回(耗时, 平均字符准确率)"""
+    Config.OCR_PREPROCESS = preprocess
+    Config.OCR_ADAPTIVE_DPI = adaptive
+    Config.OCR_FAST_MODE = fast
+    start = time.perf_counter()
+    page_texts = [text for _, text, _ in PDFParser.iter_pages(file_path, use_ocr=True)]
+    elapsed = time.perf_counter() - start
+    scores = [
+        accuracy(truth, page_texts[i] if i < len(page_texts) else "")
+        for i, truth in enumerate(truths)
+    ]
+    return elapsed, sum(scores) / len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR基准测试")
+    parser.add_argument("--pages", type=int, default=6, help="合成扫描件的页数")
+    parser.add_argument("--scan-dpi", type=int, default=300, help="模拟扫描分辨率")
+    parser.add_argument("--font-sizes", default="9,12,18", help="各页轮流使用的字号（磅），逗号分隔")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    capabilities = ocr_engine.probe_capabilities()
+    if not capabilities["poppler"] or not capabilities["tesseract"]:
+        print("[ERROR] 未检测到poppler或Tesseract，无法运行OCR基准测试（见 OCR_SETUP.md）")
+        sys.exit(1)
+
+    # 关闭缓存和多进程，保证每种模式都真实识别且配置在当前进程中生效
+    Config.OCR_CACHE_ENABLED = False
+    Config.OCR_WORKERS = 1
+    Config.OCR_DPI = 200
+    font_sizes = tuple(int(size) for size in args.font_sizes.split(","))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "scanned.pdf")
+        truths = make_scanned_pdf(file_path, args.pages, args.scan_dpi, args.seed, font_sizes)
+
+        print("=" * 60)
+        print(f"OCR基准测试: {args.pages} 页, 扫描分辨率 {args.scan_dpi} DPI, 字号 {args.font_sizes}")
+        print(f"Tesseract: {capabilities['version']}（{capabilities['backend']}）, 语言: {capabilities['lang']}")
+        print("=" * 60)
+
+        results = []
+        for name, preprocess, adaptive, fast in MODES:
+            elapsed, score = run(file_path, truths, preprocess, adaptive, fast)
+            results.append((name, elapsed, score))
+            print(f"  {name}: {elapsed:.2f}s ({args.pages / elapsed:.2f} 页/秒), 字符准确率: {score * 100:.1f}%")
+
+        baseline = results[0][1]
+        print("-" * 60)
+        for name, elapsed, _ in results[1:]:
+            print(f"  {name} 相对固定200 DPI: {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ONNX向量模型基准测试
+对比 sentence-transformers（PyTorch）、ONNX Runtime（float32）和 ONNX Runtime（动态int8量化）在CPU上的
+批量吞吐量和单条查询延迟，并检查与PyTorch输出的一致性：
+逐条向量的余弦相似度，以及用各后端向量检索时前10个结果与PyTorch结果的重合率。
+
+模型导出到 EMBEDDING_ONNX_DIR（已导出时直接使用）。需要安装 sentence-transformers、torch、onnx 和 onnxruntime。
+余弦相似度的最小值低于 --min-cosine 时以非零状态退出。
+
+用法:
+    python benchmarks/bench_onnx_embedding.py --texts 512 --batch-size 32
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import Config
+from services.onnx_embedder import OnnxEmbedder, export_model, model_dir
+from benchmarks.synthetic import random_paragraph
+
+CJK_WORDS = "合同 付款 发票 供应商 采购 订单 交货 验收 质量 保修 维护 服务 条款 设备 参数 型号 规格 安装 调试 报告".split()
+
+
+def make_texts(count: int, seed: int = 0) -> list:
+    """生成长短不一的中英文文本块"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if rng.random() < 0.6:
+            texts.append("，".join("".join(rng.choices(CJK_WORDS, k=rng.randint(2, 6))) for _ in range(rng.randint(2, 40))) + "。")
+        else:
+            texts.append(". ".join(random_paragraph(rng, rng.randint(1, 12), rng.randint(6, 14))) + ".")
+    return texts
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def measure(model, texts: list, queries: list, batch_size: int) -> tuple:
+    """返回 (向量, 吞吐量 条/秒, 单条查询延迟中位数 毫秒)"""
+    model.encode(texts[:batch_size], batch_size=batch_size, show_progress_bar=False)  # 预热
+    start = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False))
+    throughput = len(texts) / (time.perf_counter() - start)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode([query], batch_size=1, show_progress_bar=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return vectors, throughput, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX向量模型基准测试")
+    parser.add_argument("--model", default=Config.EMBEDDING_MODEL, help="模型名或本地路径")
+    parser.add_argument("--onnx-dir", default=None, help="ONNX模型目录（默认 EMBEDDING_ONNX_DIR 下的模型子目录）")
+    parser.add_argument("--texts", type=int, default=512, help="文本块数")
+    parser.add_argument("--queries", type=int, default=50, help="单条查询次数（也用于检索重合率）")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE, help="批量生成时每批的文本数")
+    parser.add_argument("--threads", type=int, default=Config.EMBEDDING_ONNX_THREADS, help="ONNX Runtime线程数，0为默认")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="一致性检查：与PyTorch输出的最小余弦相似度")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    directory = args.onnx_dir or model_dir(args.model)
+    start = time.perf_counter()
+    export_model(args.model, directory, quantize=True)
+    export_seconds = time.perf_counter() - start
+
+    texts = make_texts(args.texts)
+    queries = make_texts(args.queries, seed=1)
+    backends = (
+        ("PyTorch", SentenceTransformer(args.model, device="cpu")),
+        ("ONNX float32", OnnxEmbedder(directory, quantized=False, threads=args.threads)),
+        ("ONNX int8", OnnxEmbedder(directory, quantized=True, threads=args.threads)),
+    )
+
+    print("=" * 60)
+    print(f"ONNX向量模型基准测试: {args.model}, {len(texts)} 个文本块, 批大小 {args.batch_size}")
+    print(f"导出/检查ONNX模型: {export_seconds:.1f}s, 目录: {directory}")
+    print("=" * 60)
+
+    reference = None
+    failed = False
+    for name, model in backends:
+        vectors, throughput, latency = measure(model, texts, queries, args.batch_size)
+        vectors = normalize(vectors)
+        query_vectors = normalize(np.asarray(model.encode(queries, batch_size=args.batch_size, show_progress_bar=False)))
+        top = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :10]
+        line = f"  {name:<13}: {throughput:>7.1f} 条/秒, 单条查询 {latency:>6.2f}ms"
+        if reference is None:
+            reference = (vectors, top, throughput)
+        else:
+            cosine = (vectors * reference[0]).sum(axis=1)
+            overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(top, reference[1])])
+            line += f", 加速比 {throughput / reference[2]:.2f}x, 余弦 平均 {cosine.mean():.5f} / 最小 {cosine.min():.5f}, 前10重合率 {overlap:.3f}"
+            failed = failed or cosine.min() < args.min_cosine
+        print(line)
+
+    if failed:
+        print(f"[ERROR] 一致性检查未通过：余弦相似度低于 {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+payload索引基准测试
+在不同集合大小下，对比有无 user_id / pdf_file_id / type payload索引时按用户过滤的向量搜索延迟
+
+需要一个可以写入的Qdrant服务（默认使用 .env 中的 QDRANT_HOST / QDRANT_PORT），
+测试集合名带 bench_payload_index_ 前缀，测试结束后删除。向量为随机向量，不需要embedding模型。
+
+用法:
+    python benchmarks/bench_payload_index.py --sizes 10000,50000,200000 --users 200
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, CollectionStatus
+from config import Config
+from services.vector_service import PAYLOAD_INDEXES
+
+
+def build_collection(client: QdrantClient, name: str, size: int, args, indexed: bool):
+    """创建测试集合并写入 size 个随机向量点（索引在写入前创建，HNSW构建时才会加入过滤链接）"""
+    client.recreate_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE)
+    )
+    if indexed:
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            client.create_payload_index(collection_name=name, field_name=field_name, field_schema=field_schema, wait=True)
+
+    rng = np.random.default_rng(0)
+    for start in range(0, size, 1000):
+        count = min(1000, size - start)
+        vectors = rng.standard_normal((count, args.dim), dtype=np.float32)
+        points = []
+        for offset in range(count):
+            point_index = start + offset
+            pdf_file_id = point_index // 20
+            points.append(PointStruct(
+                id=point_index,
+                vector=vectors[offset].tolist(),
+                payload={
+                    "user_id": pdf_file_id % args.users,
+                    "pdf_file_id": pdf_file_id,
+                    "type": "filename" if point_index % 20 == 0 else "content"
+                }
+            ))
+        client.upsert(collection_name=name, points=points, wait=True)
+
+    # 等待优化器建完HNSW索引
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def measure(client: QdrantClient, name: str, args) -> tuple:
+    """按随机用户过滤搜索，返回(延迟中位数, P95)（毫秒）"""
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    latencies = []
+    for i, query in enumerate(queries):
+        query_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=int(i % args.users)))])
+        start = time.perf_counter()
+        client.search(collection_name=name, query_vector=query.tolist(), query_filter=query_filter, limit=args.limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="payload索引基准测试")
+    parser.add_argument("--host", default=Config.QDRANT_HOST, help="Qdrant地址")
+    parser.add_argument("--port", type=int, default=Config.QDRANT_PORT, help="Qdrant端口")
+    parser.add_argument("--sizes", default="10000,50000,200000", help="集合大小（向量点数），逗号分隔")
+    parser.add_argument("--users", type=int, default=200, help="用户数（每个用户的点数 = 集合大小 / 用户数）")
+    parser.add_argument("--dim", type=int, default=128, help="向量维度")
+    parser.add_argument("--queries", type=int, default=200, help="每种配置的查询数")
+    parser.add_argument("--limit", type=int, default=10, help="每次搜索返回的结果数")
+    args = parser.parse_args()
+
+    client = QdrantClient(host=args.host, port=args.port, timeout=max(Config.QDRANT_TIMEOUT, 120))
+    try:
+        client.get_collections()
+    except Exception as e:
+        print(f"[ERROR] 无法连接Qdrant {args.host}:{args.port}: {str(e)}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"payload索引基准测试: {args.users} 个用户, {args.dim} 维向量, 每种配置 {args.queries} 次过滤搜索")
+    print("=" * 60)
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        results = {}
+        for label, indexed in (("无索引", False), ("有索引", True)):
+            name = f"bench_payload_index_{size}_{'indexed' if indexed else 'plain'}"
+            try:
+                start = time.perf_counter()
+                build_collection(client, name, size, args, indexed)
+                build_time = time.perf_counter() - start
+                results[label] = measure(client, name, args)
+            finally:
+                client.delete_collection(name)
+            print(f"  {size:>8} 点 {label}: 中位数 {results[label][0]:.2f}ms, P95 {results[label][1]:.2f}ms (写入+建索引 {build_time:.1f}s)")
+        print(f"  {size:>8} 点 加速比: {results['无索引'][0] / results['有索引'][0]:.2f}x")
+        print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+PDF文本提取基准测试
+对比流式提取（PDFParser.iter_pages，与入库任务相同的代码路径）在单进程逐页提取与多进程并行提取下的耗时
+
+用法:
+    python benchmarks/bench_pdf_extract.py --pages 400 --workers 4
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.pdf_parser import PDFParser
+from benchmarks.synthetic import make_text_pdf
+
+
+def run(file_path: str, workers: int, threshold: int) -> tuple:
+    """按指定配置提取一次文本，返回(耗时, 文本长度)"""
+    Config.PDF_PARSE_WORKERS = workers
+    Config.PDF_PARALLEL_PAGE_THRESHOLD = threshold
+    start = time.perf_counter()
+    length = sum(len(text) for _, text, _ in PDFParser.iter_pages(file_path))
+    return time.perf_counter() - start, length
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF文本提取基准测试")
+    parser.add_argument("--pages", type=int, default=400, help="合成PDF的页数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行模式的进程数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式重复次数（取最小值）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "synthetic.pdf")
+        make_text_pdf(file_path, args.pages)
+
+        print("=" * 60)
+        print(f"PDF文本提取基准测试: {args.pages} 页, {os.path.getsize(file_path) / 1024:.0f} KB")
+        print(f"CPU核数: {os.cpu_count()}, 并行进程数: {args.workers}")
+        print("=" * 60)
+
+        # 预热进程池，避免把子进程启动时间计入结果
+        run(file_path, args.workers, 1)
+
+        serial = min(run(file_path, 1, args.pages + 1) for _ in range(args.repeat))
+        parallel = min(run(file_path, args.workers, 1) for _ in range(args.repeat))
+
+        if serial[1] != parallel[1]:
+            print(f"[WARN] 两种模式提取的文本长度不一致: {serial[1]} != {parallel[1]}")
+
+        print(f"  逐页提取: {serial[0]:.2f}s ({args.pages / serial[0]:.1f} 页/秒)")
+        print(f"  并行提取: {parallel[0]:.2f}s ({args.pages / parallel[0]:.1f} 页/秒)")
+        print(f"  加速比:   {serial[0] / parallel[0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Qdrant传输方式基准测试
+对比REST（JSON）和gRPC（二进制）两种传输方式下批量写入向量和搜索的吞吐量
+
+需要一个本地Qdrant服务（REST端口6333、gRPC端口6334），
+测试集合名为 bench_qdrant_transport，测试结束后删除。向量为随机向量，不需要embedding模型。
+
+用法:
+    python benchmarks/bench_qdrant_transport.py --host localhost --points 20000 --dim 768
+"""
+
+import sys
+import os
+import argparse
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from config import Config
+from services import qdrant_pool
+
+COLLECTION_NAME = "bench_qdrant_transport"
+
+
+def run_upsert(client, vectors: np.ndarray, batch_size: int) -> float:
+    """分批写入向量点，返回吞吐量（点/秒）"""
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        batch = vectors[offset:offset + batch_size]
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=[
+                PointStruct(
+                    id=offset + i,
+                    vector=vector.tolist(),
+                    payload={"user_id": (offset + i) % 50, "pdf_file_id": (offset + i) // 20, "type": "content"}
+                )
+                for i, vector in enumerate(batch)
+            ],
+            wait=True
+        )
+    return len(vectors) / (time.perf_counter() - start)
+
+
+def run_search(client, queries: np.ndarray) -> float:
+    """按用户过滤逐条搜索，返回吞吐量（次/秒）"""
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        client.search(
+            collection_name=COLLECTION_NAME,
+            query_vector=query.tolist(),
+            query_filter=Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=i % 50))]),
+            limit=10
+        )
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant传输方式基准测试")
+    parser.add_argument("--host", default="localhost", help="Qdrant地址")
+    parser.add_argument("--port", type=int, default=Config.QDRANT_PORT, help="Qdrant REST端口（gRPC端口见 QDRANT_GRPC_PORT）")
+    parser.add_argument("--points", type=int, default=20000, help="写入的向量点数")
+    parser.add_argument("--dim", type=int, default=Config.EMBEDDING_DIMENSION, help="向量维度")
+    parser.add_argument("--batch-size", type=int, default=256, help="每次写入的点数")
+    parser.add_argument("--queries", type=int, default=500, help="搜索次数")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print("=" * 60)
+    print(f"Qdrant传输方式基准测试: {args.points} 个 {args.dim} 维向量, 每批 {args.batch_size} 个, {args.queries} 次搜索")
+    print("=" * 60)
+
+    results = {}
+    for name, prefer_grpc in (("REST", False), ("gRPC", True)):
+        client = qdrant_pool.create_client(prefer_grpc=prefer_grpc, host=args.host, port=args.port)
+        try:
+            client.recreate_collection(
+                collection_name=COLLECTION_NAME,
+                vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE)
+            )
+        except Exception as e:
+            print(f"[ERROR] 无法通过{name}连接Qdrant {args.host}: {str(e)}")
+            sys.exit(1)
+        try:
+            upsert_rate = run_upsert(client, vectors, args.batch_size)
+            search_rate = run_search(client, queries)
+        finally:
+            client.delete_collection(COLLECTION_NAME)
+            client.close()
+        results[name] = (upsert_rate, search_rate)
+        print(f"  {name}: 写入 {upsert_rate:.0f} 点/秒, 搜索 {search_rate:.1f} 次/秒")
+
+    print("-" * 60)
+    print(f"  gRPC写入加速比: {results['gRPC'][0] / results['REST'][0]:.2f}x")
+    print(f"  gRPC搜索加速比: {results['gRPC'][1] / results['REST'][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+向量量化基准测试
+在合成语料上对比不量化、int8标量量化、二值量化（以及原始向量存磁盘）时的召回率、搜索延迟和内存占用
+
+需要一个可以写入的Qdrant服务，测试集合名为 bench_quantization，测试结束后删除。
+合成语料为若干簇的归一化随机向量（接近文本向量的分布），精确的Top-K由NumPy暴力计算。
+内存为估算值：内存中的原始向量 + 量化向量 + HNSW图。
+
+用法:
+    python benchmarks/bench_quantization.py --host localhost --points 50000 --dim 768
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client.models import PointStruct, QuantizationSearchParams, SearchParams, CollectionStatus
+from config import Config
+from services import qdrant_pool
+from services.vector_service import quantization_config, vectors_config
+
+COLLECTION_NAME = "bench_quantization"
+
+# (名称, 量化方式, 原始向量是否存磁盘)
+MODES = (
+    ("不量化", "none", False),
+    ("int8", "scalar", False),
+    ("int8+磁盘", "scalar", True),
+    ("二值+磁盘", "binary", True),
+)
+
+
+def make_corpus(points: int, queries: int, dim: int, clusters: int = 64) -> tuple:
+    """生成成簇分布的归一化向量和查询向量"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, points)] + 0.6 * rng.standard_normal((points, dim), dtype=np.float32)
+    query_vectors = centers[rng.integers(0, clusters, queries)] + 0.6 * rng.standard_normal((queries, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, query_vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """NumPy暴力计算每个查询的精确Top-K（余弦相似度）"""
+    results = []
+    for start in range(0, len(queries), 64):
+        scores = queries[start:start + 64] @ vectors.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        results.extend(set(row.tolist()) for row in top)
+    return results
+
+
+def estimate_memory_mb(points: int, dim: int, mode: str, on_disk: bool) -> float:
+    """估算常驻内存（MB）：原始向量 + 量化向量 + HNSW图（m=16）"""
+    original = 0 if on_disk else points * dim * 4
+    quantized = {"none": 0, "scalar": points * dim, "binary": points * dim / 8}[mode]
+    graph = points * 16 * 2 * 4
+    return (original + quantized + graph) / 1024 / 1024
+
+
+def build(client, mode: str, on_disk: bool, vectors: np.ndarray):
+    """按配置创建集合、写入向量并等待索引完成"""
+    client.recreate_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=vectors_config(on_disk),
+        quantization_config=quantization_config(mode)
+    )
+    for offset in range(0, len(vectors), 500):
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=[PointStruct(id=offset + i, vector=vector.tolist()) for i, vector in enumerate(vectors[offset:offset + 500])],
+            wait=True
+        )
+    while client.get_collection(COLLECTION_NAME).status != CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def measure(client, queries: np.ndarray, truth: list, k: int, params) -> tuple:
+    """返回(平均召回率, 延迟中位数毫秒)"""
+    recalls = []
+    latencies = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = client.search(collection_name=COLLECTION_NAME, query_vector=query.tolist(), limit=k, search_params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & {hit.id for hit in hits}) / k)
+    return statistics.mean(recalls), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量量化基准测试")
+    parser.add_argument("--host", default="localhost", help="Qdrant地址")
+    parser.add_argument("--port", type=int, default=Config.QDRANT_PORT, help="Qdrant端口")
+    parser.add_argument("--points", type=int, default=50000, help="语料向量数")
+    parser.add_argument("--dim", type=int, default=Config.EMBEDDING_DIMENSION, help="向量维度")
+    parser.add_argument("--queries", type=int, default=200, help="查询数")
+    parser.add_argument("--top-k", type=int, default=10, help="召回率计算的K")
+    parser.add_argument("--oversampling", type=float, default=Config.QDRANT_SEARCH_OVERSAMPLING, help="量化搜索的过采样倍数")
+    args = parser.parse_args()
+
+    Config.EMBEDDING_DIMENSION = args.dim
+    client = qdrant_pool.create_client(host=args.host, port=args.port)
+    try:
+        client.get_collections()
+    except Exception as e:
+        print(f"[ERROR] 无法连接Qdrant {args.host}:{args.port}: {str(e)}")
+        sys.exit(1)
+
+    vectors, queries = make_corpus(args.points, args.queries, args.dim)
+    truth = exact_top_k(vectors, queries, args.top_k)
+
+    print("=" * 60)
+    print(f"向量量化基准测试: {args.points} 个 {args.dim} 维向量, {args.queries} 次查询, Recall@{args.top_k}")
+    print("=" * 60)
+    print(f"  {'模式':<12}{'重新打分':<8}{'召回率':>8}{'延迟中位数':>12}{'估算内存':>12}")
+
+    try:
+        for name, mode, on_disk in MODES:
+            build(client, mode, on_disk, vectors)
+            memory = estimate_memory_mb(args.points, args.dim, mode, on_disk)
+            variants = [(None, "-")] if mode == "none" else [
+                (SearchParams(quantization=QuantizationSearchParams(rescore=rescore, oversampling=args.oversampling)), "是" if rescore else "否")
+                for rescore in (True, False)
+            ]
+            for params, rescore_label in variants:
+                recall, latency = measure(client, queries, truth, args.top_k, params)
+                print(f"  {name:<12}{rescore_label:<8}{recall:>8.3f}{latency:>10.2f}ms{memory:>10.1f}MB")
+    finally:
+        client.delete_collection(COLLECTION_NAME)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+嵌入式向量存储基准测试
+在不同集合大小下对比嵌入式存储的暴力计算和HNSW索引（需要hnswlib）的搜索延迟和召回率
+
+不需要Qdrant服务，数据写入临时目录，测试结束后删除。向量为成簇分布的随机向量。
+
+用法:
+    python benchmarks/bench_vector_store.py --sizes 10000,100000 --dim 768
+"""
+
+import sys
+import os
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from config import Config
+from services.vector_store import EmbeddedVectorStore, HNSWLIB_AVAILABLE
+from benchmarks.bench_quantization import make_corpus
+
+COLLECTION_NAME = "bench_vector_store"
+
+
+def build(root: str, vectors: np.ndarray, users: int) -> EmbeddedVectorStore:
+    """在 root 下创建集合并写入向量，返回存储"""
+    store = EmbeddedVectorStore(root)
+    store.create_collection(COLLECTION_NAME, VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    for offset in range(0, len(vectors), 1000):
+        store.upsert(COLLECTION_NAME, [
+            PointStruct(id=offset + i, vector=vector.tolist(), payload={"user_id": (offset + i) % users, "pdf_file_id": (offset + i) // 20})
+            for i, vector in enumerate(vectors[offset:offset + 1000])
+        ])
+    return store
+
+
+def measure(store: EmbeddedVectorStore, vectors: np.ndarray, queries: np.ndarray, k: int, users: int, user_filter: bool) -> tuple:
+    """返回(召回率, 延迟中位数毫秒)；user_filter 为True时按用户0过滤"""
+    query_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=0))]) if user_filter else None
+    candidates = np.arange(len(vectors))
+    if user_filter:
+        candidates = candidates[candidates % users == 0]
+    recalls = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.search(COLLECTION_NAME, query.tolist(), query_filter=query_filter, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scores = vectors[candidates] @ query
+        expected = set(candidates[np.argsort(-scores)[:k]].tolist())
+        recalls.append(len(expected & {hit.id for hit in hits}) / k)
+    return statistics.mean(recalls), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入式向量存储基准测试")
+    parser.add_argument("--sizes", default="10000,100000", help="集合大小（向量点数），逗号分隔")
+    parser.add_argument("--dim", type=int, default=Config.EMBEDDING_DIMENSION, help="向量维度")
+    parser.add_argument("--users", type=int, default=20, help="用户数（按用户过滤时的候选数 = 集合大小 / 用户数）")
+    parser.add_argument("--queries", type=int, default=100, help="查询数")
+    parser.add_argument("--top-k", type=int, default=10, help="召回率计算的K")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"嵌入式向量存储基准测试: {args.dim} 维向量, {args.queries} 次查询, Recall@{args.top_k}")
+    if not HNSWLIB_AVAILABLE:
+        print("[WARN] 未安装hnswlib，只测试暴力计算")
+    print("=" * 60)
+
+    modes = [("暴力计算", None)]
+    if HNSWLIB_AVAILABLE:
+        modes.append(("HNSW", 0))
+    for size in (int(value) for value in args.sizes.split(",")):
+        vectors, queries = make_corpus(size, args.queries, args.dim)
+        for name, threshold in modes:
+            # 阈值设为集合大小+1时不会建立索引，设为0时立即建立并且过滤后也使用索引
+            Config.EMBEDDED_HNSW_THRESHOLD = size + 1 if threshold is None else threshold
+            root = tempfile.mkdtemp(prefix="bench_vector_store_")
+            try:
+                start = time.perf_counter()
+                store = build(root, vectors, args.users)
+                build_time = time.perf_counter() - start
+                for label, user_filter in (("全部", False), ("按用户过滤", True)):
+                    recall, latency = measure(store, vectors, queries, args.top_k, args.users, user_filter)
+                    print(f"  {size:>8} 点 {name:<6} {label:<6}: 召回率 {recall:.3f}, 延迟中位数 {latency:.2f}ms (写入 {build_time:.1f}s)")
+                store.close()
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成数据生成工具
+"""
+
+import random
+from typing import List, Tuple
+
+_WORDS = (
+    "document report policy standard section figure table result analysis method "
+    "system process quality safety device module network storage review summary "
+    "value index vector search page chapter appendix revision control release"
+).split()
+
+
+def random_paragraph(rng: random.Random, lines: int = 40, words_per_line: int = 12) -> List[str]:
+    """生成若干行随机英文文本"""
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(words_per_line))
+        for _ in range(lines)
+    ]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(path: str, num_pages: int, lines_per_page: int = 40, seed: int = 0):
+    """
+    生成带文本层的多页PDF（不依赖第三方PDF写入库）
+
+    Args:
+        path: 输出路径
+        num_pages: 页数
+        lines_per_page: 每页行数
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")  # 占位，页面生成后回填
+    kids = []
+    for page_no in range(num_pages):
+        lines = [f"Page {page_no + 1} part number PN-{page_no:05d}"] + random_paragraph(rng, lines_per_page)
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_scanned_pdf(
+    path: str,
+    num_pages: int,
+    scan_dpi: int = 300,
+    seed: int = 0,
+    font_sizes: Tuple[int, ...] = (9, 12, 18),
+    max_skew: float = 2.0,
+    noise: int = 25
+) -> List[str]:
+    """
+    生成模拟扫描件的PDF（每页是一张带倾斜和噪点的图片，没有文本层）
+
+    Args:
+        path: 输出路径
+        num_pages: 页数
+        scan_dpi: 模拟扫描分辨率
+        seed: 随机种子
+        font_sizes: 各页轮流使用的字号（磅）
+        max_skew: 最大倾斜角度（度）
+        noise: 噪点强度（灰度值）
+
+    Returns:
+        各页的原始文本（用于计算识别准确率）
+    """
+    from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+    rng = random.Random(seed)
+    width, height = int(8.27 * scan_dpi), int(11.69 * scan_dpi)  # A4
+    pages, truths = [], []
+    for page_no in range(num_pages):
+        font_size = font_sizes[page_no % len(font_sizes)]
+        font_px = max(int(font_size * scan_dpi / 72), 8)
+        font = ImageFont.load_default(size=font_px)
+        line_height = int(font_px * 1.5)
+        margin = int(0.8 * scan_dpi)
+        words_per_line = max(int((width - 2 * margin) / (font_px * 4.2)), 1)
+        lines = random_paragraph(rng, (height - 2 * margin) // line_height, words_per_line)
+
+        page = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(page)
+        for i, line in enumerate(lines):
+            draw.text((margin, margin + i * line_height), line, fill=0, font=font)
+
+        page = page.rotate(rng.uniform(-max_skew, max_skew), resample=Image.BICUBIC, fillcolor=255)
+        page = page.filter(ImageFilter.GaussianBlur(radius=scan_dpi / 300))
+        if noise:
+            speckle = Image.effect_noise((width, height), noise)
+            page = Image.blend(page, speckle, 0.15)
+        pages.append(page.convert("RGB"))
+        truths.append("\n".join(lines))
+
+    pages[0].save(path, "PDF", resolution=scan_dpi, save_all=True, append_images=pages[1:])
+    return truths
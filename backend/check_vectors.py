@@ -37,18 +37,14 @@ def check_vectors_status():
     try:
         vector_service = VectorService()
         
-        if not vector_service.qdrant_client:
+        if not vector_service.vector_store:
             print("  [X] Qdrant客户端未初始化")
             return False
         else:
             print("  [OK] Qdrant客户端已初始化")
         
         # 导入LOCAL_EMBEDDING_AVAILABLE
-        try:
-            from sentence_transformers import SentenceTransformer
-            LOCAL_EMBEDDING_AVAILABLE = True
-        except ImportError:
-            LOCAL_EMBEDDING_AVAILABLE = False
+        from services.vector_service import LOCAL_EMBEDDING_AVAILABLE
         
         # 检查模型
         if LOCAL_EMBEDDING_AVAILABLE:
@@ -70,7 +66,7 @@ def check_vectors_status():
     # 2. 检查Qdrant集合
     print("\n[2] 检查Qdrant集合...")
     try:
-        collection_info = vector_service.qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+        collection_info = vector_service.vector_store.get_collection(Config.QDRANT_COLLECTION_NAME)
         points_count = collection_info.points_count
         print(f"  [OK] 集合 '{Config.QDRANT_COLLECTION_NAME}' 存在")
         print(f"  - 向量点数量: {points_count}")
@@ -121,7 +117,7 @@ def check_vectors_status():
     # 4. 检查向量维度匹配
     print("\n[4] 检查向量维度配置...")
     try:
-        collection_info = vector_service.qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+        collection_info = vector_service.vector_store.get_collection(Config.QDRANT_COLLECTION_NAME)
         qdrant_dimension = collection_info.config.params.vectors.size
         config_dimension = Config.EMBEDDING_DIMENSION
         
@@ -141,7 +137,7 @@ def check_vectors_status():
     print("\n[5] 测试向量生成...")
     try:
         test_text = "测试文本"
-        embedding = vector_service._generate_embedding(test_text)
+        embedding = vector_service.embed_batch([test_text])[0]
         if embedding:
             print(f"  [OK] 向量生成成功")
             print(f"  - 测试文本: '{test_text}'")
@@ -164,7 +160,7 @@ def check_vectors_status():
     print("=" * 60)
     
     try:
-        collection_info = vector_service.qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+        collection_info = vector_service.vector_store.get_collection(Config.QDRANT_COLLECTION_NAME)
         points_count = collection_info.points_count
         
         if points_count == 0:
@@ -14,20 +14,70 @@ class Config:
     # 文件存储配置
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1048576))  # 流式保存上传文件的块大小（1MB）
+    
+    # 后台入库任务配置（解析 -> OCR -> 分块 -> 向量化 -> 写入Qdrant）
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))  # 并发处理的任务数
+    INGEST_PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", 1.0))  # 进度写库的最小间隔（秒）
+    INGEST_RESUME_ON_STARTUP = os.getenv("INGEST_RESUME_ON_STARTUP", "true").lower() == "true"  # 启动时恢复未完成的任务
     
     # 服务器配置
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
     
+    # PDF文本提取配置
+    PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", os.cpu_count() or 1))  # 并行提取文本的进程数（1表示不并行）
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", 100))  # 页数达到该值时使用并行提取
+    
     # OCR配置（可选，如果不在PATH中）
     TESSERACT_CMD = os.getenv("TESSERACT_CMD", None)  # Tesseract可执行文件路径，如: C:\Program Files\Tesseract-OCR\tesseract.exe
     POPPLER_PATH = os.getenv("POPPLER_PATH", None)  # Poppler bin目录路径，如: C:\poppler\Library\bin
+    OCR_LANG = os.getenv("OCR_LANG", "chi_sim+eng")  # OCR识别语言（中文简体+英文），缺少的语言包会自动跳过
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))  # 并行OCR识别的进程数（1表示不并行）
+    OCR_WINDOW_PAGES = int(os.getenv("OCR_WINDOW_PAGES", 2 * (os.cpu_count() or 1)))  # 同时渲染/识别的最大页数，决定内存峰值
+    OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", 20))  # 文本层少于该字符数的页面视为扫描页，进行OCR识别
+    OCR_DPI = int(os.getenv("OCR_DPI", 200))  # OCR渲染分辨率（自适应DPI时作为基础DPI）
+
+    # OCR预处理与自适应DPI
+    OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() == "true"  # 识别前灰度化、倾斜校正、二值化
+    OCR_ADAPTIVE_DPI = os.getenv("OCR_ADAPTIVE_DPI", "true").lower() == "true"  # 根据页面尺寸和文字大小选择DPI
+    OCR_MIN_DPI = int(os.getenv("OCR_MIN_DPI", 100))  # 自适应DPI下限
+    OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", 400))  # 自适应DPI上限
+    OCR_TARGET_TEXT_PX = int(os.getenv("OCR_TARGET_TEXT_PX", 36))  # 目标文字行高（像素），Tesseract在该尺寸附近识别效果最好
+    OCR_MAX_LONG_SIDE_PX = int(os.getenv("OCR_MAX_LONG_SIDE_PX", 5000))  # 渲染图片长边的最大像素数（限制大幅面页面的内存）
+    OCR_MAX_SKEW = float(os.getenv("OCR_MAX_SKEW", 5))  # 倾斜校正的最大角度（度）
+    OCR_FAST_MODE = os.getenv("OCR_FAST_MODE", "false").lower() == "true"  # 快速模式：先用低DPI识别，置信度低时再用高DPI重新识别
+    OCR_FAST_DPI = int(os.getenv("OCR_FAST_DPI", 150))  # 快速模式首次渲染的DPI
+    OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", 70))  # 快速模式下低于该平均置信度（0-100）时重新识别
+    
+    # OCR结果缓存（按页面图片哈希缓存识别结果，重复页面不再调用Tesseract）
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "./cache/ocr")
+    OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 256))  # 缓存大小上限（MB），超过后按LRU淘汰
+    
+    # 向量存储：qdrant（Qdrant服务）/ embedded（进程内嵌入式存储，不需要外部服务）/ auto（连不上Qdrant时使用嵌入式存储）
+    VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant").lower()
+    EMBEDDED_STORE_PATH = os.getenv("EMBEDDED_STORE_PATH", "./vector_store")  # 嵌入式存储的数据目录（同一目录只能由一个进程打开）
+    EMBEDDED_HNSW_THRESHOLD = int(os.getenv("EMBEDDED_HNSW_THRESHOLD", 20000))  # 点数达到该值后建立HNSW索引（需要hnswlib），过滤后少于该值时暴力计算
+    EMBEDDED_HNSW_EF = int(os.getenv("EMBEDDED_HNSW_EF", 128))  # HNSW搜索时的候选列表大小，越大召回率越高、越慢
+    EMBEDDED_INDEX_SAVE_SECONDS = int(os.getenv("EMBEDDED_INDEX_SAVE_SECONDS", 60))  # HNSW索引的最短保存间隔（秒），退出时总会保存
     
     # Qdrant向量数据库配置
     QDRANT_HOST = os.getenv("QDRANT_HOST", "118.89.121.9")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
     QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "pdf_summary_vectors")
     QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", 30))  # 超时时间（秒）
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"  # 使用gRPC传输（批量写入向量更快，需开放gRPC端口）
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+    QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", 16))  # REST客户端的HTTP连接池大小
+    # 向量量化与存储：none / scalar（int8，内存约1/4）/ binary（1比特，内存约1/32）
+    QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"  # 量化向量常驻内存
+    QDRANT_ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"  # 原始向量存放在磁盘上（mmap）
+    QDRANT_SEARCH_RESCORE = os.getenv("QDRANT_SEARCH_RESCORE", "true").lower() == "true"  # 用原始向量对候选重新打分
+    QDRANT_SEARCH_OVERSAMPLING = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", 2.0))  # 量化搜索的过采样倍数
+    QDRANT_PAYLOAD_INDEXES = os.getenv("QDRANT_PAYLOAD_INDEXES", "true").lower() == "true"  # 为 user_id / pdf_file_id / type 创建payload索引
+    QDRANT_USER_TENANT_INDEX = os.getenv("QDRANT_USER_TENANT_INDEX", "false").lower() == "true"  # 把 user_id 索引标记为租户键（需要新版客户端/服务端支持）
     
     # 向量配置
     # Embedding模型配置
@@ -37,8 +87,36 @@ class Config:
     # paraphrase-multilingual-MiniLM-L12-v2: 384维
     # OpenAI text-embedding-3-small: 1536维
     EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 768))  # 默认768（text2vec-base-chinese）
-    TEXT_CHUNK_SIZE = int(os.getenv("TEXT_CHUNK_SIZE", 1000))  # 文本分块大小（字符数）
-    TEXT_CHUNK_OVERLAP = int(os.getenv("TEXT_CHUNK_OVERLAP", 200))  # 分块重叠大小（字符数）
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()  # 本地模型推理后端：torch（sentence-transformers）/ onnx（ONNX Runtime，CPU推理更快）
+    EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./models/onnx")  # 导出的ONNX模型目录（按模型名分子目录，没有时首次加载自动导出）
+    EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"  # 使用动态int8量化的ONNX模型
+    EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", 0))  # 单次推理的线程数，0表示由ONNX Runtime决定
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))  # 批量生成向量时每批的文本数（本地模型前向计算/API请求）
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"  # 向量缓存（内存LRU + SQLite）
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 10000))  # 内存中保留的向量数
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))  # 磁盘上保留的最大向量数，超过后删除最早写入的条目
+    EMBEDDING_DISPATCH_ENABLED = os.getenv("EMBEDDING_DISPATCH_ENABLED", "true").lower() == "true"  # 合并并发请求的向量生成（微批处理）
+    EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 64))  # 微批处理一次合并的最大文本数
+    EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 1))  # 微批处理等待其他请求的最长时间（毫秒），使用远程API时可适当调大
+    EMBEDDING_INFERENCE_WORKERS = int(os.getenv("EMBEDDING_INFERENCE_WORKERS", 2))  # 异步接口生成查询向量的线程数（与事件循环隔离）
+    EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"  # 向量服务初始化后在后台加载模型并做一次推理（第一个请求不用等模型加载）
+    TEXT_CHUNK_SIZE = int(os.getenv("TEXT_CHUNK_SIZE", 1000))  # 文本分块大小（单位见 TEXT_CHUNK_UNIT）
+    TEXT_CHUNK_OVERLAP = int(os.getenv("TEXT_CHUNK_OVERLAP", 200))  # 相邻块的重叠大小（单位同上），不超过分块大小的一半
+    TEXT_CHUNK_UNIT = os.getenv("TEXT_CHUNK_UNIT", "char").lower()  # 分块长度单位：char（字符）/ token（本地模型分词器的token数）
+    
+    # 搜索缓存
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"  # 按用户缓存搜索结果，用户文档变化时失效
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300))  # 搜索结果缓存有效期（秒）
+    SEARCH_CACHE_MAX_ITEMS = int(os.getenv("SEARCH_CACHE_MAX_ITEMS", 1000))  # 搜索结果缓存的最大条目数
+    QUERY_EMBEDDING_CACHE_ITEMS = int(os.getenv("QUERY_EMBEDDING_CACHE_ITEMS", 2000))  # 缓存的查询向量数（所有用户共享）
+    COLLECTION_STATS_TTL = float(os.getenv("COLLECTION_STATS_TTL", 60))  # 集合统计（向量点数）缓存有效期（秒）
+    
+    # 关键词搜索（BM25倒排索引）
+    KEYWORD_INDEX_ENABLED = os.getenv("KEYWORD_INDEX_ENABLED", "true").lower() == "true"  # 为文本块建立关键词倒排索引
+    KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", "./cache/keyword_index.sqlite3")  # 关键词索引的SQLite文件路径
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()  # 默认搜索方式：hybrid（向量+关键词融合）/ vector / keyword
+    SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", 60))  # 倒数排名融合的常数
     
     # HuggingFace镜像源配置（解决网络访问问题）
     HF_ENDPOINT = os.getenv("HF_ENDPOINT", "https://hf-mirror.com")  # 例如: https://hf-mirror.com
@@ -15,7 +15,7 @@ if sys.platform == 'win32':
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from qdrant_client import QdrantClient
+from services.vector_store import get_store
 from config import Config
 
 def delete_collection():
@@ -32,11 +32,9 @@ def delete_collection():
     # 连接Qdrant
     print(f"\n[1] 连接Qdrant...")
     try:
-        client = QdrantClient(
-            host=Config.QDRANT_HOST,
-            port=Config.QDRANT_PORT,
-            timeout=Config.QDRANT_TIMEOUT
-        )
+        client = get_store()
+        if client is None:
+            raise RuntimeError("向量存储不可用")
         print("  [OK] 连接成功")
     except Exception as e:
         print(f"  [X] 连接失败: {str(e)}")
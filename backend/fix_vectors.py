@@ -18,10 +18,10 @@ if sys.platform == 'win32':
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from qdrant_client import QdrantClient
+from services.vector_store import get_store, is_qdrant
 from database import get_db
 from models import PDFFile
-from services.vector_service import VectorService
+from services.vector_service import VectorService, collection_storage
 from config import Config
 import logging
 
@@ -41,17 +41,14 @@ def fix_vectors():
     print(f"  - 配置维度: {Config.EMBEDDING_DIMENSION}")
     print(f"  - Qdrant地址: {Config.QDRANT_HOST}:{Config.QDRANT_PORT}")
     print(f"  - 集合名称: {Config.QDRANT_COLLECTION_NAME}")
+    print(f"  - 量化方式: {Config.QDRANT_QUANTIZATION}, 原始向量存磁盘: {Config.QDRANT_ON_DISK_VECTORS}")
     
     # 2. 检查Qdrant集合
     print("\n[2] 检查Qdrant集合...")
-    qdrant_client = QdrantClient(
-        host=Config.QDRANT_HOST,
-        port=Config.QDRANT_PORT,
-        timeout=Config.QDRANT_TIMEOUT
-    )
+    store = get_store()
     
     try:
-        collection_info = qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+        collection_info = store.get_collection(Config.QDRANT_COLLECTION_NAME)
         qdrant_dimension = collection_info.config.params.vectors.size
         points_count = collection_info.points_count
         
@@ -68,7 +65,7 @@ def fix_vectors():
             response = input("\n  是否删除旧集合并重新创建？(y/n): ").strip().lower()
             if response == 'y':
                 print("\n  正在删除旧集合...")
-                qdrant_client.delete_collection(Config.QDRANT_COLLECTION_NAME)
+                store.delete_collection(Config.QDRANT_COLLECTION_NAME)
                 print("  [OK] 旧集合已删除")
             else:
                 print("  已取消操作")
@@ -76,6 +73,17 @@ def fix_vectors():
         else:
             print(f"  [OK] 维度匹配")
             
+            # 量化和存储配置可以原地更新，不需要重新生成向量
+            storage = collection_storage(collection_info)
+            if is_qdrant(store) and storage != (Config.QDRANT_QUANTIZATION, Config.QDRANT_ON_DISK_VECTORS):
+                print(f"  [WARN] 集合的存储配置（量化: {storage[0]}, 原始向量存磁盘: {storage[1]}）与当前配置不一致")
+                response = input("\n  是否按当前配置更新集合的量化和存储设置？(y/n): ").strip().lower()
+                if response == 'y':
+                    if VectorService().update_storage_config():
+                        print("  [OK] 存储配置已更新，Qdrant将在后台重建量化数据")
+                    else:
+                        print("  [X] 存储配置更新失败")
+            
             if points_count == 0:
                 print(f"  [WARN] 集合为空，需要生成向量")
             else:
@@ -85,7 +93,7 @@ def fix_vectors():
                     return False
                 # 删除集合以重新创建
                 print("\n  正在删除旧集合...")
-                qdrant_client.delete_collection(Config.QDRANT_COLLECTION_NAME)
+                store.delete_collection(Config.QDRANT_COLLECTION_NAME)
                 print("  [OK] 旧集合已删除")
                 
     except Exception as e:
@@ -126,16 +134,13 @@ def fix_vectors():
     try:
         vector_service = VectorService()
         
-        if not vector_service.qdrant_client:
+        if not vector_service.vector_store:
             print("  [X] Qdrant客户端未初始化")
             return False
         
         # 确保模型已加载
-        try:
-            from sentence_transformers import SentenceTransformer
-            LOCAL_EMBEDDING_AVAILABLE = True
-        except ImportError:
-            LOCAL_EMBEDDING_AVAILABLE = False
+        # sentence-transformers 或 ONNX后端（EMBEDDING_BACKEND=onnx）可用
+        from services.vector_service import LOCAL_EMBEDDING_AVAILABLE
         
         if LOCAL_EMBEDDING_AVAILABLE:
             vector_service._ensure_model_loaded()
@@ -158,7 +163,7 @@ def fix_vectors():
     print("\n[5] 测试向量生成...")
     try:
         test_text = "测试文本"
-        embedding = vector_service._generate_embedding(test_text)
+        embedding = vector_service.embed_batch([test_text])[0]
         if embedding:
             print(f"  [OK] 向量生成成功")
             print(f"  - 测试文本: '{test_text}'")
@@ -191,14 +196,7 @@ def fix_vectors():
             try:
                 print(f"\n[{i}/{len(files_with_text)}] 处理文件: {pdf_file.original_filename} (ID: {pdf_file.id})")
                 
-                # 删除旧向量（如果存在）
-                try:
-                    vector_service.delete_document(pdf_file.id, pdf_file.user_id)
-                    print("  - 已删除旧向量")
-                except Exception as e:
-                    print(f"  - 删除旧向量失败（可能不存在）: {str(e)}")
-                
-                # 生成新向量
+                # 生成新向量（点ID由文件ID和块序号确定，直接覆盖旧向量，多余的旧块会被清理）
                 if vector_service.add_document(
                     pdf_file_id=pdf_file.id,
                     user_id=pdf_file.user_id,
@@ -227,7 +225,7 @@ def fix_vectors():
         
         # 验证结果
         try:
-            collection_info = qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+            collection_info = store.get_collection(Config.QDRANT_COLLECTION_NAME)
             print(f"\n验证结果:")
             print(f"  - 集合维度: {collection_info.config.params.vectors.size}")
             print(f"  - 向量点数量: {collection_info.points_count}")
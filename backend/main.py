@@ -1,8 +1,11 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 import os
 import uuid
 import shutil
@@ -12,27 +15,51 @@ import logging
 
 from config import Config
 from database import get_db, Base, engine
-from models import PDFFile, Summary, User
+from models import PDFFile, Summary, User, IngestJob
 from services.pdf_parser import PDFParser
 from services.ai_service import AIService
 from services.auth_service import AuthService
+from services.ingest_service import IngestService
+from services.storage_service import StorageService, FileTooLargeError
+from services.artifact_service import ArtifactService
 from schemas.auth import UserRegister, UserLogin, Token, UserInfo
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 确保上传目录存在
-Config.ensure_upload_dir()
-
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    服务启动时执行的初始化
+    
+    这些操作不能放在模块顶层：PDF解析和OCR的进程池以spawn方式启动，`python main.py` 运行时
+    每个工作进程都会以 __mp_main__ 重新导入本模块，顶层的建表、后台初始化和任务恢复会在每个工作进程中再执行一次。
+    """
+    # 确保上传目录存在
+    Config.ensure_upload_dir()
+    
+    # 创建数据库表
+    Base.metadata.create_all(bind=engine)
+    
+    # 在后台线程中初始化向量服务，不阻塞主服务启动
+    threading.Thread(target=init_vector_service, name="vector-service-init", daemon=True).start()
+    logger.info("向量搜索服务将在后台初始化，不影响其他功能")
+    
+    # 在后台探测OCR环境（poppler、Tesseract和语言包），结果在进程内缓存，处理文档时不再重复检查
+    threading.Thread(target=ocr_engine.probe_capabilities, daemon=True).start()
+    
+    # 恢复上次退出时未完成的入库任务
+    if Config.INGEST_RESUME_ON_STARTUP:
+        ingest_service.resume_pending()
+    yield
 
 # 创建FastAPI应用
 app = FastAPI(
     title="PDF总结小程序API",
     description="基于DeepSeek AI的PDF文档总结服务",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -49,12 +76,14 @@ pdf_parser = PDFParser()
 ai_service = AIService()
 auth_service = AuthService()
 
-# 初始化向量服务（延迟初始化，在后台线程中加载，不阻塞服务启动）
+# 初始化向量服务（延迟初始化，服务启动后在后台线程中加载，不阻塞服务启动）
 vector_service = None
 VECTOR_SEARCH_AVAILABLE = False
+import threading
+vector_init_done = threading.Event()  # 向量服务初始化结束（无论成功与否）
 
 def init_vector_service():
-    """延迟初始化向量服务（在后台线程中执行，不阻塞主服务）"""
+    """延迟初始化向量服务（在后台线程中执行，不阻塞主服务），之后按配置预热embedding模型"""
     global vector_service, VECTOR_SEARCH_AVAILABLE
     try:
         from services.vector_service import VectorService
@@ -66,12 +95,26 @@ def init_vector_service():
         logger.warning(f"向量搜索服务初始化失败: {str(e)}，语义搜索功能将不可用")
         vector_service = None
         VECTOR_SEARCH_AVAILABLE = False
+    finally:
+        vector_init_done.set()
+    
+    # 预热期间到达的请求等待同一次模型加载，不会跳过向量生成
+    if vector_service and Config.EMBEDDING_WARMUP:
+        vector_service.warm_up()
 
-# 在后台线程中初始化向量服务，不阻塞主服务启动
-import threading
-vector_init_thread = threading.Thread(target=init_vector_service, daemon=True)
-vector_init_thread.start()
-logger.info("向量搜索服务将在后台初始化，不影响其他功能")
+from services import ocr_engine, ocr_cache
+
+def get_vector_service():
+    """获取当前可用的向量服务（未初始化完成或不可用时返回None）"""
+    return vector_service if VECTOR_SEARCH_AVAILABLE else None
+
+def wait_for_vector_service():
+    """等待向量服务初始化结束后再获取（后台入库使用，服务刚启动时上传的文档不会因此跳过向量生成）"""
+    vector_init_done.wait()
+    return get_vector_service()
+
+# 初始化后台入库服务（解析、OCR和向量化在后台线程池中执行，不阻塞上传请求）
+ingest_service = IngestService(pdf_parser, wait_for_vector_service)
 
 # JWT认证
 security = HTTPBearer(auto_error=False)  # 允许可选认证，用于PDF查看
@@ -92,6 +135,13 @@ def get_current_user(
         )
     return user
 
+def _has_pending_job(db: Session, pdf_file_id: int) -> bool:
+    """文件是否仍有未完成的入库任务"""
+    return db.query(IngestJob).filter(
+        IngestJob.pdf_file_id == pdf_file_id,
+        IngestJob.status.in_(["pending", "running"])
+    ).first() is not None
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -102,6 +152,41 @@ async def health_check():
     """健康检查"""
     return {"status": "ok"}
 
+def _check_database() -> bool:
+    """数据库连接是否可用"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.warning(f"数据库就绪检查失败: {str(e)}")
+        return False
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    就绪检查（/health 只表示进程存活）
+    
+    分别检查embedding模型、向量存储（Qdrant或嵌入式存储）和数据库，全部就绪时返回200，否则返回503。
+    """
+    service = get_vector_service()
+    if service:
+        embedder = service.embedder_status()
+        stats = await service.get_collection_stats_async(use_cache=False)
+        store = {"ready": stats is not None, "points_count": stats["points_count"] if stats else None}
+    else:
+        status_name = "initializing" if not vector_init_done.is_set() else "unavailable"
+        embedder = {"ready": False, "status": status_name}
+        store = {"ready": False, "status": status_name}
+    database = {"ready": await run_in_threadpool(_check_database)}
+    
+    checks = {"embedder": embedder, "vector_store": store, "database": database}
+    ready = all(check["ready"] for check in checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
 # ==================== 认证相关接口 ====================
 
 @app.get("/api/auth/check-users")
@@ -197,98 +282,89 @@ async def upload_pdf(
     current_user: User = Depends(get_current_user)
 ):
     """
-    上传PDF文件并提取文本
+    上传PDF文件，保存后立即返回任务ID，文本提取和向量化在后台执行
     
     Args:
         file: 上传的PDF文件
         db: 数据库会话
         
     Returns:
-        上传结果和文件信息
+        上传结果、文件信息和入库任务ID
     """
     try:
         # 检查文件类型
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="只支持PDF文件")
         
-        # 检查文件大小
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        if file_size > Config.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"文件大小超过限制（最大 {Config.MAX_FILE_SIZE / 1024 / 1024}MB）"
-            )
-        
-        # 生成唯一文件名
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1]
-        saved_filename = f"{file_id}{file_extension}"
-        file_path = os.path.join(Config.UPLOAD_DIR, saved_filename)
-        
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        # 提取PDF文本（先不使用OCR，如果失败再尝试）
-        text_content = pdf_parser.extract_text(file_path, use_ocr=False)
-        use_ocr = False
-        
-        # 如果无法提取文本，尝试OCR识别（用于扫描版PDF）
-        if not text_content:
-            logger.info(f"尝试使用OCR识别PDF文本: {file.filename}")
-            text_content = pdf_parser.extract_text(file_path, use_ocr=True)
-            use_ocr = True
-        
-        # 即使无法提取文本，也允许上传（用户至少可以查看PDF）
-        # 保存到数据库
-        pdf_record = PDFFile(
-            user_id=current_user.id,
-            filename=saved_filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            file_size=file_size,
-            text_content=text_content  # 可以为None
-        )
-        db.add(pdf_record)
-        db.commit()
-        db.refresh(pdf_record)
-        
-        logger.info(f"PDF文件上传成功: {file.filename}, ID: {pdf_record.id}")
-        
-        # 如果提取到文本，生成向量并存储到Qdrant（用于语义搜索）
-        if text_content and VECTOR_SEARCH_AVAILABLE and vector_service:
+        # 先保存到临时文件
+        temp_path = os.path.join(Config.UPLOAD_DIR, f"{uuid.uuid4()}.upload")
+        file_path = None
+        try:
+            # 流式保存文件（边写入边检查大小并计算SHA-256，内存占用与文件大小无关）
             try:
-                logger.info(f"开始为PDF生成向量: {pdf_record.id}")
-                vector_service.add_document(
-                    pdf_file_id=pdf_record.id,
-                    user_id=current_user.id,
-                    filename=pdf_record.original_filename,
-                    text_content=text_content
+                file_size, content_hash = await StorageService.save_upload(file, temp_path)
+            except FileTooLargeError:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"文件大小超过限制（最大 {Config.MAX_FILE_SIZE / 1024 / 1024}MB）"
                 )
-                logger.info(f"PDF向量生成成功: {pdf_record.id}")
-            except Exception as e:
-                logger.error(f"生成PDF向量失败: {str(e)}，但不影响文件上传")
-        
-        # 根据是否提取到文本返回不同的消息
-        if not text_content:
-            message = "文件上传成功，但无法提取文本内容（可能是扫描版PDF或文件损坏），无法生成AI总结，但可以查看PDF文件"
-        elif use_ocr:
-            message = "文件上传成功，已通过OCR识别提取文本内容"
-        else:
-            message = "文件上传成功"
+            
+            # 是否重复上传只按当前用户自己的文件判断（存储跨用户共享，不能泄露其他用户上传过相同内容）
+            duplicate = db.query(PDFFile.id).filter(
+                PDFFile.user_id == current_user.id,
+                PDFFile.content_hash == content_hash
+            ).first() is not None
+            
+            # 按内容哈希存放，相同内容的文件只保存一份
+            file_path, _ = StorageService.store_blob(temp_path, content_hash)
+            saved_filename = os.path.basename(file_path)
+            
+            # 保存到数据库（每个用户仍拥有自己的记录，文本内容由后台入库任务填充或复用）
+            pdf_record = PDFFile(
+                user_id=current_user.id,
+                filename=saved_filename,
+                original_filename=file.filename,
+                file_path=file_path,
+                file_size=file_size,
+                content_hash=content_hash,
+                text_content=None
+            )
+            db.add(pdf_record)
+            try:
+                db.commit()
+            except Exception:
+                # 记录未提交：先处理临时文件，再释放没有其他记录引用的存储文件
+                db.rollback()
+                StorageService.finish_blob(temp_path, file_path)
+                try:
+                    StorageService.release_blob(db, pdf_record)
+                except Exception as release_error:
+                    logger.warning(f"释放存储文件失败: {str(release_error)}")
+                raise
+            db.refresh(pdf_record)
+        finally:
+            # 任何情况下都清理临时文件；复用已有文件时，记录提交后才删除（期间共享文件被并发删除时用它恢复）
+            if file_path is not None:
+                StorageService.finish_blob(temp_path, file_path)
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        # 创建入库任务并提交到后台线程池
+        job = ingest_service.create_job(db, current_user.id, pdf_record.id)
+        ingest_service.submit(job.id)
+        
+        logger.info(f"PDF文件上传成功: {file.filename}, ID: {pdf_record.id}, SHA-256: {content_hash}, 任务ID: {job.id}")
         
         return JSONResponse({
             "success": True,
-            "message": message,
+            "message": "文件上传成功，正在后台解析",
             "data": {
                 "id": pdf_record.id,
                 "filename": pdf_record.original_filename,
                 "file_size": pdf_record.file_size,
-                "text_length": len(text_content) if text_content else 0,
-                "has_text": text_content is not None,
-                "used_ocr": use_ocr,
+                "job_id": job.id,
+                "status": job.status,
+                "duplicate": duplicate,
                 "created_at": pdf_record.created_at.isoformat()
             }
         })
@@ -299,6 +375,31 @@ async def upload_pdf(
         logger.error(f"上传文件失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"上传文件失败: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    查询入库任务状态
+    
+    Args:
+        job_id: 任务ID
+        db: 数据库会话
+        
+    Returns:
+        任务状态和各阶段进度（extract/ocr/chunk/embed/upsert）
+    """
+    job = ingest_service.get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return JSONResponse({
+        "success": True,
+        "data": ingest_service.job_to_dict(job)
+    })
+
 @app.post("/api/summarize/{file_id}")
 async def summarize_pdf(
     file_id: int,
@@ -343,6 +444,10 @@ async def summarize_pdf(
                 }
             })
         
+        # 检查文件是否仍在后台解析中
+        if _has_pending_job(db, file_id):
+            raise HTTPException(status_code=409, detail="文件仍在解析中，请稍后再试")
+        
         # 检查是否有文本内容
         if not pdf_file.text_content:
             raise HTTPException(
@@ -350,10 +455,16 @@ async def summarize_pdf(
                 detail="该PDF文件无法提取文本内容（可能是扫描版PDF或文件损坏），无法生成AI总结。即使使用了OCR识别也无法提取文本，请检查PDF文件或使用其他工具处理。"
             )
         
-        # 调用AI服务进行总结
-        logger.info(f"开始AI总结，文件ID: {file_id}, 文本长度: {len(pdf_file.text_content)}")
-        
-        summary_text, token_used = ai_service.summarize_text(pdf_file.text_content)
+        # 同内容文件已有总结时直接复用，不再调用AI
+        shared_summary = ArtifactService.find_summary(db, pdf_file.content_hash, file_id)
+        if shared_summary:
+            logger.info(f"复用同内容文件的总结，文件ID: {file_id}, 来源总结ID: {shared_summary.id}")
+            summary_text, token_used = shared_summary.summary_content, 0
+        else:
+            # 调用AI服务进行总结
+            logger.info(f"开始AI总结，文件ID: {file_id}, 文本长度: {len(pdf_file.text_content)}")
+            
+            summary_text, token_used = ai_service.summarize_text(pdf_file.text_content)
         
         if not summary_text:
             raise HTTPException(status_code=500, detail="AI总结失败，请稍后重试")
@@ -415,6 +526,15 @@ async def get_files(
             PDFFile.user_id == current_user.id
         ).count()
         
+        # 查询仍在后台解析中的文件
+        processing_ids = {
+            row[0] for row in db.query(IngestJob.pdf_file_id).filter(
+                IngestJob.user_id == current_user.id,
+                IngestJob.pdf_file_id.in_([file.id for file in files]),
+                IngestJob.status.in_(["pending", "running"])
+            ).all()
+        } if files else set()
+        
         file_list = []
         for file in files:
             has_summary = db.query(Summary).filter(
@@ -428,6 +548,7 @@ async def get_files(
                 "text_length": len(file.text_content) if file.text_content else 0,
                 "has_text": file.text_content is not None,
                 "has_summary": has_summary,
+                "processing": file.id in processing_ids,
                 "created_at": file.created_at.isoformat()
             })
         
@@ -598,19 +719,19 @@ async def delete_file(
         if not pdf_file:
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        # 删除文件
-        if os.path.exists(pdf_file.file_path):
-            os.remove(pdf_file.file_path)
+        # 删除文件（内容相同的文件共享存储，仍被其他记录引用时保留）
+        StorageService.release_blob(db, pdf_file)
         
         # 删除向量（如果存在）
         if VECTOR_SEARCH_AVAILABLE and vector_service:
             try:
-                vector_service.delete_document(pdf_file.id, current_user.id)
+                await vector_service.delete_document_async(pdf_file.id, current_user.id)
             except Exception as e:
                 logger.warning(f"删除向量失败: {str(e)}，继续删除文件")
         
-        # 删除数据库记录（级联删除总结）
+        # 删除数据库记录（级联删除总结和入库任务）
         db.query(Summary).filter(Summary.pdf_file_id == file_id).delete()
+        db.query(IngestJob).filter(IngestJob.pdf_file_id == file_id).delete()
         db.delete(pdf_file)
         db.commit()
         
@@ -627,6 +748,32 @@ async def delete_file(
         logger.error(f"删除文件失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"删除文件失败: {str(e)}")
 
+# ==================== 统计接口 ====================
+
+@app.get("/api/stats")
+async def get_stats(current_user: User = Depends(get_current_user)):
+    """
+    缓存统计信息（命中率和大小）
+    
+    Returns:
+        各缓存的统计数据
+    """
+    cache = ocr_cache.get_cache()
+    vector_service = get_vector_service()
+    embedding_cache = vector_service.embedding_cache if vector_service else None
+    # OCR缓存统计需要遍历缓存目录，向量缓存统计需要查询SQLite，都在线程池中执行，避免阻塞事件循环
+    ocr_stats = await run_in_threadpool(cache.stats) if cache else None
+    embedding_stats = await run_in_threadpool(embedding_cache.stats) if embedding_cache else None
+    return JSONResponse({
+        "success": True,
+        "data": {
+            "ocr_cache": ocr_stats,
+            "embedding_cache": embedding_stats,
+            "search_cache": vector_service.search_cache.stats() if vector_service and vector_service.search_cache else None,
+            "query_embedding_cache": vector_service.query_embedding_cache.stats() if vector_service else None
+        }
+    })
+
 # ==================== 语义搜索接口 ====================
 
 @app.get("/api/search")
@@ -634,6 +781,8 @@ async def semantic_search(
     q: str,
     limit: int = 10,
     score_threshold: float = 0.5,
+    snippets: int = 1,
+    mode: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -642,8 +791,10 @@ async def semantic_search(
     
     Args:
         q: 搜索查询文本
-        limit: 返回结果数量（默认10）
+        limit: 返回文件数量（默认10）
         score_threshold: 相似度阈值（0-1，默认0.5）
+        snippets: 每个文件返回的匹配片段数（1-10，默认1）
+        mode: 搜索方式 hybrid（向量+关键词）/ vector / keyword（只查关键词索引），默认使用 SEARCH_MODE
         db: 数据库会话
         current_user: 当前用户
         
@@ -660,12 +811,17 @@ async def semantic_search(
         if not q or len(q.strip()) == 0:
             raise HTTPException(status_code=400, detail="搜索查询不能为空")
         
-        # 执行语义搜索
-        search_results = vector_service.search(
+        if mode and mode not in ("hybrid", "vector", "keyword"):
+            raise HTTPException(status_code=400, detail="mode 只能是 hybrid、vector 或 keyword")
+        
+        # 执行语义搜索（异步：查询向量在推理线程池中生成，不阻塞其他请求）
+        search_results = await vector_service.search_async(
             query=q.strip(),
             user_id=current_user.id,
             limit=limit,
-            score_threshold=score_threshold
+            score_threshold=score_threshold,
+            group_size=max(1, min(snippets, 10)),
+            mode=mode
         )
         
         # 从数据库获取完整的文件信息
@@ -685,7 +841,7 @@ async def semantic_search(
                     Summary.pdf_file_id == pdf_file_id
                 ).first() is not None
                 
-                file_list.append({
+                file_info = {
                     "id": pdf_file.id,
                     "filename": pdf_file.original_filename,
                     "file_size": pdf_file.file_size,
@@ -695,8 +851,24 @@ async def semantic_search(
                     "created_at": pdf_file.created_at.isoformat(),
                     "match_type": result["type"],  # filename 或 content
                     "match_text": result["text"][:200] + "..." if len(result["text"]) > 200 else result["text"],  # 匹配的文本片段
-                    "similarity_score": round(result["score"], 4)  # 相似度分数
-                })
+                    "similarity_score": round(result["score"], 4),  # 相似度分数（关键词结果为相对BM25分数）
+                    "match_source": result.get("match_source", "vector"),  # 命中的搜索方式：vector / keyword / vector+keyword
+                    "match_page": result.get("page"),  # 匹配片段所在页码（未知为null）
+                    "match_offsets": result.get("offsets")  # 匹配片段在全文（text_content）中的字符偏移 [起点, 终点)
+                }
+                if "snippets" in result:
+                    file_info["match_snippets"] = [
+                        {
+                            "match_type": snippet["type"],
+                            "match_text": snippet["text"][:200] + "..." if len(snippet["text"]) > 200 else snippet["text"],
+                            "similarity_score": round(snippet["score"], 4),
+                            "chunk_index": snippet["chunk_index"],
+                            "match_page": snippet.get("page"),
+                            "match_offsets": snippet.get("offsets")
+                        }
+                        for snippet in result["snippets"]
+                    ]
+                file_list.append(file_info)
         
         return JSONResponse({
             "success": True,
@@ -24,6 +24,7 @@ class PDFFile(Base):
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # 文件内容SHA-256，用于去重和复用解析结果
     text_content = Column(Text, nullable=True)  # 提取的文本内容
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -38,3 +39,18 @@ class Summary(Base):
     token_used = Column(Integer, nullable=True)  # 使用的token数量
     created_at = Column(DateTime, server_default=func.now())
 
+
+class IngestJob(Base):
+    """文档入库任务表（上传后在后台执行解析、OCR和向量化）"""
+    __tablename__ = "ingest_jobs"
+    
+    id = Column(String(36), primary_key=True)  # 任务ID（UUID）
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    pdf_file_id = Column(Integer, ForeignKey("pdf_files.id"), nullable=True, index=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/succeeded/failed
+    current_stage = Column(String(20), nullable=True)  # 当前执行的阶段
+    stages = Column(Text, nullable=True)  # 各阶段进度（JSON）
+    used_ocr = Column(Boolean, default=False)  # 是否使用了OCR
+    error = Column(Text, nullable=True)  # 错误信息
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
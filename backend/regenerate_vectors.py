@@ -24,7 +24,7 @@ def regenerate_all_vectors():
     # 初始化向量服务
     try:
         vector_service = VectorService()
-        if not vector_service.qdrant_client:
+        if not vector_service.vector_store:
             logger.error("Qdrant客户端未初始化，无法生成向量")
             return False
     except Exception as e:
@@ -54,14 +54,7 @@ def regenerate_all_vectors():
             try:
                 logger.info(f"正在为文件生成向量: {pdf_file.original_filename} (ID: {pdf_file.id})")
                 
-                # 先删除旧的向量（如果存在）
-                try:
-                    vector_service.delete_document(pdf_file.id, pdf_file.user_id)
-                    logger.debug(f"已删除文件 {pdf_file.id} 的旧向量")
-                except Exception as e:
-                    logger.debug(f"删除旧向量失败（可能不存在）: {str(e)}")
-                
-                # 生成新向量
+                # 生成新向量（点ID由文件ID和块序号确定，直接覆盖旧向量，多余的旧块会被清理）
                 success = vector_service.add_document(
                     pdf_file_id=pdf_file.id,
                     user_id=pdf_file.user_id,
@@ -102,7 +95,7 @@ def regenerate_user_vectors(user_id: int):
     # 初始化向量服务
     try:
         vector_service = VectorService()
-        if not vector_service.qdrant_client:
+        if not vector_service.vector_store:
             logger.error("Qdrant客户端未初始化，无法生成向量")
             return False
     except Exception as e:
@@ -133,14 +126,7 @@ def regenerate_user_vectors(user_id: int):
             try:
                 logger.info(f"正在为文件生成向量: {pdf_file.original_filename} (ID: {pdf_file.id})")
                 
-                # 先删除旧的向量（如果存在）
-                try:
-                    vector_service.delete_document(pdf_file.id, pdf_file.user_id)
-                    logger.debug(f"已删除文件 {pdf_file.id} 的旧向量")
-                except Exception as e:
-                    logger.debug(f"删除旧向量失败（可能不存在）: {str(e)}")
-                
-                # 生成新向量
+                # 生成新向量（点ID由文件ID和块序号确定，直接覆盖旧向量，多余的旧块会被清理）
                 success = vector_service.add_document(
                     pdf_file_id=pdf_file.id,
                     user_id=pdf_file.user_id,
@@ -185,8 +171,16 @@ if __name__ == "__main__":
         default=None,
         help="只重新生成指定用户的向量（可选）"
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=f"批量生成向量时每批的文本数（默认: {Config.EMBEDDING_BATCH_SIZE}）"
+    )
     
     args = parser.parse_args()
+    if args.batch_size:
+        Config.EMBEDDING_BATCH_SIZE = args.batch_size
     
     if args.user_id:
         logger.info(f"开始为用户 {args.user_id} 重新生成向量...")
@@ -0,0 +1,58 @@
+from sqlalchemy.orm import Session
+from models import PDFFile, Summary
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactService:
+    """
+    派生结果复用服务
+
+    相同内容（content_hash相同）的PDF共享磁盘文件，提取的文本、分块向量和AI总结
+    也可以从已处理过的同内容记录中复用，而每个用户仍然拥有自己的PDFFile记录。
+    """
+
+    @staticmethod
+    def find_text_source(db: Session, content_hash: Optional[str], exclude_id: int) -> Optional[PDFFile]:
+        """
+        查找已完成文本提取的同内容文件
+
+        Args:
+            db: 数据库会话
+            content_hash: 文件内容SHA-256
+            exclude_id: 排除的PDF文件ID（当前文件）
+
+        Returns:
+            可复用文本的PDF文件记录，没有则返回None
+        """
+        if not content_hash:
+            return None
+        return db.query(PDFFile).filter(
+            PDFFile.content_hash == content_hash,
+            PDFFile.id != exclude_id,
+            PDFFile.text_content.isnot(None)
+        ).order_by(PDFFile.id).first()
+
+    @staticmethod
+    def find_summary(db: Session, content_hash: Optional[str], exclude_id: int) -> Optional[Summary]:
+        """
+        查找同内容文件已生成的总结
+
+        Args:
+            db: 数据库会话
+            content_hash: 文件内容SHA-256
+            exclude_id: 排除的PDF文件ID（当前文件）
+
+        Returns:
+            可复用的总结记录，没有则返回None
+        """
+        if not content_hash:
+            return None
+        return db.query(Summary).join(
+            PDFFile, Summary.pdf_file_id == PDFFile.id
+        ).filter(
+            PDFFile.content_hash == content_hash,
+            PDFFile.id != exclude_id
+        ).order_by(Summary.id).first()
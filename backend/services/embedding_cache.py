@@ -0,0 +1,178 @@
+from array import array
+from collections import OrderedDict
+from config import Config
+from typing import Optional, List, Dict, Any
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    文本向量的两级缓存：内存LRU + SQLite磁盘存储
+
+    以 (模型名, 规范化文本的SHA-256) 为键。重新上传文档、重新生成向量时，
+    相同文本块的向量直接从缓存读取，不再重复计算。
+    切换 EMBEDDING_MODEL 后，旧模型的缓存条目在启动时清除。
+    """
+
+    def __init__(self, db_path: str = None, memory_items: int = None, max_entries: int = None, model: str = None, dimension: int = None):
+        """
+        Args:
+            db_path: SQLite数据库路径
+            memory_items: 内存LRU保留的条目数
+            max_entries: 磁盘上保留的最大条目数，超过后删除最早写入的条目
+            model: 模型名，默认使用 Config.EMBEDDING_MODEL
+            dimension: 向量维度，默认使用 Config.EMBEDDING_DIMENSION，维度不符的向量不写入缓存
+        """
+        self.db_path = db_path or Config.EMBEDDING_CACHE_PATH
+        self.memory_items = memory_items if memory_items is not None else Config.EMBEDDING_CACHE_MEMORY_ITEMS
+        self.max_entries = max_entries if max_entries is not None else Config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.model = model or Config.EMBEDDING_MODEL
+        self.dimension = dimension or Config.EMBEDDING_DIMENSION
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_trim = 0
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)")
+        # 模型变化后旧向量不再可用
+        removed = self._conn.execute("DELETE FROM embeddings WHERE model != ?", (self.model,)).rowcount
+        self._conn.commit()
+        if removed:
+            logger.info(f"embedding模型已变化，清除旧模型的向量缓存: {removed} 条")
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        """规范化文本（Unicode NFKC、合并空白）后计算SHA-256"""
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        批量读取缓存的向量
+
+        Returns:
+            与 texts 一一对应的向量列表，未命中的位置为None
+        """
+        keys = [self.make_key(text) if text else None for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            rows = []
+            missing_keys = list(missing)
+            for start in range(0, len(missing_keys), 500):  # 控制单条SQL的参数个数
+                batch = missing_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (self.model, *batch)
+                ).fetchall())
+            for key, blob in rows:
+                vector = array("f", blob).tolist()
+                self._remember(key, vector)
+                for i in missing.pop(key):
+                    results[i] = vector
+                    self.disk_hits += 1
+            self.misses += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[Optional[List[float]]]):
+        """批量写入向量（跳过生成失败和维度不符的条目）"""
+        rows = []
+        now = time.time()
+        rejected = 0
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not text or not vector:
+                    continue
+                if len(vector) != self.dimension:
+                    rejected += 1
+                    continue
+                key = self.make_key(text)
+                self._remember(key, vector)
+                rows.append((self.model, key, array("f", vector).tobytes(), now))
+            if rejected:
+                logger.warning(f"{rejected} 个向量的维度与 {self.dimension} 不符，未写入缓存")
+            if not rows:
+                return
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+                self._conn.commit()
+                self._puts_since_trim += len(rows)
+                if self._puts_since_trim >= 1000:
+                    self._trim()
+            except Exception as e:
+                logger.warning(f"写入向量缓存失败: {str(e)}")
+
+    def _remember(self, key: str, vector: List[float]):
+        """放入内存LRU（调用方持有锁）"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _trim(self):
+        """磁盘条目超过上限时删除最早写入的条目（调用方持有锁）"""
+        self._puts_since_trim = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY created_at LIMIT ?)",
+            (count - self.max_entries,)
+        )
+        self._conn.commit()
+        logger.info(f"向量缓存淘汰 {count - self.max_entries} 条")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计和缓存大小"""
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            memory_entries = len(self._memory)
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        size = 0
+        for suffix in ("", "-wal"):
+            try:
+                size += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                continue
+        return {
+            "model": self.model,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+            "size_bytes": size
+        }
@@ -0,0 +1,99 @@
+from concurrent.futures import Future
+from config import Config
+from typing import Callable, List, Optional
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDispatcher:
+    """
+    向量生成的动态微批处理
+
+    并发的调用方（搜索请求、多个入库任务）把待生成向量的文本交给分发线程，
+    分发线程在 max_wait_ms 毫秒内（或凑满 max_batch 条文本时）把同时到达的请求合并，
+    只做一次批量前向计算，再把结果分别交还给各个调用方。
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str], int], List[Optional[List[float]]]],
+        max_batch: int = None,
+        max_wait_ms: float = None
+    ):
+        """
+        Args:
+            embed_fn: 实际生成向量的函数，参数为(文本列表, 批大小)，返回与文本一一对应的向量
+            max_batch: 一次合并的最大文本数
+            max_wait_ms: 收到第一个请求后等待其他请求的最长时间（毫秒）
+        """
+        self.embed_fn = embed_fn
+        self.max_batch = max_batch or Config.EMBEDDING_MAX_BATCH
+        self.max_wait = (Config.EMBEDDING_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def embed(self, texts: List[str], batch_size: int = None) -> List[Optional[List[float]]]:
+        """
+        提交文本并等待向量生成完成（可被多个线程同时调用）
+
+        Args:
+            texts: 文本列表
+            batch_size: 前向计算的批大小
+
+        Returns:
+            与 texts 一一对应的向量列表
+        """
+        if not texts:
+            return []
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((texts, batch_size or Config.EMBEDDING_BATCH_SIZE, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        """延迟启动分发线程"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-dispatcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        """取出第一个请求，再在等待窗口内收集后续请求，直到凑满 max_batch 条文本"""
+        requests = [self._queue.get()]
+        count = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+        return requests
+
+    def _run(self):
+        """分发线程：合并请求、批量生成向量、按请求拆分结果"""
+        while True:
+            requests = self._collect()
+            texts = [text for request_texts, _, _ in requests for text in request_texts]
+            batch_size = max(request_batch_size for _, request_batch_size, _ in requests)
+            try:
+                results = self.embed_fn(texts, batch_size)
+            except Exception as e:
+                logger.error(f"批量生成向量失败: {str(e)}")
+                for _, _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            if len(requests) > 1:
+                logger.debug(f"合并 {len(requests)} 个请求批量生成向量，共 {len(texts)} 条文本")
+            offset = 0
+            for request_texts, _, future in requests:
+                future.set_result(results[offset:offset + len(request_texts)])
+                offset += len(request_texts)
@@ -0,0 +1,297 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from typing import Callable, Iterator, List, Optional, Dict, Any
+from config import Config
+from database import SessionLocal
+from models import IngestJob, PDFFile
+from services.artifact_service import ArtifactService
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# 入库流水线的各个阶段（按执行顺序）
+STAGES = ["extract", "ocr", "chunk", "embed", "upsert"]
+
+
+class _StageTracker:
+    """记录任务各阶段的进度，并按时间间隔节流写入数据库"""
+
+    def __init__(self, db: Session, job: IngestJob):
+        self.db = db
+        self.job = job
+        self.stages = {name: {"status": "pending", "done": 0, "total": 0} for name in STAGES}
+        self._last_flush = 0.0
+
+    def start(self, stage: str):
+        self.stages[stage]["status"] = "running"
+        self.job.current_stage = stage
+        self.flush(force=True)
+
+    def progress(self, stage: str, done: int, total: int):
+        self.stages[stage]["done"] = done
+        self.stages[stage]["total"] = total
+        self.flush()
+
+    def finish(self, stage: str, status: str = "done"):
+        self.stages[stage]["status"] = status
+        self.flush(force=True)
+
+    def skip(self, *stages: str, status: str = "skipped"):
+        for stage in stages:
+            self.stages[stage]["status"] = status
+        self.flush(force=True)
+
+    def on_progress(self, stage: str, done: int, total: int):
+        """进度回调：首次收到某阶段的进度时将其标记为运行中（流式处理时多个阶段同时运行）"""
+        if self.stages[stage]["status"] == "pending":
+            self.stages[stage]["status"] = "running"
+            self.job.current_stage = stage
+        self.progress(stage, done, total)
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < Config.INGEST_PROGRESS_INTERVAL:
+            return
+        self._last_flush = now
+        self.job.stages = json.dumps(self.stages)
+        self.db.commit()
+
+
+class IngestService:
+    """文档入库服务：上传请求只保存文件并创建任务，解析和向量化在后台线程池中执行"""
+
+    def __init__(self, pdf_parser, vector_service_getter: Callable[[], Optional[Any]], max_workers: int = None):
+        """
+        Args:
+            pdf_parser: PDF解析器
+            vector_service_getter: 返回当前可用向量服务的函数（向量服务在后台初始化，可能暂不可用）
+            max_workers: 并发执行的任务数
+        """
+        self.pdf_parser = pdf_parser
+        self.vector_service_getter = vector_service_getter
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.INGEST_WORKERS,
+            thread_name_prefix="ingest"
+        )
+
+    @staticmethod
+    def create_job(db: Session, user_id: int, pdf_file_id: int) -> IngestJob:
+        """
+        创建入库任务
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            pdf_file_id: PDF文件ID
+
+        Returns:
+            创建的任务对象
+        """
+        job = IngestJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            pdf_file_id=pdf_file_id,
+            status="pending",
+            stages=json.dumps({name: {"status": "pending", "done": 0, "total": 0} for name in STAGES})
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def submit(self, job_id: str):
+        """将任务提交到后台线程池"""
+        self.executor.submit(self._run, job_id)
+        logger.info(f"入库任务已提交: {job_id}")
+
+    def resume_pending(self):
+        """重新提交服务重启前未完成的任务"""
+        db = SessionLocal()
+        try:
+            jobs = db.query(IngestJob).filter(
+                IngestJob.status.in_(["pending", "running"])
+            ).all()
+            for job in jobs:
+                job.status = "pending"
+            db.commit()
+            for job in jobs:
+                self.submit(job.id)
+            if jobs:
+                logger.info(f"恢复未完成的入库任务: {len(jobs)} 个")
+        except Exception as e:
+            logger.error(f"恢复入库任务失败: {str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_job(db: Session, job_id: str, user_id: int) -> Optional[IngestJob]:
+        """获取属于指定用户的任务"""
+        return db.query(IngestJob).filter(
+            IngestJob.id == job_id,
+            IngestJob.user_id == user_id
+        ).first()
+
+    @staticmethod
+    def job_to_dict(job: IngestJob) -> Dict[str, Any]:
+        """将任务转换为接口返回格式"""
+        return {
+            "job_id": job.id,
+            "file_id": job.pdf_file_id,
+            "status": job.status,
+            "current_stage": job.current_stage,
+            "stages": json.loads(job.stages) if job.stages else {},
+            "used_ocr": bool(job.used_ocr),
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None
+        }
+
+    def _run(self, job_id: str):
+        """执行入库流水线：extract -> ocr -> chunk -> embed -> upsert"""
+        db = SessionLocal()
+        try:
+            # 原子地认领任务，避免同一任务被重复执行
+            claimed = db.query(IngestJob).filter(
+                IngestJob.id == job_id,
+                IngestJob.status == "pending"
+            ).update({"status": "running"}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                logger.info(f"入库任务已被处理或不存在: {job_id}")
+                return
+
+            job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+            pdf_file = db.query(PDFFile).filter(PDFFile.id == job.pdf_file_id).first()
+            if not pdf_file:
+                job.status = "failed"
+                job.error = "PDF文件不存在"
+                db.commit()
+                return
+
+            tracker = _StageTracker(db, job)
+            self._process(db, job, pdf_file, tracker)
+
+        except Exception as e:
+            import traceback
+            logger.error(f"入库任务执行失败: {job_id}, {str(e)}")
+            logger.error(f"错误详情: {traceback.format_exc()}")
+            try:
+                db.rollback()
+                job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+                if job:
+                    job.status = "failed"
+                    job.error = str(e)
+                    db.commit()
+            except Exception as mark_error:
+                logger.error(f"更新任务状态失败: {str(mark_error)}")
+        finally:
+            db.close()
+
+    def _process(self, db: Session, job: IngestJob, pdf_file: PDFFile, tracker: _StageTracker):
+        """按阶段处理单个文档"""
+        vector_service = self.vector_service_getter()
+        success = None  # None表示没有生成向量
+        
+        # 同内容文件已解析过时，直接复用其文本和向量
+        source = ArtifactService.find_text_source(db, pdf_file.content_hash, pdf_file.id)
+        if source:
+            logger.info(f"复用同内容文件的解析结果: {source.id} -> {pdf_file.id}")
+            text_content = source.text_content
+            source_job = db.query(IngestJob).filter(
+                IngestJob.pdf_file_id == source.id
+            ).order_by(IngestJob.created_at.desc()).first()
+            job.used_ocr = bool(source_job and source_job.used_ocr)
+            tracker.skip("extract", "ocr", status="reused")
+            
+            if text_content and vector_service:
+                success = vector_service.copy_document(
+                    source_pdf_file_id=source.id,
+                    pdf_file_id=pdf_file.id,
+                    user_id=pdf_file.user_id,
+                    filename=pdf_file.original_filename,
+                    progress_callback=tracker.on_progress
+                )
+                if success:
+                    tracker.skip("chunk", "embed", status="reused")
+                else:
+                    success = vector_service.add_document(
+                        pdf_file_id=pdf_file.id,
+                        user_id=pdf_file.user_id,
+                        filename=pdf_file.original_filename,
+                        text_content=text_content,
+                        progress_callback=tracker.on_progress
+                    )
+        else:
+            # 边解析边分块、向量化并写入Qdrant（用于语义搜索），不等整个文档解析完
+            page_texts = []
+            pages = self._iter_pages(job, pdf_file, tracker, page_texts)
+            if vector_service:
+                logger.info(f"开始为PDF生成向量: {pdf_file.id}")
+                success = vector_service.add_document_pages(
+                    pdf_file_id=pdf_file.id,
+                    user_id=pdf_file.user_id,
+                    filename=pdf_file.original_filename,
+                    pages=pages,
+                    progress_callback=tracker.on_progress
+                )
+            # 向量服务不可用或中途失败时，继续解析剩余页面以保存全文
+            for _ in pages:
+                pass
+            text_content = "\n\n".join(page_texts) if page_texts else None
+            if not text_content:
+                success = None
+        
+        pdf_file.text_content = text_content  # 可以为None
+        db.commit()
+        
+        if success is None:
+            if text_content and not vector_service:
+                logger.warning(f"向量服务不可用，跳过向量生成: PDF ID={pdf_file.id}")
+            tracker.skip("chunk", "embed", "upsert")
+        else:
+            for stage in ("chunk", "embed", "upsert"):
+                if tracker.stages[stage]["status"] in ("pending", "running"):
+                    tracker.stages[stage]["status"] = "done" if success else "failed"
+            if success:
+                logger.info(f"PDF向量生成成功: {pdf_file.id}")
+            else:
+                # 向量生成失败不影响文件本身可用
+                job.error = "生成PDF向量失败，语义搜索中将无法找到该文件"
+                logger.error(f"生成PDF向量失败: {pdf_file.id}，但不影响文件上传")
+        
+        job.status = "succeeded"
+        job.current_stage = None
+        tracker.flush(force=True)
+        logger.info(f"入库任务完成: {job.id}, PDF ID={pdf_file.id}")
+    
+    def _iter_pages(self, job: IngestJob, pdf_file: PDFFile, tracker: _StageTracker, page_texts: List[str]) -> Iterator[str]:
+        """
+        流式提取各页文本：有文本层的页面直接使用，只对空白或接近空白的页面进行OCR
+        
+        产出的页面同时追加到 page_texts，用于最后保存全文。
+        """
+        tracker.start("extract")
+        ocr_pages = 0
+        for _, text, used_ocr in self.pdf_parser.iter_pages(
+            pdf_file.file_path,
+            use_ocr=True,
+            progress_callback=lambda done, total: tracker.progress("extract", done, total),
+            ocr_progress_callback=lambda done, total: tracker.on_progress("ocr", done, total)
+        ):
+            ocr_pages += used_ocr
+            if text:
+                page_texts.append(text)
+            yield text
+        
+        tracker.finish("extract")
+        if tracker.stages["ocr"]["status"] == "running":
+            tracker.finish("ocr")
+        else:
+            tracker.skip("ocr")
+        
+        if ocr_pages:
+            logger.info(f"OCR识别了 {ocr_pages} 页: {pdf_file.original_filename}")
+        job.used_ocr = bool(ocr_pages)
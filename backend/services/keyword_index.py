@@ -0,0 +1,332 @@
+from collections import Counter, defaultdict
+from config import Config
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字按相邻二元组切分（单独的一个字保留单字），字母数字片段（型号、编码等）保留原样并拆出各段；
+# 二元组用前瞻断言一次匹配出全部重叠的二元组，比逐个片段切片快得多
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_CJK_BIGRAM = re.compile(f"(?=([{_CJK}]{{2}}))")
+_CJK_SINGLE = re.compile(f"(?<![{_CJK}])[{_CJK}](?![{_CJK}])")
+_WORD = re.compile(r"[a-z0-9]+(?:[-_./:#][a-z0-9]+)*")
+_WORD_PART = re.compile(r"[a-z0-9]+")
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 文件名条目的块序号
+FILENAME_CHUNK = -1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：中日韩文字切分为相邻二元组（单字片段保留单字），
+    字母数字片段转小写后保留完整片段（如 "abc-1234"），含分隔符时再拆出各段
+    """
+    if not text:
+        return []
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    text = text.lower()
+    tokens = _CJK_BIGRAM.findall(text)
+    tokens.extend(_CJK_SINGLE.findall(text))
+    for word in _WORD.findall(text):
+        tokens.append(word)
+        parts = _WORD_PART.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class _Partition:
+    """一个用户的倒排索引（BM25统计按用户计算，搜索时不必跳过其他用户的文档）"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # 词 -> {条目ID: 词频}
+        self.lengths: Dict[int, int] = {}  # 条目ID -> 词数
+        self.terms: Dict[int, Tuple[str, ...]] = {}  # 条目ID -> 不重复的词（删除条目时使用，不依赖SQLite中的文本）
+        self.total_length = 0
+
+
+class KeywordIndex:
+    """
+    文本块的本地倒排索引（BM25）
+
+    与向量使用相同的分块，按用户分区保存在内存中，搜索不需要embedding模型；
+    条目文本保存在SQLite中，load() 重新分词建立内存索引（条目多时较慢，应在后台线程中调用）。
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Args:
+            db_path: SQLite数据库路径
+        """
+        self.db_path = db_path or Config.KEYWORD_INDEX_PATH
+        self._lock = threading.RLock()
+        self._partitions: Dict[int, _Partition] = {}
+        self._entries: Dict[int, Tuple[int, int, int]] = {}  # 条目ID -> (用户ID, PDF文件ID, 块序号)
+        self._entry_ids: Dict[Tuple[int, int], int] = {}  # (PDF文件ID, 块序号) -> 条目ID
+        self._file_entries: Dict[int, set] = defaultdict(set)  # PDF文件ID -> 条目ID集合
+        self._filenames: Dict[int, str] = {}
+        self._next_id = 0
+        self._touched: Optional[set] = None  # 加载期间写入或删除过的文件ID（加载时跳过）
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "pdf_file_id INTEGER NOT NULL, chunk_index INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "filename TEXT NOT NULL, text TEXT NOT NULL, PRIMARY KEY (pdf_file_id, chunk_index))"
+        )
+        self._conn.commit()
+
+    def load(self) -> int:
+        """
+        从SQLite加载已保存的条目（加载期间写入或删除过的文档以内存中的状态为准）
+
+        Returns:
+            加载的条目数
+        """
+        count = 0
+        with self._lock:
+            self._touched = set()
+            rows = self._conn.execute("SELECT * FROM chunks").fetchall()
+        try:
+            for start in range(0, len(rows), 1000):
+                with self._lock:
+                    for pdf_file_id, chunk_index, user_id, filename, text in rows[start:start + 1000]:
+                        if pdf_file_id not in self._touched:
+                            self._add_entry(pdf_file_id, chunk_index, user_id, filename, text)
+                            count += 1
+        finally:
+            with self._lock:
+                self._touched = None
+        if count:
+            logger.info(f"关键词索引已加载: {count} 个条目")
+        return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- 写入 ----------
+
+    def add(self, pdf_file_id: int, user_id: int, filename: str, chunks: Iterable[Tuple[Optional[int], str]]):
+        """
+        写入（或覆盖）文档的条目
+
+        Args:
+            chunks: (块序号, 文本) 列表，块序号为None表示文件名
+        """
+        rows = []
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(pdf_file_id)
+            for chunk_index, text in chunks:
+                chunk_index = FILENAME_CHUNK if chunk_index is None else chunk_index
+                self._remove_entry(pdf_file_id, chunk_index)
+                self._add_entry(pdf_file_id, chunk_index, user_id, filename, text)
+                rows.append((pdf_file_id, chunk_index, user_id, filename, text))
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                logger.warning(f"写入关键词索引失败: {str(e)}（内存中的索引已更新，重启后这些条目需要重新写入）")
+
+    def remove_document(self, pdf_file_id: int, from_chunk: Optional[int] = None):
+        """
+        删除文档的条目
+
+        Args:
+            from_chunk: 只删除块序号不小于该值的文本块（重新生成后块数变少时清理多余的旧块），None表示全部删除
+        """
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(pdf_file_id)
+            for entry_id in list(self._file_entries.get(pdf_file_id, ())):
+                chunk_index = self._entries[entry_id][2]
+                if from_chunk is None or chunk_index >= from_chunk:
+                    self._remove_entry(pdf_file_id, chunk_index)
+            if from_chunk is None:
+                self._filenames.pop(pdf_file_id, None)
+            try:
+                if from_chunk is None:
+                    self._conn.execute("DELETE FROM chunks WHERE pdf_file_id = ?", (pdf_file_id,))
+                else:
+                    self._conn.execute("DELETE FROM chunks WHERE pdf_file_id = ? AND chunk_index >= ?", (pdf_file_id, from_chunk))
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"删除关键词索引失败: {str(e)}")
+
+    def _add_entry(self, pdf_file_id: int, chunk_index: int, user_id: int, filename: str, text: str):
+        """把条目加入内存索引（调用方持有锁）"""
+        entry_id = self._next_id
+        self._next_id += 1
+        tokens = tokenize(text)
+        partition = self._partitions.setdefault(user_id, _Partition())
+        postings = partition.postings
+        counts = Counter(tokens)
+        for token, tf in counts.items():
+            postings[token][entry_id] = tf
+        partition.terms[entry_id] = tuple(counts)
+        partition.lengths[entry_id] = len(tokens)
+        partition.total_length += len(tokens)
+        self._entries[entry_id] = (user_id, pdf_file_id, chunk_index)
+        self._entry_ids[(pdf_file_id, chunk_index)] = entry_id
+        self._file_entries[pdf_file_id].add(entry_id)
+        self._filenames[pdf_file_id] = filename
+
+    def _remove_entry(self, pdf_file_id: int, chunk_index: int):
+        """从内存索引中删除条目（调用方持有锁）"""
+        entry_id = self._entry_ids.pop((pdf_file_id, chunk_index), None)
+        if entry_id is None:
+            return
+        user_id = self._entries.pop(entry_id)[0]
+        self._file_entries[pdf_file_id].discard(entry_id)
+        if not self._file_entries[pdf_file_id]:
+            del self._file_entries[pdf_file_id]
+        partition = self._partitions[user_id]
+        for token in partition.terms.pop(entry_id, ()):
+            posting = partition.postings.get(token)
+            if posting is not None:
+                posting.pop(entry_id, None)
+                if not posting:
+                    del partition.postings[token]
+        partition.total_length -= partition.lengths.pop(entry_id)
+
+    def _text(self, pdf_file_id: int, chunk_index: int) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT text FROM chunks WHERE pdf_file_id = ? AND chunk_index = ?", (pdf_file_id, chunk_index)
+        ).fetchone()
+        return row[0] if row else None
+
+    # ---------- 搜索 ----------
+
+    def search(self, query: str, user_id: int, limit: int = 10, group_size: int = 1) -> List[Dict[str, Any]]:
+        """
+        BM25关键词搜索（按文件分组：每个文件一条结果，带最多 group_size 个匹配片段）
+
+        Returns:
+            搜索结果列表，格式与向量搜索相同；score 为BM25分数除以最佳结果的分数（0-1）
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            partition = self._partitions.get(user_id)
+            if not terms or partition is None or not partition.lengths:
+                return []
+            documents = len(partition.lengths)
+            average_length = partition.total_length / documents or 1.0
+            scores: Dict[int, float] = defaultdict(float)
+            lengths = partition.lengths
+            base = BM25_K1 * (1 - BM25_B)
+            per_token = BM25_K1 * BM25_B / average_length
+            for term in terms:
+                posting = partition.postings.get(term)
+                if not posting:
+                    continue
+                weight = math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5)) * (BM25_K1 + 1)
+                for entry_id, tf in posting.items():
+                    length = lengths.get(entry_id)
+                    if length is None:
+                        continue
+                    scores[entry_id] += weight * tf / (tf + base + per_token * length)
+            if not scores:
+                return []
+
+            # 按分数取足够多的条目再分组，一个文件的匹配占满前几名时逐步放宽
+            wanted = limit * group_size * 4
+            while True:
+                ranked = heapq.nlargest(wanted, scores.items(), key=lambda item: item[1])
+                groups: Dict[int, List[Tuple[int, float]]] = {}
+                for entry_id, score in ranked:
+                    pdf_file_id = self._entries[entry_id][1]
+                    hits = groups.get(pdf_file_id)
+                    if hits is None:
+                        if len(groups) >= limit:
+                            continue
+                        hits = groups[pdf_file_id] = []
+                    if len(hits) < group_size:
+                        hits.append((entry_id, score))
+                if len(groups) >= limit or wanted >= len(scores):
+                    break
+                wanted *= 4
+
+            best = ranked[0][1]
+            results = []
+            for pdf_file_id, hits in groups.items():
+                formatted = [self._format_hit(entry_id, score / best) for entry_id, score in hits]
+                result = dict(formatted[0])
+                if group_size > 1:
+                    result["snippets"] = formatted
+                results.append(result)
+            return results
+
+    def _format_hit(self, entry_id: int, score: float) -> Dict[str, Any]:
+        """转换为与向量搜索结果相同格式的字典"""
+        _, pdf_file_id, chunk_index = self._entries[entry_id]
+        is_filename = chunk_index == FILENAME_CHUNK
+        return {
+            "pdf_file_id": pdf_file_id,
+            "filename": self._filenames.get(pdf_file_id, ""),
+            "text": self._text(pdf_file_id, chunk_index) or "",
+            "type": "filename" if is_filename else "content",
+            "score": score,
+            "chunk_index": None if is_filename else chunk_index,
+            "page": None,  # 关键词索引不记录页码和偏移
+            "offsets": None
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """返回条目数、用户数和词数"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "users": len(self._partitions),
+                "terms": sum(len(partition.postings) for partition in self._partitions.values())
+            }
+
+
+def reciprocal_rank_fusion(result_lists: List[Tuple[str, List[Dict[str, Any]]]], limit: int, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    倒数排名融合（RRF）：按文件合并多路搜索结果，融合分数为各路中 1/(k + 名次) 之和
+
+    每个文件保留名次最靠前的那一路的结果，并记录 match_source（命中的各路名称）和 rrf_score。
+
+    Args:
+        result_lists: (来源名称, 按文件分组的结果列表) 列表
+        limit: 返回的文件数量
+        k: RRF常数，越大各名次之间的差距越小
+    """
+    fused: Dict[int, Dict[str, Any]] = {}
+    for source, results in result_lists:
+        for rank, result in enumerate(results, 1):
+            pdf_file_id = result["pdf_file_id"]
+            entry = fused.get(pdf_file_id)
+            if entry is None:
+                entry = fused[pdf_file_id] = {"result": result, "best_rank": rank, "rrf_score": 0.0, "sources": []}
+            elif rank < entry["best_rank"]:
+                entry["result"], entry["best_rank"] = result, rank
+            entry["rrf_score"] += 1.0 / (k + rank)
+            entry["sources"].append(source)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry["rrf_score"], reverse=True)[:limit]
+    merged = []
+    for entry in ranked:
+        result = dict(entry["result"])
+        result["rrf_score"] = entry["rrf_score"]
+        result["match_source"] = "+".join(entry["sources"])
+        merged.append(result)
+    return merged
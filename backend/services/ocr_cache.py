@@ -0,0 +1,153 @@
+from config import Config
+from typing import Optional, Dict, Any
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    OCR结果磁盘缓存
+
+    以渲染后页面图片的哈希（加上识别语言、DPI和处理方式）为键，保存识别出的文本。
+    重复的页面（封面、模板页、表格等）命中缓存后不再调用Tesseract。
+    缓存总大小超过上限时，按最近访问时间淘汰最旧的条目（LRU）。
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or Config.OCR_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.OCR_CACHE_MAX_MB * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image, lang: str, dpi: int, variant: str = "") -> str:
+        """
+        计算页面图片的缓存键
+
+        Args:
+            image: PIL图片
+            lang: 识别语言
+            dpi: 渲染分辨率
+            variant: 处理方式（预处理、快速模式等会影响识别结果的设置）
+
+        Returns:
+            SHA-256十六进制字符串
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{lang}|{dpi}|{variant}|{image.mode}|{image.size[0]}x{image.size[1]}|".encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存的识别文本，命中时刷新访问时间
+
+        Returns:
+            识别文本（可能为空字符串，表示该页没有识别出文本），未命中返回None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # 更新访问时间，用于LRU淘汰
+            return text
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取OCR缓存失败: {str(e)}")
+            return None
+
+    def put(self, key: str, text: str):
+        """写入识别文本（先写临时文件再重命名，避免并发读到不完整内容）"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"写入OCR缓存失败: {str(e)}")
+
+    def record(self, hit: bool):
+        """记录一次命中或未命中（子进程中的查询结果由父进程汇总记录）"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evict(self):
+        """缓存总大小超过上限时，删除最久未访问的条目直到降到上限的90%"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        logger.info(f"OCR缓存淘汰 {removed} 个条目，当前大小: {total / 1024 / 1024:.1f} MB")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计和缓存大小"""
+        entries = 0
+        size = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                    entries += 1
+                except FileNotFoundError:
+                    continue
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[OCRCache]:
+    """获取当前进程的OCR缓存（未启用时返回None）"""
+    global _cache
+    if not Config.OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache()
+        return _cache
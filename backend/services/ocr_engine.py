@@ -0,0 +1,179 @@
+from config import Config
+from typing import Dict, Any, Tuple
+import logging
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+    if Config.TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+# 尝试导入tesserocr（可选）：直接调用libtesseract，引擎常驻内存，
+# 语言模型只加载一次，不需要为每页启动tesseract进程和写临时图片文件
+try:
+    from tesserocr import PyTessBaseAPI, get_languages as tesserocr_get_languages, tesseract_version
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# OCR环境探测结果（每个进程只探测一次）
+_capabilities = None
+_capabilities_lock = threading.Lock()
+
+# 每个线程一个常驻引擎（PyTessBaseAPI不是线程安全的）
+_local = threading.local()
+# 进程池子进程中使用的识别语言（由 init_worker 设置，避免子进程重复探测）
+_worker_lang = None
+
+
+def probe_capabilities() -> Dict[str, Any]:
+    """
+    探测OCR环境（poppler、Tesseract版本和语言包），结果在进程内缓存
+
+    Returns:
+        探测结果字典：poppler、tesseract、backend、version、languages、lang
+    """
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is not None:
+            return _capabilities
+
+        caps = {
+            "poppler": False,
+            "tesseract": False,
+            "backend": None,
+            "version": None,
+            "languages": [],
+            "lang": "eng"
+        }
+
+        # 检查poppler是否可用
+        try:
+            subprocess.run(['pdftoppm', '-v'], capture_output=True, text=True, timeout=5)
+            caps["poppler"] = True
+            logger.info("poppler检查: pdftoppm可用")
+        except FileNotFoundError:
+            logger.error("poppler未安装或不在PATH中。请安装poppler并添加到PATH环境变量。")
+            logger.error("Windows安装: https://github.com/oschwartz10612/poppler-windows/releases/")
+            logger.error("或使用: choco install poppler")
+        except Exception as e:
+            caps["poppler"] = True
+            logger.warning(f"poppler检查失败: {str(e)}，但继续尝试...")
+
+        # 检查Tesseract及语言包
+        try:
+            if TESSEROCR_AVAILABLE:
+                caps["version"] = tesseract_version().splitlines()[0]
+                _, caps["languages"] = tesserocr_get_languages()
+                caps["backend"] = "tesserocr"
+            elif PYTESSERACT_AVAILABLE:
+                caps["version"] = str(pytesseract.get_tesseract_version())
+                caps["languages"] = pytesseract.get_languages()
+                caps["backend"] = "pytesseract"
+            caps["tesseract"] = caps["backend"] is not None
+            logger.info(f"Tesseract版本: {caps['version']}（{caps['backend']}）")
+            if caps["backend"] == "pytesseract":
+                logger.info("未安装tesserocr，每识别一页都会启动一个tesseract进程；安装后使用常驻引擎（见 OCR_SETUP.md）")
+            logger.info(f"可用语言包: {', '.join(caps['languages'])}")
+        except Exception as e:
+            logger.error(f"Tesseract检查失败: {str(e)}")
+            logger.error("请确保Tesseract已安装并在PATH中")
+
+        # 选择识别语言：缺少的语言包不使用
+        wanted = [lang for lang in Config.OCR_LANG.split("+") if lang]
+        available = [lang for lang in wanted if lang in caps["languages"]]
+        if "chi_sim" in wanted and "chi_sim" not in available:
+            logger.warning("中文语言包(chi_sim)未安装，将使用英文识别")
+        caps["lang"] = "+".join(available) if available else "eng"
+
+        _capabilities = caps
+        return caps
+
+
+def init_worker(lang: str):
+    """
+    OCR进程池的子进程初始化函数：记录识别语言并预先创建引擎（加载语言模型）
+
+    Args:
+        lang: 识别语言，如 chi_sim+eng
+    """
+    global _worker_lang
+    _worker_lang = lang
+    if TESSEROCR_AVAILABLE:
+        _get_engine(lang)
+
+
+def current_lang() -> str:
+    """当前进程使用的识别语言"""
+    return _worker_lang or probe_capabilities()["lang"]
+
+
+def _get_engine(lang: str):
+    """获取当前线程的常驻tesserocr引擎（首次调用时创建并加载语言模型）"""
+    engine = getattr(_local, "engine", None)
+    if engine is None or getattr(_local, "lang", None) != lang:
+        if engine is not None:
+            engine.End()
+        engine = PyTessBaseAPI(lang=lang)
+        _local.engine = engine
+        _local.lang = lang
+        logger.info(f"创建Tesseract引擎: {lang}")
+    return engine
+
+
+def recognize(image) -> str:
+    """
+    识别单张页面图片
+
+    优先使用常驻的tesserocr引擎（只有识别本身的开销），
+    未安装tesserocr时退回pytesseract（每次调用启动一个tesseract进程）。
+
+    Args:
+        image: PIL图片
+
+    Returns:
+        识别出的文本
+    """
+    lang = current_lang()
+    if TESSEROCR_AVAILABLE:
+        engine = _get_engine(lang)
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+def recognize_with_confidence(image) -> Tuple[str, float]:
+    """
+    识别单张页面图片，同时返回平均置信度（用于快速模式判断是否需要高DPI重新识别）
+
+    Args:
+        image: PIL图片
+
+    Returns:
+        (识别出的文本, 平均置信度 0-100，没有识别出文字时为0)
+    """
+    lang = current_lang()
+    if TESSEROCR_AVAILABLE:
+        engine = _get_engine(lang)
+        engine.SetImage(image)
+        text = engine.GetUTF8Text()
+        return text, float(engine.MeanTextConf()) if text.strip() else 0.0
+
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, sum(confidences) / len(confidences) if confidences else 0.0
@@ -0,0 +1,176 @@
+from config import Config
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def choose_dpi(
+    page_size: Optional[Tuple[float, float]],
+    base_dpi: int,
+    text_height: Optional[float] = None,
+    current_dpi: Optional[int] = None
+) -> int:
+    """
+    根据页面尺寸和估计的文字高度选择渲染DPI
+
+    - 文字高度已知时，按比例调整DPI使文字行高接近 OCR_TARGET_TEXT_PX（Tesseract的最佳识别尺寸）
+    - 页面很大（如A3、图纸）时限制DPI，使长边像素不超过 OCR_MAX_LONG_SIDE_PX
+
+    Args:
+        page_size: 页面尺寸（宽, 高），单位为点（1/72英寸），未知时为None
+        base_dpi: 基础DPI
+        text_height: 在 current_dpi 下测得的文字行高（像素）
+        current_dpi: 测量文字行高时使用的DPI
+
+    Returns:
+        渲染DPI
+    """
+    dpi = float(base_dpi)
+    if text_height and current_dpi:
+        dpi = current_dpi * Config.OCR_TARGET_TEXT_PX / text_height
+
+    dpi = min(max(dpi, Config.OCR_MIN_DPI), Config.OCR_MAX_DPI)
+
+    if page_size:
+        long_side_inches = max(page_size) / 72.0
+        if long_side_inches > 0:
+            dpi = min(dpi, Config.OCR_MAX_LONG_SIDE_PX / long_side_inches)
+    return max(int(dpi), 1)
+
+
+def to_grayscale(image):
+    """转换为灰度图"""
+    return image if image.mode == "L" else image.convert("L")
+
+
+def otsu_threshold(image) -> int:
+    """使用Otsu方法计算灰度图的二值化阈值"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    if not total:
+        return 128
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold, best_variance = 128, -1.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def binarize(image):
+    """灰度图二值化（文字为黑色，背景为白色）"""
+    threshold = otsu_threshold(image)
+    return image.point(lambda value: 255 if value > threshold else 0, mode="L")
+
+
+def _ink_rows(image) -> "np.ndarray":
+    """每行深色像素的数量"""
+    return (np.asarray(image) < 128).sum(axis=1)
+
+
+def estimate_skew(image, max_angle: float = None, step: float = 0.5) -> float:
+    """
+    使用投影轮廓法估计倾斜角度：文字行水平时，行投影的方差最大
+
+    Args:
+        image: 二值化灰度图
+        max_angle: 搜索的最大角度（度）
+        step: 搜索步长（度）
+
+    Returns:
+        倾斜角度（度），将图片按该角度旋转即可校正
+    """
+    if not NUMPY_AVAILABLE:
+        return 0.0
+    max_angle = Config.OCR_MAX_SKEW if max_angle is None else max_angle
+
+    # 缩小后搜索，降低计算量
+    scale = min(1.0, 800.0 / max(image.size))
+    small = image.resize((max(int(image.width * scale), 1), max(int(image.height * scale), 1)))
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(max_angle / step)
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rotated = small.rotate(angle, expand=False, fillcolor=255)
+        score = float(np.var(_ink_rows(rotated)))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def deskew(image):
+    """校正页面倾斜（角度很小时不旋转）"""
+    angle = estimate_skew(image)
+    if abs(angle) < 0.25:
+        return image
+    logger.debug(f"校正页面倾斜: {angle:.1f}°")
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def estimate_text_height(image) -> Optional[float]:
+    """
+    估计文字行高（像素）：取行投影中连续有墨迹的行段高度的中位数
+
+    Args:
+        image: 二值化灰度图
+
+    Returns:
+        文字行高，无法估计时返回None
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    rows = _ink_rows(image) > max(2, image.width // 200)
+    heights = []
+    run = 0
+    for has_ink in rows:
+        if has_ink:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+    heights = [h for h in heights if h >= 3]
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+def preprocess(image):
+    """
+    OCR前的预处理：灰度化、倾斜校正、二值化
+
+    Args:
+        image: PIL图片
+
+    Returns:
+        预处理后的二值化灰度图
+    """
+    gray = to_grayscale(image)
+    gray = deskew(binarize(gray)) if NUMPY_AVAILABLE else gray
+    return binarize(gray)
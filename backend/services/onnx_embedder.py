@@ -0,0 +1,241 @@
+from config import Config
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入ONNX Runtime和分词器（可选，未安装时本地模型使用PyTorch推理）
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# 导出目录中的文件
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+METADATA_FILE = "embedder.json"
+
+# 支持的池化方式（与 sentence-transformers 的 Pooling 模块对应）
+POOLING_MODES = ("mean", "cls", "max")
+
+_export_lock = threading.Lock()
+
+
+def model_dir(model_name: str = None, base_dir: str = None) -> str:
+    """模型的导出目录：EMBEDDING_ONNX_DIR 下按模型名建子目录"""
+    model_name = model_name or Config.EMBEDDING_MODEL
+    return os.path.join(base_dir or Config.EMBEDDING_ONNX_DIR, model_name.strip("/").replace("/", "--"))
+
+
+def _pooling_mode(model) -> str:
+    """从 SentenceTransformer 的 Pooling 模块读取池化方式（兼容新旧版本的配置格式）"""
+    pooling = next((module for module in model if type(module).__name__ == "Pooling"), None)
+    if pooling is None:
+        return "cls"
+    config = pooling.get_config_dict()
+    mode = config.get("pooling_mode")
+    if not isinstance(mode, str):
+        if config.get("pooling_mode_cls_token"):
+            mode = "cls"
+        elif config.get("pooling_mode_max_tokens"):
+            mode = "max"
+        elif config.get("pooling_mode_mean_tokens"):
+            mode = "mean"
+    if mode not in POOLING_MODES:
+        raise ValueError(f"不支持的池化方式: {mode}")
+    return mode
+
+
+def export_model(model_name: str = None, output_dir: str = None, quantize: bool = None) -> str:
+    """
+    把 sentence-transformers 模型导出为ONNX
+
+    导出的是Transformer编码器（输出每个token的隐藏状态），池化和归一化在推理时用NumPy计算；
+    分词器文件和池化配置保存在同一目录。quantize 为True时再生成动态int8量化的模型
+    （权重为int8，激活值在运行时量化，不需要校准数据）。需要安装 sentence-transformers、torch 和 onnx。
+
+    Args:
+        model_name: 模型名或本地路径，默认使用 Config.EMBEDDING_MODEL
+        output_dir: 导出目录，默认使用 model_dir(model_name)
+        quantize: 是否生成int8量化模型，默认使用 Config.EMBEDDING_ONNX_QUANTIZE
+
+    Returns:
+        导出目录
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_name = model_name or Config.EMBEDDING_MODEL
+    output_dir = output_dir or model_dir(model_name)
+    quantize = Config.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+
+    with _export_lock:
+        os.makedirs(output_dir, exist_ok=True)
+        model_path = os.path.join(output_dir, MODEL_FILE)
+        if not os.path.exists(model_path):
+            logger.info(f"导出ONNX模型: {model_name} -> {output_dir}")
+            model = SentenceTransformer(model_name, device="cpu")
+            encoder = model[0].auto_model.eval()
+            tokenizer = model.tokenizer
+            sample = tokenizer(["导出示例文本", "sample"], padding=True, return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+            class _Encoder(torch.nn.Module):
+                def __init__(self, module):
+                    super().__init__()
+                    self.module = module
+
+                def forward(self, *inputs):
+                    return self.module(**dict(zip(input_names, inputs)))[0]
+
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+            export_args = dict(
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True,
+            )
+            with torch.no_grad():
+                inputs = tuple(sample[name] for name in input_names)
+                try:
+                    # 新版PyTorch默认使用dynamo导出，这里固定使用基于TorchScript的导出（支持 dynamic_axes）
+                    torch.onnx.export(_Encoder(encoder), inputs, model_path + ".tmp", dynamo=False, **export_args)
+                except TypeError:
+                    torch.onnx.export(_Encoder(encoder), inputs, model_path + ".tmp", **export_args)
+
+            tokenizer.save_pretrained(output_dir)
+            metadata = {
+                "model": model_name,
+                "pooling": _pooling_mode(model),
+                "normalize": any(type(module).__name__ == "Normalize" for module in model),
+                "max_seq_length": model.max_seq_length,
+                "dimension": model.get_sentence_embedding_dimension(),
+                "input_names": input_names,
+            }
+            with open(os.path.join(output_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            os.replace(model_path + ".tmp", model_path)
+            logger.info(f"ONNX模型导出完成: {model_path}")
+
+        quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+        if quantize and not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            logger.info(f"生成int8量化模型: {quantized_path}")
+            quantize_dynamic(model_path, quantized_path + ".tmp", weight_type=QuantType.QInt8)
+            os.replace(quantized_path + ".tmp", quantized_path)
+    return output_dir
+
+
+class OnnxEmbedder:
+    """
+    基于ONNX Runtime的向量模型
+
+    提供与 SentenceTransformer 相同的 encode 接口和 tokenizer 属性，可直接替换 VectorService.local_embedder。
+    一批文本按长度排序后再分批，减少填充；池化（mean/cls/max）和L2归一化与导出时的模型配置一致。
+    """
+
+    def __init__(self, directory: str, quantized: bool = False, threads: int = 0):
+        """
+        Args:
+            directory: export_model 的导出目录
+            quantized: 是否使用int8量化模型
+            threads: 单次推理使用的线程数，0表示由ONNX Runtime决定（物理核数）
+        """
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.pooling = metadata["pooling"]
+        self.normalize = metadata["normalize"]
+        self.max_seq_length = metadata["max_seq_length"]
+        self.dimension = metadata["dimension"]
+        self.quantized = quantized
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_path = os.path.join(directory, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: List[str], batch_size: int = 32, convert_to_numpy: bool = True, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """
+        生成向量
+
+        Args:
+            sentences: 文本列表
+            batch_size: 每次推理的文本数
+
+        Returns:
+            float32数组，形状为 (len(sentences), 维度)
+        """
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]), reverse=True)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            features = self.tokenizer(
+                [sentences[i] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            embeddings[batch] = self._forward(features)
+        return embeddings
+
+    def _forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """一批文本的前向计算和池化"""
+        inputs = {name: features[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, inputs)[0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        elif self.pooling == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+
+def load_embedder(model_name: str = None) -> Optional[OnnxEmbedder]:
+    """
+    加载ONNX向量模型（EMBEDDING_BACKEND=onnx 时使用）
+
+    导出目录中没有模型时先自动导出（需要 sentence-transformers、torch 和 onnx，只在第一次加载时进行），
+    EMBEDDING_ONNX_QUANTIZE 为true时使用int8量化模型。
+
+    Returns:
+        OnnxEmbedder，onnxruntime未安装或导出、加载失败时返回None
+    """
+    if not ONNX_AVAILABLE:
+        logger.warning("onnxruntime未安装，无法使用ONNX向量模型（pip install onnxruntime）")
+        return None
+    model_name = model_name or Config.EMBEDDING_MODEL
+    directory = model_dir(model_name)
+    quantized = Config.EMBEDDING_ONNX_QUANTIZE
+    try:
+        required = [MODEL_FILE, METADATA_FILE] + ([QUANTIZED_MODEL_FILE] if quantized else [])
+        if not all(os.path.exists(os.path.join(directory, name)) for name in required):
+            export_model(model_name, directory, quantized)
+        embedder = OnnxEmbedder(directory, quantized, Config.EMBEDDING_ONNX_THREADS)
+        logger.info(f"ONNX向量模型加载成功: {directory}（{'int8量化' if quantized else 'float32'}）")
+        return embedder
+    except Exception as e:
+        logger.warning(f"ONNX向量模型加载失败: {str(e)}")
+        return None
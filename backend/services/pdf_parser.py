@@ -1,16 +1,21 @@
 import pdfplumber
-from typing import Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from config import Config
+from services import ocr_engine, ocr_cache, ocr_preprocess
+from typing import Optional, Callable, Iterator, List, Dict, Tuple
 import logging
-import os
+import multiprocessing
+import threading
 
 logger = logging.getLogger(__name__)
 
 # OCR相关导入（可选，如果库不存在会有警告但不影响基本功能）
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, pdfinfo_from_path
     import pytesseract
     from PIL import Image
-    from config import Config
     OCR_AVAILABLE = True
     
     # 配置Tesseract路径（如果不在PATH中）
@@ -29,202 +34,459 @@ except ImportError:
     OCR_AVAILABLE = False
     logger.warning("OCR库未安装，扫描版PDF将无法提取文本。安装命令: pip install pytesseract pdf2image Pillow")
 
+# 流式并行提取文本层时每段的最大页数（段越小，第一页产出越早，进程间通信次数越多）
+STREAM_BATCH_PAGES = 16
+
+# 并行提取文本和OCR使用的进程池（多个文档共享，避免并发任务各自创建进程导致CPU超额订阅）
+_process_pools = {}
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(name: str, max_workers: int, initializer=None, initargs=()) -> ProcessPoolExecutor:
+    """
+    获取指定用途的共享进程池（延迟创建）
+
+    Args:
+        name: 进程池用途，如 text、ocr
+        max_workers: 进程数
+        initializer: 子进程初始化函数（如预先创建OCR引擎）
+        initargs: 初始化函数参数
+
+    Returns:
+        进程池
+    """
+    with _process_pool_lock:
+        if name not in _process_pools:
+            # 使用spawn启动子进程：服务进程中有多个线程，fork可能复制到被占用的锁
+            _process_pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs
+            )
+            logger.info(f"创建进程池: {name}，进程数: {max_workers}")
+        return _process_pools[name]
+
+def _discard_process_pool(name: str):
+    """丢弃已损坏的进程池（子进程异常退出后不可再用），下次使用时重新创建"""
+    with _process_pool_lock:
+        pool = _process_pools.pop(name, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"进程池已损坏，将重新创建: {name}")
+
+def _extract_page_range_with_sizes(file_path: str, start: int, end: int) -> List[Tuple[str, Tuple[float, float]]]:
+    """
+    在子进程中提取指定页范围的文本和页面尺寸（流式提取使用，尺寸用于OCR时选择DPI）
+
+    Args:
+        file_path: PDF文件路径
+        start: 起始页（从0开始，包含）
+        end: 结束页（不包含）
+
+    Returns:
+        各页的 (文本, (宽, 高))，提取失败的页文本为空字符串
+    """
+    results = []
+    with pdfplumber.open(file_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            try:
+                text = page.extract_text() or ""
+            except Exception as e:
+                logger.error(f"第 {page.page_number} 页文本提取失败: {str(e)}")
+                text = ""
+            results.append((text, (float(page.width), float(page.height))))
+            page.flush_cache()
+    return results
+
+def _ocr_page(file_path: str, page_number: int, page_size: Optional[Tuple[float, float]] = None) -> Tuple[str, bool]:
+    """
+    渲染并识别单个页面（可在子进程中执行，每次只在内存中保留一页图片）
+
+    渲染后的页面图片先查OCR缓存，相同页面（封面、模板页等）不再调用Tesseract。
+    启用自适应DPI时，先按页面尺寸选择DPI，再根据测得的文字行高调整；
+    快速模式下先用低DPI识别，平均置信度低于 OCR_MIN_CONFIDENCE 时才用高DPI重新识别。
+
+    Args:
+        file_path: PDF文件路径
+        page_number: 页码（从1开始）
+        page_size: 页面尺寸（宽, 高），单位为点，未知时为None
+
+    Returns:
+        (识别出的文本（已去除首尾空白）, 是否命中缓存)
+    """
+    fast = Config.OCR_FAST_MODE
+    base_dpi = Config.OCR_FAST_DPI if fast else Config.OCR_DPI
+    dpi = ocr_preprocess.choose_dpi(page_size, base_dpi) if Config.OCR_ADAPTIVE_DPI else base_dpi
+    image = PDFParser._render_page(file_path, page_number, dpi)
+    if image is None:
+        logger.warning(f"第 {page_number} 页转换为图片失败：未生成任何图片")
+        return "", False
+    
+    try:
+        cache = ocr_cache.get_cache()
+        cache_key = None
+        if cache:
+            variant = f"pre={int(Config.OCR_PREPROCESS)},adaptive={int(Config.OCR_ADAPTIVE_DPI)},fast={int(fast)}"
+            cache_key = cache.make_key(image, ocr_engine.current_lang(), dpi, variant)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached, True
+        
+        # 使用常驻的Tesseract引擎识别（语言由环境探测结果决定，如 chi_sim+eng）
+        if fast:
+            text = _ocr_fast(file_path, page_number, page_size, image, dpi)
+        else:
+            text = _ocr_adaptive(file_path, page_number, page_size, image, dpi)
+        text = text.strip()
+        if cache:
+            cache.put(cache_key, text)
+        return text, False
+    finally:
+        image.close()
+
+def _prepare_image(image):
+    """识别前的预处理（未启用时原样返回）"""
+    return ocr_preprocess.preprocess(image) if Config.OCR_PREPROCESS else image
+
+def _ocr_adaptive(file_path: str, page_number: int, page_size, image, dpi: int) -> str:
+    """按测得的文字行高调整分辨率后识别：文字过小时重新渲染，文字过大时缩小图片"""
+    prepared = _prepare_image(image)
+    text_height = ocr_preprocess.estimate_text_height(prepared) if Config.OCR_ADAPTIVE_DPI else None
+    if text_height:
+        target_dpi = ocr_preprocess.choose_dpi(page_size, dpi, text_height, dpi)
+        if target_dpi > dpi * 1.25:
+            logger.debug(f"第 {page_number} 页文字较小（行高 {text_height:.0f}px），使用 {target_dpi} DPI 重新渲染")
+            rerendered = PDFParser._render_page(file_path, page_number, target_dpi)
+            if rerendered is not None:
+                prepared = _prepare_image(rerendered)
+        elif target_dpi < dpi * 0.75:
+            scale = target_dpi / dpi
+            prepared = prepared.resize((max(int(prepared.width * scale), 1), max(int(prepared.height * scale), 1)))
+    return ocr_engine.recognize(prepared)
+
+def _ocr_fast(file_path: str, page_number: int, page_size, image, dpi: int) -> str:
+    """快速模式：先用低DPI识别，置信度不足时再用高DPI识别，取置信度较高的结果"""
+    prepared = _prepare_image(image)
+    text, confidence = ocr_engine.recognize_with_confidence(prepared)
+    if confidence >= Config.OCR_MIN_CONFIDENCE:
+        return text
+    
+    text_height = ocr_preprocess.estimate_text_height(prepared) if Config.OCR_ADAPTIVE_DPI else None
+    retry_dpi = max(
+        ocr_preprocess.choose_dpi(page_size, Config.OCR_DPI, text_height, dpi),
+        ocr_preprocess.choose_dpi(page_size, Config.OCR_DPI)
+    )
+    if retry_dpi <= dpi:
+        return text
+    
+    logger.debug(f"第 {page_number} 页置信度较低（{confidence:.0f}），使用 {retry_dpi} DPI 重新识别")
+    rerendered = PDFParser._render_page(file_path, page_number, retry_dpi)
+    if rerendered is None:
+        return text
+    retry_text, retry_confidence = ocr_engine.recognize_with_confidence(_prepare_image(rerendered))
+    return retry_text if retry_confidence >= confidence else text
+
 class PDFParser:
     """PDF解析器"""
     
     @staticmethod
-    def extract_text(file_path: str, use_ocr: bool = False) -> Optional[str]:
+    def _iter_text_layer(pdf, start: int = 0) -> Iterator[Tuple[int, str, Tuple[float, float]]]:
+        """在当前进程中逐页提取文本层，产出 (页码, 文本, 页面尺寸)"""
+        for i in range(start, len(pdf.pages)):
+            page = pdf.pages[i]
+            page_number = i + 1
+            try:
+                text = page.extract_text() or ""
+            except Exception as e:
+                logger.error(f"第 {page_number} 页文本提取失败: {str(e)}")
+                text = ""
+            page_size = (float(page.width), float(page.height))
+            page.flush_cache()  # 释放已解析的页面对象，保持内存平稳
+            yield page_number, text, page_size
+    
+    @staticmethod
+    def _iter_text_layer_parallel(pdf, file_path: str, total_pages: int) -> Iterator[Tuple[int, str, Tuple[float, float]]]:
+        """
+        用进程池提取文本层，仍按页码顺序逐页产出 (页码, 文本, 页面尺寸)
+        
+        页面按 STREAM_BATCH_PAGES 页一段提交，同时最多有 2×进程数 段在处理，按提交顺序等待结果，
+        内存中只保留这些段的文本。进程池异常退出时，剩余页面改为在当前进程中提取。
+        """
+        workers = Config.PDF_PARSE_WORKERS
+        pool = _get_process_pool("text", workers)
+        batch = min(STREAM_BATCH_PAGES, max(1, -(-total_pages // (workers * 4))))
+        in_flight = deque()
+        next_page = 0  # 下一个要产出的页（从0开始）
+        
+        def drain() -> Iterator[Tuple[int, str, Tuple[float, float]]]:
+            nonlocal next_page
+            start, future = in_flight.popleft()
+            for offset, (text, page_size) in enumerate(future.result()):
+                next_page = start + offset + 1
+                yield start + offset + 1, text, page_size
+        
+        try:
+            for start in range(0, total_pages, batch):
+                in_flight.append((start, pool.submit(_extract_page_range_with_sizes, file_path, start, min(start + batch, total_pages))))
+                if len(in_flight) >= workers * 2:
+                    yield from drain()
+            while in_flight:
+                yield from drain()
+        except BrokenProcessPool:
+            _discard_process_pool("text")
+            logger.warning(f"文本提取进程池异常退出，从第 {next_page + 1} 页起改为逐页提取")
+            in_flight.clear()
+            yield from PDFParser._iter_text_layer(pdf, next_page)
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的提取任务
+            for _, future in in_flight:
+                future.cancel()
+    
+    @staticmethod
+    def extract_text(
+        file_path: str,
+        use_ocr: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[str]:
         """
         从PDF文件中提取文本内容
         
         Args:
             file_path: PDF文件路径
-            use_ocr: 如果无法提取文本，是否尝试OCR识别
+            use_ocr: 是否对没有文本层（或文本过少）的页面进行OCR识别
+            progress_callback: 进度回调，参数为(已处理页数, 总页数)
             
         Returns:
             提取的文本内容，如果失败返回None
         """
-        # 首先尝试pdfplumber提取文本
-        try:
-            text_content = []
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-            
-            if text_content:
-                logger.info(f"成功从PDF提取文本: {len(text_content)} 页")
-                return "\n\n".join(text_content)
-            
-            logger.warning(f"PDF文件 {file_path} 无法通过pdfplumber提取文本，可能是扫描版PDF")
-            
-            # 如果无法提取文本且允许OCR，尝试OCR识别
-            if use_ocr and OCR_AVAILABLE:
-                logger.info(f"尝试使用OCR识别PDF文本: {file_path}")
-                return PDFParser._extract_text_with_ocr(file_path)
-            
-            return None
-        
-        except Exception as e:
-            import traceback
-            logger.error(f"解析PDF文件失败: {str(e)}")
-            logger.error(f"错误详情: {traceback.format_exc()}")
-            # 如果基本解析失败，尝试OCR
-            if use_ocr and OCR_AVAILABLE:
-                logger.info(f"尝试使用OCR识别PDF文本: {file_path}")
-                try:
-                    return PDFParser._extract_text_with_ocr(file_path)
-                except Exception as ocr_error:
-                    import traceback
-                    logger.error(f"OCR识别失败: {str(ocr_error)}")
-                    logger.error(f"OCR错误详情: {traceback.format_exc()}")
-            return None
+        page_texts, _ = PDFParser.extract_pages(file_path, use_ocr, progress_callback)
+        text_content = [text for text in page_texts if text]
+        return "\n\n".join(text_content) if text_content else None
     
     @staticmethod
-    def _extract_text_with_ocr(file_path: str) -> Optional[str]:
+    def iter_pages(
+        file_path: str,
+        use_ocr: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        ocr_progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Iterator[Tuple[int, str, bool]]:
         """
-        使用OCR从PDF中提取文本（用于扫描版PDF）
+        逐页流式提取文本（生成器），按页码顺序产出每一页
+        
+        有文本层的页面直接使用文本层，只有文本为空或过少的页面才渲染为图片进行OCR识别
+        （适用于数字正文后附扫描版附录的混合文档），pdfplumber无法解析时对所有页面OCR。
+        不等整个文档处理完：调用方可以边解析边分块和向量化。处理中的页面不超过 OCR_WINDOW_PAGES 页，
+        扫描页交给OCR进程池识别时，后续页面继续提取文本层，因此内存占用与文档页数无关。
+        页数达到 PDF_PARALLEL_PAGE_THRESHOLD 时，文本层也由进程池分段并行提取（按顺序、有窗口地等待结果）。
         
         Args:
             file_path: PDF文件路径
+            use_ocr: 是否对文本过少的页面进行OCR识别
+            progress_callback: 文本层提取进度回调，参数为(已处理页数, 总页数)
+            ocr_progress_callback: OCR进度回调，参数为(已识别页数, 目前发现的需识别页数)
             
-        Returns:
-            提取的文本内容，如果失败返回None
+        Yields:
+            (页码（从1开始）, 页面文本, 是否使用了OCR识别结果)
         """
-        if not OCR_AVAILABLE:
-            logger.error("OCR库未安装，无法进行OCR识别")
-            return None
+        ocr_enabled = use_ocr and OCR_AVAILABLE
+        if ocr_enabled:
+            capabilities = ocr_engine.probe_capabilities()
+            ocr_enabled = capabilities["poppler"] and capabilities["tesseract"]
         
+        pdf = None
         try:
-            # 检查poppler是否可用
-            import subprocess
+            pdf = pdfplumber.open(file_path)
+        except Exception as e:
+            logger.error(f"解析PDF文件失败: {str(e)}")
+            if not ocr_enabled:
+                return
+            # 基本解析失败时，对所有页面进行OCR识别（页数通过poppler获取）
             try:
-                result = subprocess.run(['pdftoppm', '-v'], capture_output=True, text=True, timeout=5)
-                logger.info(f"poppler检查: pdftoppm可用")
-            except FileNotFoundError:
-                logger.error("poppler未安装或不在PATH中。请安装poppler并添加到PATH环境变量。")
-                logger.error("Windows安装: https://github.com/oschwartz10612/poppler-windows/releases/")
-                logger.error("或使用: choco install poppler")
-                return None
-            except Exception as e:
-                logger.warning(f"poppler检查失败: {str(e)}，但继续尝试...")
-            
-            # 将PDF转换为图片
-            logger.info(f"正在将PDF转换为图片: {file_path}")
-            logger.info(f"文件大小: {os.path.getsize(file_path) / 1024 / 1024:.2f} MB")
-            
+                total_pages = PDFParser._get_page_count_for_ocr(file_path)
+            except Exception as count_error:
+                logger.error(f"获取PDF页数失败，无法进行OCR识别: {str(count_error)}")
+                return
+            logger.info(f"尝试使用OCR识别PDF文本: {file_path}, 共 {total_pages} 页")
+        
+        pool = None
+        if ocr_enabled and Config.OCR_WORKERS > 1:
+            pool = _get_process_pool(
+                "ocr",
+                Config.OCR_WORKERS,
+                initializer=ocr_engine.init_worker,
+                initargs=(capabilities["lang"],)
+            )
+        window = max(Config.OCR_WINDOW_PAGES, 1)
+        ocr_state = {"found": 0, "done": 0}
+        
+        def ready(entry) -> bool:
+            return not isinstance(entry[2], Future) or entry[2].done()
+        
+        def resolve(entry) -> Tuple[int, str, bool]:
+            """等待页面的OCR结果（如有），OCR文本比文本层长时使用OCR文本"""
+            page_number, text, ocr_result = entry
+            if ocr_result is None:
+                return page_number, text, False
             try:
-                # 如果配置了POPPLER_PATH，使用它
-                if Config.POPPLER_PATH:
-                    logger.info(f"使用配置的Poppler路径: {Config.POPPLER_PATH}")
-                    images = convert_from_path(
-                        file_path, 
-                        dpi=200,
-                        poppler_path=Config.POPPLER_PATH
-                    )
-                else:
-                    images = convert_from_path(file_path, dpi=200)  # 200 DPI 平衡质量和速度
-            except Exception as pdf_error:
-                import traceback
-                logger.error(f"PDF转图片失败: {str(pdf_error)}")
-                logger.error(f"错误类型: {type(pdf_error).__name__}")
-                logger.error(f"错误详情: {traceback.format_exc()}")
-                
-                # 提供详细的解决建议
-                logger.error("=" * 60)
-                logger.error("Poppler配置建议:")
-                if not Config.POPPLER_PATH:
-                    logger.error("1. 如果poppler已安装但不在PATH中，请在.env文件中设置:")
-                    logger.error("   POPPLER_PATH=C:\\poppler\\Library\\bin")
-                    logger.error("2. 或添加到系统PATH环境变量")
-                logger.error("3. Windows下载: https://github.com/oschwartz10612/poppler-windows/releases/")
-                logger.error("4. 或使用: choco install poppler")
-                logger.error("=" * 60)
-                
+                if isinstance(ocr_result, Future):
+                    ocr_result = ocr_result.result()
+                collected = {}
+                PDFParser._collect_ocr_result(collected, page_number, *ocr_result)
+                ocr_text = collected.get(page_number, "")
+            except BrokenProcessPool:
                 raise
-            
-            if not images:
-                logger.warning("PDF转换为图片失败：未生成任何图片")
-                return None
-            
-            logger.info(f"成功转换 {len(images)} 页为图片，开始OCR识别...")
-            
-            # 检查Tesseract是否可用
-            try:
-                tesseract_version = pytesseract.get_tesseract_version()
-                logger.info(f"Tesseract版本: {tesseract_version}")
-            except Exception as e:
-                logger.error(f"Tesseract检查失败: {str(e)}")
-                logger.error("请确保Tesseract已安装并在PATH中")
-                return None
-            
-            # 检查中文语言包
-            try:
-                langs = pytesseract.get_languages()
-                logger.info(f"可用语言包: {', '.join(langs)}")
-                if 'chi_sim' not in langs:
-                    logger.warning("中文语言包(chi_sim)未安装，将使用英文识别")
             except Exception as e:
-                logger.warning(f"无法检查语言包: {str(e)}")
-            
-            # 对每页进行OCR识别
-            text_content = []
-            for i, image in enumerate(images):
-                try:
-                    logger.info(f"开始OCR识别第 {i+1}/{len(images)} 页...")
-                    # 使用pytesseract进行OCR（支持中文）
-                    try:
-                        text = pytesseract.image_to_string(image, lang='chi_sim+eng')  # 中文简体+英文
-                    except Exception as lang_error:
-                        logger.warning(f"使用中文语言包失败: {str(lang_error)}，尝试仅使用英文")
-                        text = pytesseract.image_to_string(image, lang='eng')
-                    
-                    if text.strip():
-                        text_content.append(text.strip())
-                        logger.info(f"第 {i+1} 页OCR识别成功，文本长度: {len(text.strip())} 字符")
+                logger.error(f"第 {page_number} 页OCR识别失败: {str(e)}")
+                ocr_text = ""
+            ocr_state["done"] += 1
+            if ocr_progress_callback:
+                ocr_progress_callback(ocr_state["done"], ocr_state["found"])
+            if len(ocr_text) > len(text.strip()):
+                return page_number, ocr_text, True
+            return page_number, text, False
+        
+        # 处理中的页面：(页码, 文本层, OCR结果)，OCR结果为None（不需要OCR）、Future或(文本, 是否命中缓存)
+        pending = deque()
+        try:
+            if pdf is None:
+                text_layer = ((page_number, "", None) for page_number in range(1, total_pages + 1))
+            else:
+                total_pages = len(pdf.pages)
+                if Config.PDF_PARSE_WORKERS > 1 and total_pages >= Config.PDF_PARALLEL_PAGE_THRESHOLD:
+                    # 大文档：多进程并行提取文本层
+                    logger.info(f"使用 {Config.PDF_PARSE_WORKERS} 个进程并行提取文本: {total_pages} 页")
+                    text_layer = PDFParser._iter_text_layer_parallel(pdf, file_path, total_pages)
+                else:
+                    text_layer = PDFParser._iter_text_layer(pdf)
+            for page_number, text, page_size in text_layer:
+                if progress_callback:
+                    progress_callback(page_number, total_pages)
+                
+                ocr_result = None
+                if ocr_enabled and (pdf is None or len(text.strip()) < Config.OCR_MIN_PAGE_CHARS):
+                    ocr_state["found"] += 1
+                    if pool:
+                        ocr_result = pool.submit(_ocr_page, file_path, page_number, page_size)
                     else:
-                        logger.warning(f"第 {i+1} 页OCR未识别到文本")
-                except Exception as e:
-                    import traceback
-                    logger.error(f"第 {i+1} 页OCR识别失败: {str(e)}")
-                    logger.error(f"错误详情: {traceback.format_exc()}")
-                    continue
+                        try:
+                            ocr_result = _ocr_page(file_path, page_number, page_size)
+                        except Exception as e:
+                            logger.error(f"第 {page_number} 页OCR识别失败: {str(e)}")
+                            ocr_result = ("", False)
+                pending.append((page_number, text, ocr_result))
+                
+                # 按页码顺序产出已就绪的页面；窗口已满时等待最早的页面
+                while pending and (len(pending) >= window or ready(pending[0])):
+                    yield resolve(pending.popleft())
             
-            if not text_content:
-                logger.warning("OCR识别完成，但未提取到文本")
-                return None
+            while pending:
+                yield resolve(pending.popleft())
+        except BrokenProcessPool:
+            _discard_process_pool("ocr")
+            raise
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的OCR任务
+            for _, _, ocr_result in pending:
+                if isinstance(ocr_result, Future):
+                    ocr_result.cancel()
+            if pdf is not None:
+                pdf.close()
+        
+        if ocr_state["found"]:
+            logger.info(f"OCR识别完成: {ocr_state['found']}/{total_pages} 页")
+            cache = ocr_cache.get_cache()
+            if cache:
+                cache.evict()
+                logger.info(f"OCR缓存统计: {cache.stats()}")
+    
+    @staticmethod
+    def extract_pages(
+        file_path: str,
+        use_ocr: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        ocr_progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[List[str], List[int]]:
+        """
+        逐页提取文本并一次性返回（收集 iter_pages 的全部结果，规则与之相同）
+        
+        Args:
+            file_path: PDF文件路径
+            use_ocr: 是否对文本过少的页面进行OCR识别
+            progress_callback: 文本层提取进度回调，参数为(已处理页数, 总页数)
+            ocr_progress_callback: OCR进度回调，参数为(已识别页数, 目前发现的需识别页数)
             
-            result = "\n\n".join(text_content)
-            logger.info(f"OCR识别完成，共提取 {len(text_content)} 页文本，总长度: {len(result)}")
-            return result
+        Returns:
+            (按页码顺序排列的各页文本, 使用OCR识别结果的页码列表（从1开始）)
+        """
+        page_texts = []
+        ocr_pages = []
+        for page_number, text, used_ocr in PDFParser.iter_pages(file_path, use_ocr, progress_callback, ocr_progress_callback):
+            page_texts.append(text)
+            if used_ocr:
+                ocr_pages.append(page_number)
+        if page_texts and not any(text.strip() for text in page_texts):
+            logger.warning(f"PDF文件 {file_path} 未提取到文本，可能是扫描版PDF")
+        return page_texts, ocr_pages
+    
+    @staticmethod
+    def _collect_ocr_result(text_content: Dict[int, str], page_number: int, text: str, cache_hit: bool = False):
+        """记录单页OCR结果（子进程中的缓存命中情况在父进程汇总）"""
+        cache = ocr_cache.get_cache()
+        if cache:
+            cache.record(cache_hit)
+        if text:
+            text_content[page_number] = text
+            logger.info(f"第 {page_number} 页OCR识别成功{'（缓存）' if cache_hit else ''}，文本长度: {len(text)} 字符")
+        else:
+            logger.warning(f"第 {page_number} 页OCR未识别到文本")
+    
+    @staticmethod
+    def _render_page(file_path: str, page_number: int, dpi: int = None):
+        """
+        将PDF的单个页面渲染为图片
         
-        except Exception as e:
+        Args:
+            file_path: PDF文件路径
+            page_number: 页码（从1开始）
+            dpi: 渲染分辨率，默认使用 Config.OCR_DPI（200 DPI 平衡质量和速度）
+            
+        Returns:
+            PIL图片，如果失败返回None
+        """
+        try:
+            images = convert_from_path(
+                file_path,
+                dpi=dpi or Config.OCR_DPI,
+                first_page=page_number,
+                last_page=page_number,
+                poppler_path=Config.POPPLER_PATH  # 为None时使用PATH中的poppler
+            )
+        except Exception as pdf_error:
             import traceback
-            logger.error(f"OCR识别过程失败: {str(e)}")
-            logger.error(f"错误类型: {type(e).__name__}")
-            logger.error(f"完整错误信息: {traceback.format_exc()}")
+            logger.error(f"PDF转图片失败: {str(pdf_error)}")
+            logger.error(f"错误类型: {type(pdf_error).__name__}")
+            logger.error(f"错误详情: {traceback.format_exc()}")
             
-            # 提供具体的解决建议
-            error_str = str(e).lower()
-            if 'poppler' in error_str or 'pdftoppm' in error_str:
-                logger.error("=" * 60)
-                logger.error("poppler未正确安装或配置")
-                logger.error("解决方案:")
-                logger.error("1. Windows: 下载 https://github.com/oschwartz10612/poppler-windows/releases/")
-                logger.error("2. 解压后添加到PATH环境变量")
-                logger.error("3. 或使用: choco install poppler")
-                logger.error("=" * 60)
-            elif 'tesseract' in error_str:
-                logger.error("=" * 60)
-                logger.error("Tesseract未正确安装或配置")
-                logger.error("解决方案:")
-                logger.error("1. 下载安装: https://github.com/UB-Mannheim/tesseract/wiki")
-                logger.error("2. 确保添加到PATH环境变量")
-                logger.error("3. 安装中文语言包到tessdata目录")
-                logger.error("=" * 60)
+            # 提供详细的解决建议
+            logger.error("=" * 60)
+            logger.error("Poppler配置建议:")
+            if not Config.POPPLER_PATH:
+                logger.error("1. 如果poppler已安装但不在PATH中，请在.env文件中设置:")
+                logger.error("   POPPLER_PATH=C:\\poppler\\Library\\bin")
+                logger.error("2. 或添加到系统PATH环境变量")
+            logger.error("3. Windows下载: https://github.com/oschwartz10612/poppler-windows/releases/")
+            logger.error("4. 或使用: choco install poppler")
+            logger.error("=" * 60)
             
-            return None
+            raise
+        
+        return images[0] if images else None
+    
+    @staticmethod
+    def _get_page_count_for_ocr(file_path: str) -> int:
+        """pdfplumber无法解析时，通过poppler获取页数"""
+        info = pdfinfo_from_path(file_path, poppler_path=Config.POPPLER_PATH)
+        return int(info.get("Pages", 0))
     
     @staticmethod
     def get_page_count(file_path: str) -> int:
@@ -0,0 +1,64 @@
+from config import Config
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from typing import Any, Dict, Optional
+import httpx
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 进程内共享的客户端，键为 (是否异步, 是否使用gRPC)
+_clients: Dict[tuple, Any] = {}
+_lock = threading.Lock()
+
+
+def client_options(prefer_grpc: Optional[bool] = None, host: str = None, port: int = None) -> Dict[str, Any]:
+    """
+    创建Qdrant客户端的参数
+
+    REST 使用带keep-alive的HTTP连接池（QDRANT_POOL_SIZE 个连接），
+    gRPC 在一条HTTP/2通道上复用所有请求，批量写入时向量以二进制传输，比JSON小得多。
+    """
+    pool_size = Config.QDRANT_POOL_SIZE
+    return {
+        "host": host or Config.QDRANT_HOST,
+        "port": port or Config.QDRANT_PORT,
+        "grpc_port": Config.QDRANT_GRPC_PORT,
+        "prefer_grpc": Config.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc,
+        "timeout": Config.QDRANT_TIMEOUT,
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    }
+
+
+def create_client(prefer_grpc: Optional[bool] = None, host: str = None, port: int = None) -> QdrantClient:
+    """创建一个新的同步客户端（不共享，供基准测试等需要独立连接的场景使用）"""
+    return QdrantClient(**client_options(prefer_grpc, host, port))
+
+
+def get_client(prefer_grpc: Optional[bool] = None) -> QdrantClient:
+    """
+    获取进程内共享的同步客户端（线程安全，向量服务和命令行工具共用）
+
+    Args:
+        prefer_grpc: 是否使用gRPC，默认使用 QDRANT_PREFER_GRPC
+    """
+    return _get(False, Config.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc)
+
+
+def get_async_client(prefer_grpc: Optional[bool] = None) -> AsyncQdrantClient:
+    """获取进程内共享的异步客户端（只能在同一个事件循环中使用）"""
+    return _get(True, Config.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc)
+
+
+def _get(is_async: bool, prefer_grpc: bool):
+    key = (is_async, prefer_grpc)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client_class = AsyncQdrantClient if is_async else QdrantClient
+            client = client_class(**client_options(prefer_grpc))
+            _clients[key] = client
+            transport = "gRPC" if prefer_grpc else "REST"
+            logger.info(f"创建{'异步' if is_async else ''}Qdrant客户端: {Config.QDRANT_HOST} ({transport})")
+        return client
+
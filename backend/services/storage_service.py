@@ -0,0 +1,189 @@
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+from config import Config
+from database import SessionLocal
+from models import PDFFile
+from typing import Tuple
+import aiofiles
+import aiofiles.os
+import hashlib
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class FileTooLargeError(Exception):
+    """上传文件超过大小限制"""
+    pass
+
+
+class StorageService:
+    """文件存储服务（上传文件按内容SHA-256存放，相同内容只保存一份）"""
+
+    @staticmethod
+    def blob_path(content_hash: str) -> str:
+        """
+        获取内容哈希对应的存储路径
+
+        Args:
+            content_hash: 文件内容SHA-256
+
+        Returns:
+            文件路径，如 UPLOAD_DIR/blobs/ab/abcdef....pdf
+        """
+        return os.path.join(Config.UPLOAD_DIR, "blobs", content_hash[:2], f"{content_hash}.pdf")
+
+    @staticmethod
+    def store_blob(temp_path: str, content_hash: str) -> Tuple[str, bool]:
+        """
+        将已保存的临时文件移入内容寻址存储
+
+        内容已存在时保留临时文件：调用方在引用该文件的记录提交后调用 finish_blob，
+        已有文件在此期间被并发的删除请求移除时，用临时文件恢复。
+
+        Args:
+            temp_path: 临时文件路径
+            content_hash: 文件内容SHA-256
+
+        Returns:
+            (存储路径, 是否复用了已有文件)
+        """
+        path = StorageService.blob_path(content_hash)
+        if os.path.exists(path):
+            logger.info(f"文件内容已存在，复用已有文件: {path}")
+            return path, True
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return path, False
+
+    @staticmethod
+    def finish_blob(temp_path: str, path: str):
+        """
+        store_blob 之后、引用该文件的记录提交后调用（上传失败时也应调用，用于清理临时文件）
+
+        共享文件仍存在时删除临时文件；已被并发的删除请求移除时，把临时文件移回原位置。
+
+        Args:
+            temp_path: 临时文件路径
+            path: store_blob 返回的存储路径
+        """
+        if not os.path.exists(temp_path):
+            return
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        logger.warning(f"共享文件已被并发删除，用本次上传的内容恢复: {path}")
+
+    @staticmethod
+    def _is_referenced(db: Session, file_path: str, exclude_id: int) -> bool:
+        """是否还有其他记录引用该文件"""
+        return db.query(PDFFile).filter(
+            PDFFile.file_path == file_path,
+            PDFFile.id != exclude_id
+        ).first() is not None
+
+    @staticmethod
+    def release_blob(db: Session, pdf_file: PDFFile) -> bool:
+        """
+        删除文件记录前调用：没有其他记录引用该文件时才删除磁盘文件
+
+        先把文件改名，再用新的数据库会话确认期间没有新提交的记录引用它（并发上传相同内容），
+        有则改回原名，避免删掉刚上传的文件。
+
+        Args:
+            db: 数据库会话
+            pdf_file: 即将删除的PDF文件记录
+
+        Returns:
+            是否删除了磁盘文件
+        """
+        path = pdf_file.file_path
+        if StorageService._is_referenced(db, path, pdf_file.id):
+            logger.info(f"文件仍被其他记录引用，保留: {path}")
+            return False
+
+        removing_path = f"{path}.{uuid.uuid4().hex}.deleting"
+        try:
+            os.replace(path, removing_path)
+        except FileNotFoundError:
+            return False
+
+        # 当前会话的事务可能看不到其他请求新提交的记录，用新会话重新检查
+        check_db = SessionLocal()
+        try:
+            referenced = StorageService._is_referenced(check_db, path, pdf_file.id)
+        except Exception as e:
+            logger.warning(f"确认文件引用失败: {str(e)}，保留文件")
+            referenced = True
+        finally:
+            check_db.close()
+        if referenced:
+            os.replace(removing_path, path)
+            logger.info(f"文件已被新上传的记录引用，保留: {path}")
+            return False
+
+        os.remove(removing_path)
+        return True
+
+    @staticmethod
+    async def save_upload(
+        upload_file: UploadFile,
+        file_path: str,
+        max_size: int = None,
+        chunk_size: int = None
+    ) -> Tuple[int, str]:
+        """
+        以固定大小的块流式保存上传文件，边写入边检查大小并计算SHA-256
+
+        内存占用只与块大小有关，与文件大小无关。文件先写入临时文件，
+        完整写入后再重命名为目标文件名，失败时删除临时文件。
+
+        Args:
+            upload_file: 上传的文件
+            file_path: 保存路径
+            max_size: 最大文件大小（字节），默认使用 Config.MAX_FILE_SIZE
+            chunk_size: 每次读取的块大小（字节），默认使用 Config.UPLOAD_CHUNK_SIZE
+
+        Returns:
+            (文件大小, SHA-256十六进制摘要)
+
+        Raises:
+            FileTooLargeError: 文件超过大小限制
+        """
+        max_size = max_size or Config.MAX_FILE_SIZE
+        chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+
+        # 客户端声明了大小时提前拒绝，避免无谓的读写
+        declared_size = getattr(upload_file, "size", None)
+        if declared_size is not None and declared_size > max_size:
+            raise FileTooLargeError(f"文件大小超过限制: {declared_size} > {max_size}")
+
+        temp_path = f"{file_path}.part"
+        digest = hashlib.sha256()
+        file_size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as buffer:
+                while True:
+                    chunk = await upload_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > max_size:
+                        raise FileTooLargeError(f"文件大小超过限制: >{max_size}")
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+            await aiofiles.os.replace(temp_path, file_path)
+        except BaseException:
+            # 任何失败（包括超限和客户端断开）都不留下不完整的文件
+            if os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+            raise
+
+        sha256 = digest.hexdigest()
+        logger.info(f"文件已保存: {file_path}, 大小: {file_size} 字节, SHA-256: {sha256}")
+        return file_size, sha256
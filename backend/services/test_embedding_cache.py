@@ -0,0 +1,67 @@
+import pytest
+
+from services.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite3")
+
+
+def test_miss_then_memory_hit(db_path):
+    cache = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="m", dimension=2)
+    assert cache.get_many(["a", "", "b"]) == [None, None, None]
+    cache.put_many(["a", "b"], [[1.0, 2.0], None])
+    assert cache.get_many(["a", "b", "a"]) == [[1.0, 2.0], None, [1.0, 2.0]]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (2, 0, 3)
+    assert stats["disk_entries"] == 1
+
+
+def test_key_normalizes_unicode_and_whitespace(db_path):
+    cache = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="m", dimension=2)
+    cache.put_many(["付款  条款\n ABC"], [[0.5, 1.0]])
+    assert cache.get_many(["付款 条款 ＡＢＣ"]) == [[0.5, 1.0]]
+
+
+def test_lru_evicts_least_recently_used_to_disk_tier(db_path):
+    cache = EmbeddingCache(db_path, memory_items=2, max_entries=100, model="m", dimension=2)
+    cache.put_many(["a", "b"], [[1.0, 0.0], [2.0, 0.0]])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [[3.0, 0.0]])
+    assert cache.stats()["memory_entries"] == 2
+
+    # "b" 最久未使用，已从内存淘汰，从SQLite读回后重新放入内存
+    assert cache.get_many(["b"]) == [[2.0, 0.0]]
+    assert cache.disk_hits == 1
+    assert cache.get_many(["b"]) == [[2.0, 0.0]]
+    assert cache.disk_hits == 1
+
+
+def test_disk_tier_survives_restart_and_model_change_clears_it(db_path):
+    cache = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="m", dimension=2)
+    cache.put_many(["a", "b"], [[0.25, -1.5], [3.0, 4.0]])
+
+    reopened = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="m", dimension=2)
+    assert reopened.get_many(["b", "a"]) == [[3.0, 4.0], [0.25, -1.5]]
+    assert reopened.disk_hits == 2
+
+    other_model = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="other", dimension=2)
+    assert other_model.stats()["disk_entries"] == 0
+    assert other_model.get_many(["a"]) == [None]
+
+
+def test_disk_tier_trims_oldest_entries(db_path):
+    cache = EmbeddingCache(db_path, memory_items=0, max_entries=500, model="m", dimension=2)
+    texts = [f"text {i}" for i in range(1000)]
+    cache.put_many(texts[:500], [[float(i), 0.0] for i in range(500)])
+    cache.put_many(texts[500:], [[float(i), 0.0] for i in range(500, 1000)])
+    assert cache.stats()["disk_entries"] == 500
+    assert cache.get_many(["text 999"]) == [[999.0, 0.0]]
+
+
+def test_vectors_with_other_dimension_are_not_cached(db_path):
+    cache = EmbeddingCache(db_path, memory_items=10, max_entries=100, model="m", dimension=2)
+    cache.put_many(["a", "b"], [[1.0, 2.0, 3.0], [1.0, 2.0]])
+    assert cache.get_many(["a", "b"]) == [None, [1.0, 2.0]]
+    assert cache.stats()["disk_entries"] == 1
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from services.embedding_dispatcher import EmbeddingDispatcher
+
+
+class _Recorder:
+    """记录每次批量调用的文本和批大小，第一批等待 release 后才返回（让后续请求在队列中积压）"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail_on = fail_on
+
+    def __call__(self, texts, batch_size):
+        self.calls.append((list(texts), batch_size))
+        if len(self.calls) == 1:
+            self.started.set()
+            self.release.wait(5)
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("embedding failed")
+        return [[float(len(text))] for text in texts]
+
+
+def _submit(dispatcher, texts, results, batch_size=None):
+    def run():
+        try:
+            results[tuple(texts)] = dispatcher.embed(texts, batch_size)
+        except Exception as e:
+            results[tuple(texts)] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_single_request_returns_vectors_in_order():
+    dispatcher = EmbeddingDispatcher(lambda texts, batch_size: [[float(len(text))] for text in texts], max_batch=8, max_wait_ms=0)
+    assert dispatcher.embed(["a", "bbb", "cc"]) == [[1.0], [3.0], [2.0]]
+    assert dispatcher.embed([]) == []
+
+
+def test_concurrent_requests_are_merged_and_split_back():
+    recorder = _Recorder()
+    dispatcher = EmbeddingDispatcher(recorder, max_batch=100, max_wait_ms=50)
+    results = {}
+    first = _submit(dispatcher, ["x"], results)
+    assert recorder.started.wait(5)
+
+    # 分发线程忙于第一批时到达的请求在下一批中合并
+    threads = [
+        _submit(dispatcher, ["aa", "bbb"], results, batch_size=4),
+        _submit(dispatcher, ["c"], results, batch_size=16),
+        _submit(dispatcher, ["dddd", "ee", "f"], results, batch_size=8),
+    ]
+    while dispatcher._queue.qsize() < 3:
+        time.sleep(0.01)
+    recorder.release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert len(recorder.calls) == 2
+    merged, batch_size = recorder.calls[1]
+    assert sorted(merged) == sorted(["aa", "bbb", "c", "dddd", "ee", "f"])
+    assert batch_size == 16
+    assert results[("aa", "bbb")] == [[2.0], [3.0]]
+    assert results[("c",)] == [[1.0]]
+    assert results[("dddd", "ee", "f")] == [[4.0], [2.0], [1.0]]
+
+
+def test_max_batch_limits_merging():
+    recorder = _Recorder()
+    dispatcher = EmbeddingDispatcher(recorder, max_batch=3, max_wait_ms=50)
+    results = {}
+    first = _submit(dispatcher, ["x"], results)
+    assert recorder.started.wait(5)
+    threads = [_submit(dispatcher, [f"{i}a", f"{i}b"], results) for i in range(3)]
+    while dispatcher._queue.qsize() < 3:
+        time.sleep(0.01)
+    recorder.release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    # 每批在文本数达到 max_batch 后停止收集
+    assert [len(texts) for texts, _ in recorder.calls] == [1, 4, 2]
+    assert all(not isinstance(result, Exception) for result in results.values())
+
+
+def test_error_is_raised_in_every_merged_request_and_worker_keeps_running():
+    recorder = _Recorder(fail_on="bad")
+    dispatcher = EmbeddingDispatcher(recorder, max_batch=100, max_wait_ms=50)
+    results = {}
+    first = _submit(dispatcher, ["x"], results)
+    assert recorder.started.wait(5)
+    threads = [_submit(dispatcher, ["bad"], results), _submit(dispatcher, ["good"], results)]
+    while dispatcher._queue.qsize() < 2:
+        time.sleep(0.01)
+    recorder.release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert results[("x",)] == [[1.0]]
+    for key in (("bad",), ("good",)):
+        assert isinstance(results[key], RuntimeError)
+    with pytest.raises(RuntimeError):
+        dispatcher.embed(["bad"])
+    assert dispatcher.embed(["ok"]) == [[2.0]]
@@ -0,0 +1,98 @@
+import math
+
+import pytest
+
+from services.keyword_index import BM25_B, BM25_K1, KeywordIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_cjk_bigrams_and_single_characters():
+    assert tokenize("合同付款") == ["合同", "同付", "付款"]
+    assert tokenize("甲 乙方") == ["乙方", "甲"]
+
+
+def test_tokenize_words_keep_whole_code_and_parts():
+    assert tokenize("Model ABC-1234") == ["model", "abc-1234", "abc", "1234"]
+    # 全角字符按NFKC规范化
+    assert tokenize("ＡＢＣ１２") == ["abc12"]
+    assert tokenize("") == []
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keyword.sqlite3"))
+    index.add(1, 10, "付款合同.pdf", [(None, "付款合同.pdf"), (0, "付款方式为银行转账"), (1, "设备保修期两年")])
+    index.add(2, 10, "采购.pdf", [(0, "采购订单与付款付款条款")])
+    index.add(3, 20, "其他用户.pdf", [(0, "付款")])
+    return index
+
+
+def test_bm25_score_matches_formula(index):
+    results = index.search("保修", user_id=10, limit=5)
+    assert [(result["pdf_file_id"], result["chunk_index"]) for result in results] == [(1, 1)]
+    assert results[0]["score"] == 1.0
+
+    # 手工计算用户10的分区中"付款"的BM25分数，比较两个文档的相对分数
+    lengths = {"name": len(tokenize("付款合同.pdf")), "a": len(tokenize("付款方式为银行转账")),
+               "b": len(tokenize("设备保修期两年")), "c": len(tokenize("采购订单与付款付款条款"))}
+    average = sum(lengths.values()) / len(lengths)
+    idf = math.log(1 + (4 - 3 + 0.5) / (3 + 0.5)) * (BM25_K1 + 1)
+
+    def score(tf, length):
+        return idf * tf / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+
+    expected = {2: score(2, lengths["c"]), 1: max(score(1, lengths["name"]), score(1, lengths["a"]))}
+    best = max(expected.values())
+    results = index.search("付款", user_id=10, limit=5)
+    assert {result["pdf_file_id"]: result["score"] for result in results} == pytest.approx(
+        {pdf_file_id: value / best for pdf_file_id, value in expected.items()}
+    )
+
+
+def test_search_is_partitioned_by_user(index):
+    assert [result["pdf_file_id"] for result in index.search("付款", user_id=20)] == [3]
+    assert index.search("付款", user_id=30) == []
+    assert index.search("", user_id=10) == []
+
+
+def test_group_size_returns_snippets(index):
+    result = index.search("付款", user_id=10, limit=1, group_size=2)[0]
+    assert len(result["snippets"]) <= 2
+    assert all(snippet["pdf_file_id"] == result["pdf_file_id"] for snippet in result["snippets"])
+
+
+def test_remove_and_reload(index, tmp_path):
+    index.remove_document(1, from_chunk=1)
+    assert index.search("保修", user_id=10) == []
+    assert len(index) == 4
+
+    reloaded = KeywordIndex(str(tmp_path / "keyword.sqlite3"))
+    assert reloaded.load() == 4
+    assert reloaded.stats() == index.stats()
+
+    index.remove_document(2)
+    assert index.search("采购", user_id=10) == []
+
+
+def test_removal_does_not_depend_on_sqlite_write(index):
+    # 模拟SQLite写入失败：内存索引已更新，删除时仍能清除倒排表
+    index._conn.execute("CREATE TRIGGER reject BEFORE INSERT ON chunks BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    index.add(4, 10, "新文件.pdf", [(0, "付款计划")])
+    assert 4 in [result["pdf_file_id"] for result in index.search("付款计划", user_id=10)]
+
+    index.remove_document(4)
+    assert 4 not in [result["pdf_file_id"] for result in index.search("付款计划", user_id=10)]
+    assert index.stats()["entries"] == 5
+
+
+def test_reciprocal_rank_fusion_sums_ranks_per_file():
+    vector = [{"pdf_file_id": 1, "source": "vector"}, {"pdf_file_id": 2, "source": "vector"}]
+    keyword = [{"pdf_file_id": 2, "source": "keyword"}, {"pdf_file_id": 3, "source": "keyword"}]
+    fused = reciprocal_rank_fusion([("vector", vector), ("keyword", keyword)], limit=3, k=60)
+
+    assert [result["pdf_file_id"] for result in fused] == [2, 1, 3]
+    assert fused[0]["rrf_score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[0]["match_source"] == "vector+keyword"
+    # 保留名次最靠前的那一路的结果
+    assert fused[0]["source"] == "keyword"
+    assert fused[1]["match_source"] == "vector"
+    assert len(reciprocal_rank_fusion([("vector", vector), ("keyword", keyword)], limit=1)) == 1
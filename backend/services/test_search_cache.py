@@ -0,0 +1,64 @@
+from services import search_cache
+from services.search_cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(search_cache.time, "monotonic", clock)
+    cache = TTLCache(max_items=10, ttl=30)
+    cache.put("query", [1, 2])
+
+    clock.now += 29.9
+    assert cache.get("query") == [1, 2]
+    clock.now += 0.2
+    assert cache.get("query") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_rewrite_refreshes_expiry(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(search_cache.time, "monotonic", clock)
+    cache = TTLCache(max_items=10, ttl=10)
+    cache.put("key", 1)
+    clock.now += 8
+    cache.put("key", 2)
+    clock.now += 8
+    assert cache.get("key") == 2
+
+
+def test_no_ttl_never_expires(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(search_cache.time, "monotonic", clock)
+    cache = TTLCache(max_items=10)
+    cache.put("key", "value")
+    clock.now += 10 ** 9
+    assert cache.get("key") == "value"
+
+
+def test_lru_eviction_and_discard():
+    cache = TTLCache(max_items=2, ttl=60)
+    cache.put(("user", 1), "a")
+    cache.put(("user", 2), "b")
+    cache.get(("user", 1))
+    cache.put(("user", 3), "c")
+    assert cache.get(("user", 2)) is None
+    assert cache.get(("user", 1)) == "a"
+
+    assert cache.discard_where(lambda key: key[1] == 3) == 1
+    assert cache.get(("user", 3)) is None
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = TTLCache(max_items=0, ttl=60)
+    cache.put("key", 1)
+    assert cache.get("key") is None
@@ -0,0 +1,74 @@
+from services.text_chunker import Chunk, TextChunker
+
+SENTENCE = "合同约定的付款方式为验收合格后三十日内支付全部货款。"
+
+
+def test_short_paragraphs_are_single_chunks():
+    text = "第一段。\n\n  第二段内容。  \n\n\n"
+    chunks = list(TextChunker(100).split(text))
+    assert [chunk.text for chunk in chunks] == ["第一段。", "第二段内容。"]
+
+
+def test_offsets_point_into_the_text():
+    text = "  前言。\n\n" + SENTENCE * 20 + "\n\nEnd of file. Last sentence here."
+    for chunk in TextChunker(60, overlap=15).split(text, offset=7, page=3):
+        assert text[chunk.start - 7:chunk.end - 7] == chunk.text
+        assert chunk.page == 3
+        assert chunk.text == chunk.text.strip()
+
+
+def test_chunks_respect_size_and_cut_at_sentence_ends():
+    text = SENTENCE * 20
+    chunks = list(TextChunker(60).split(text))
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 60 for chunk in chunks)
+    assert all(chunk.text.endswith("。") for chunk in chunks)
+    # 不重叠时块首尾相接，拼起来就是原文
+    assert "".join(chunk.text for chunk in chunks) == text
+
+
+def test_overlap_starts_at_a_sentence_inside_the_previous_chunk():
+    text = "短句一。短句二。短句三。短句四。短句五。短句六。短句七。短句八。"
+    chunks = list(TextChunker(12, overlap=6).split(text))
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.start < chunk.start < previous.end
+        assert text[chunk.start - 1] == "。"
+    assert chunks[-1].end == len(text)
+
+
+def test_text_without_break_points_is_hard_cut_and_terminates():
+    text = "x" * 1000
+    chunks = list(TextChunker(100, overlap=30).split(text))
+    assert all(len(chunk.text) <= 100 for chunk in chunks)
+    assert chunks[0].start == 0 and chunks[-1].end == len(text)
+    starts = [chunk.start for chunk in chunks]
+    assert starts == sorted(set(starts))
+    # 硬切的块从重叠区域开头开始
+    assert chunks[1].start == chunks[0].end - 30
+
+
+def test_tiny_chunk_size_terminates():
+    chunks = list(TextChunker(1, overlap=5).split("ab。cd，ef gh"))
+    assert "".join(chunk.text for chunk in chunks).replace(" ", "") == "ab。cd，efgh"
+
+
+def test_length_function_limits_chunk_length():
+    def words(text):
+        return len(text.split())
+
+    text = " ".join(f"word{i}." for i in range(200))
+    chunks = list(TextChunker(10, overlap=2, length_function=words).split(text))
+    assert len(chunks) >= 20
+    assert all(words(chunk.text) <= 10 for chunk in chunks)
+    assert chunks[-1].text.endswith("word199.")
+
+
+def test_split_pages_offsets_match_joined_text():
+    pages = ["第一页。" * 10, "", SENTENCE * 5]
+    full_text = "\n\n".join(page for page in pages if page)
+    chunks = list(TextChunker(30).split_pages(pages))
+    assert {chunk.page for chunk in chunks} == {1, 3}
+    for chunk in chunks:
+        assert isinstance(chunk, Chunk)
+        assert full_text[chunk.start:chunk.end] == chunk.text
@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, FilterSelector, MatchValue, PointIdsList, PointStruct, Range, VectorParams
+)
+
+from config import Config
+from services.vector_store import EmbeddedVectorStore
+
+COLLECTION = "chunks"
+DIMENSION = 8
+
+
+def _vector(seed: int) -> list:
+    return np.random.default_rng(seed).standard_normal(DIMENSION).astype(np.float32).tolist()
+
+
+def _points(count: int, start: int = 0) -> list:
+    return [
+        PointStruct(
+            id=i,
+            vector=_vector(i),
+            payload={"user_id": i % 2, "pdf_file_id": i // 4, "chunk_index": i % 4, "type": "content", "text": f"块{i}"}
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def _user(user_id: int) -> Filter:
+    return Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmbeddedVectorStore(str(tmp_path / "vectors"))
+    store.create_collection(COLLECTION, VectorParams(size=DIMENSION, distance=Distance.COSINE))
+    yield store
+    store.close()
+
+
+def _expected_order(points: list, query: list) -> list:
+    query = np.asarray(query) / np.linalg.norm(query)
+    scores = {point.id: float(np.asarray(point.vector) @ query / np.linalg.norm(point.vector)) for point in points}
+    return sorted(scores, key=scores.get, reverse=True), scores
+
+
+def test_search_ranks_by_cosine_similarity(store):
+    points = _points(40)
+    store.upsert(COLLECTION, points)
+    order, scores = _expected_order(points, _vector(1000))
+
+    hits = store.search(COLLECTION, _vector(1000), limit=5)
+    assert [hit.id for hit in hits] == order[:5]
+    assert [hit.score for hit in hits] == pytest.approx([scores[point_id] for point_id in order[:5]], abs=1e-5)
+    assert hits[0].payload["text"] == f"块{order[0]}"
+
+    threshold = scores[order[2]] - 1e-6
+    assert len(store.search(COLLECTION, _vector(1000), limit=10, score_threshold=threshold)) == 3
+
+
+def test_filters_count_and_payload_selection(store):
+    points = _points(40)
+    store.upsert(COLLECTION, points)
+
+    hits = store.search(COLLECTION, _vector(1000), query_filter=_user(1), limit=100, with_payload=["user_id"])
+    assert len(hits) == 20
+    assert all(hit.payload == {"user_id": 1} for hit in hits)
+    assert store.count(COLLECTION, _user(0)).count == 20
+    in_range = Filter(must=[FieldCondition(key="pdf_file_id", range=Range(gte=2, lt=4))])
+    assert store.count(COLLECTION, in_range).count == 8
+    assert store.count(COLLECTION, Filter(must_not=[FieldCondition(key="chunk_index", match=MatchValue(value=0))])).count == 30
+    with pytest.raises(ValueError):
+        store.count(COLLECTION, Filter(must=[FieldCondition(key="text", match=MatchValue(value="块1"))]))
+
+
+def test_search_groups_returns_one_group_per_file(store):
+    store.upsert(COLLECTION, _points(40))
+    result = store.search_groups(COLLECTION, _vector(1000), group_by="pdf_file_id", limit=3, group_size=2)
+    assert len(result.groups) == 3
+    assert len({group.id for group in result.groups}) == 3
+    for group in result.groups:
+        assert 1 <= len(group.hits) <= 2
+        assert all(hit.payload["pdf_file_id"] == group.id for hit in group.hits)
+    best = [group.hits[0].score for group in result.groups]
+    assert best == sorted(best, reverse=True)
+
+
+def test_upsert_overwrites_and_delete_by_ids_and_filter(store):
+    store.upsert(COLLECTION, _points(10))
+    store.upsert(COLLECTION, [PointStruct(id=3, vector=_vector(1000), payload={"user_id": 5, "pdf_file_id": 99})])
+    assert store.get_collection(COLLECTION).points_count == 10
+    assert store.search(COLLECTION, _vector(1000), limit=1)[0].id == 3
+    assert store.count(COLLECTION, _user(5)).count == 1
+
+    store.delete(COLLECTION, PointIdsList(points=[3, 4, 12345]))
+    assert store.get_collection(COLLECTION).points_count == 8
+    store.delete(COLLECTION, FilterSelector(filter=_user(0)))
+    remaining, next_offset = store.scroll(COLLECTION, limit=100)
+    assert next_offset is None
+    assert sorted(record.id for record in remaining) == [1, 5, 7, 9]
+    assert all(hit.id != 3 for hit in store.search(COLLECTION, _vector(1000), limit=10))
+
+    # 删除的行被新点复用
+    store.upsert(COLLECTION, _points(3, start=100))
+    assert store.get_collection(COLLECTION).points_count == 7
+
+
+def test_scroll_pages_through_rows(store):
+    store.upsert(COLLECTION, _points(25))
+    seen, offset = [], None
+    while True:
+        records, offset = store.scroll(COLLECTION, limit=10, offset=offset, with_vectors=True)
+        seen.extend(records)
+        if offset is None:
+            break
+    assert sorted(record.id for record in seen) == list(range(25))
+    vector = np.asarray(seen[0].vector)
+    assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_reload_from_memmap(tmp_path):
+    root = str(tmp_path / "vectors")
+    store = EmbeddedVectorStore(root)
+    store.create_collection(COLLECTION, VectorParams(size=DIMENSION, distance=Distance.COSINE))
+    # 超过初始容量（1024行），向量文件需要扩容
+    points = _points(1500) + [PointStruct(id="a3f1c2d4-0000-4000-8000-000000000001", vector=_vector(7), payload={"user_id": 9})]
+    store.upsert(COLLECTION, points)
+    store.delete(COLLECTION, PointIdsList(points=[0, 1, 2]))
+    before = store.search(COLLECTION, _vector(1000), limit=10)
+    store.close()
+
+    reopened = EmbeddedVectorStore(root)
+    assert [collection.name for collection in reopened.get_collections().collections] == [COLLECTION]
+    info = reopened.get_collection(COLLECTION)
+    assert info.points_count == 1498
+    assert info.config.params.vectors.size == DIMENSION
+    after = reopened.search(COLLECTION, _vector(1000), limit=10)
+    assert [(hit.id, hit.payload) for hit in after] == [(hit.id, hit.payload) for hit in before]
+    assert [hit.score for hit in after] == pytest.approx([hit.score for hit in before])
+    assert reopened.search(COLLECTION, _vector(7), query_filter=_user(9), limit=1)[0].id == points[-1].id
+
+    assert reopened.delete_collection(COLLECTION)
+    assert reopened.get_collections().collections == []
+    with pytest.raises(ValueError):
+        reopened.get_collection(COLLECTION)
+    reopened.close()
+
+
+def test_hnsw_index_matches_brute_force(tmp_path, monkeypatch):
+    pytest.importorskip("hnswlib")
+    monkeypatch.setattr(Config, "EMBEDDED_HNSW_THRESHOLD", 100)
+    root = str(tmp_path / "vectors")
+    store = EmbeddedVectorStore(root)
+    store.create_collection(COLLECTION, VectorParams(size=DIMENSION, distance=Distance.COSINE))
+    points = _points(300)
+    store.upsert(COLLECTION, points)
+    order, _ = _expected_order(points, _vector(1000))
+    assert [hit.id for hit in store.search(COLLECTION, _vector(1000), limit=5)] == order[:5]
+    store.close()
+
+    reopened = EmbeddedVectorStore(root)
+    assert [hit.id for hit in reopened.search(COLLECTION, _vector(1000), limit=5)] == order[:5]
+    reopened.close()
+
+
+def test_hnsw_requery_returns_each_row_once(store, monkeypatch):
+    pytest.importorskip("hnswlib")
+    monkeypatch.setattr(Config, "EMBEDDED_HNSW_THRESHOLD", 100)
+    store.upsert(COLLECTION, _points(400))
+    collection = store._collection(COLLECTION)
+    assert collection._index is not None
+
+    # wanted=1 时从 k=16 开始，调用方一直取下去会多次加倍 k 重新查询
+    mask = collection.mask(_user(1))
+    rows = [row for row, _ in collection.ranked(_vector(1000), mask, 1)]
+    assert len(rows) == len(set(rows))
+    assert set(rows) == set(np.nonzero(mask)[0].tolist())
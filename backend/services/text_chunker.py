@@ -0,0 +1,150 @@
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+import re
+
+# 段落分隔（空行）
+_PARAGRAPH = re.compile(r"\n[ \t\r\f\v]*\n")
+# 句子结束：中文句末标点、单个换行，以及后面跟空格的英文句末标点（切在标点之后）
+_SENTENCE_ENDS = ("。", "！", "？", "\n", ". ", "! ", "? ")
+# 超长句子强制切分时优先选择的切分点（切在标点之后）
+_SOFT_BREAKS = ("，", ",", "；", ";", "、", "：", ":")
+
+
+class Chunk(NamedTuple):
+    """文本块：start/end 为在原文（或文档全文）中的字符偏移，page 为页码（从1开始，未知为None）"""
+    text: str
+    start: int
+    end: int
+    page: Optional[int] = None
+
+
+class TextChunker:
+    """
+    单遍文本分块
+
+    只处理 (起点, 终点) 区间，产出时才截取一次子串：段落是天然的分块边界，放得下的段落整段作为一块；
+    放不下时从块的起点往后取一个窗口，切在窗口内最后一个句子结束处（没有时切在后半个窗口的最后一个标点处，
+    再没有时按窗口大小硬切），下一块从重叠区域内的第一个句子开头开始。
+    每个块只在自己的窗口内用 str.rfind/find 查找切分点，整体为线性时间。
+
+    长度默认按字符计算；传入 length_function（如模型分词器的token数）时按其返回值计算，
+    窗口按段落的平均每单位字符数换算，切出的块超长时缩小窗口重新切分。
+    """
+
+    def __init__(self, chunk_size: int, overlap: int = 0, length_function: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            chunk_size: 每块的最大长度
+            overlap: 相邻块的重叠长度（不超过 chunk_size 的一半；段落、页面之间不重叠）
+            length_function: 计算文本长度的函数，None表示按字符数
+        """
+        self.chunk_size = max(1, chunk_size)
+        self.overlap = max(0, min(overlap, self.chunk_size // 2))
+        self.length_function = length_function
+
+    def split(self, text: str, offset: int = 0, page: Optional[int] = None) -> Iterator[Chunk]:
+        """
+        切分一段文本
+
+        Args:
+            text: 文本
+            offset: 加到块偏移上的基准偏移（文本在文档全文中的起点）
+            page: 页码
+
+        Yields:
+            文本块（已去掉首尾空白）
+        """
+        position = 0
+        for match in _PARAGRAPH.finditer(text):
+            yield from self._split_paragraph(text, position, match.start(), offset, page)
+            position = match.end()
+        yield from self._split_paragraph(text, position, len(text), offset, page)
+
+    def split_pages(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """
+        逐页切分（页面之间是分块边界）
+
+        块的偏移以各页文本用双换行拼接后的全文为准（空白页不计入，与保存的 text_content 一致），
+        页码为页面在 pages 中的序号（从1开始，包括空白页）。
+        """
+        offset = 0
+        for page, page_text in enumerate(pages, 1):
+            if not page_text:
+                continue
+            yield from self.split(page_text, offset, page)
+            offset += len(page_text) + 2
+
+    def _split_paragraph(self, text: str, start: int, end: int, offset: int, page: Optional[int]) -> Iterator[Chunk]:
+        """切分一个段落"""
+        span = self._trim(text, start, end)
+        if not span:
+            return
+        start, end = span
+        length = self._length(text, start, end)
+        if length <= self.chunk_size:
+            yield Chunk(text[start:end], offset + start, offset + end, page)
+            return
+
+        # 按token计算长度时，用段落的平均每token字符数换算窗口大小
+        scale = (end - start) / length
+        window = max(1, int(self.chunk_size * scale))
+        overlap = int(self.overlap * scale)
+        while start < end:
+            cut, hard = self._find_cut(text, start, start + window, end)
+            if self.length_function is not None:
+                while cut - start > 1 and self._length(text, start, cut) > self.chunk_size:
+                    cut, hard = self._find_cut(text, start, start + (cut - start) * 3 // 4, end)
+            span = self._trim(text, start, cut)
+            if span:
+                yield Chunk(text[span[0]:span[1]], offset + span[0], offset + span[1], page)
+            if cut >= end:
+                return
+            start = self._next_start(text, start, cut, overlap, hard)
+            while start < end and text[start].isspace():
+                start += 1
+
+    @staticmethod
+    def _find_cut(text: str, start: int, limit: int, end: int) -> Tuple[int, bool]:
+        """
+        在 (start, limit] 内找切分点，返回 (切分点, 是否为硬切)
+
+        limit 到达段落结尾时直接切在结尾；否则依次取最后一个句子结束、后半个窗口内最后一个标点、limit。
+        """
+        if limit >= end:
+            return end, False
+        cut = max(text.rfind(mark, start, limit + len(mark) - 1) for mark in _SENTENCE_ENDS) + 1
+        if cut > start:
+            return cut, False
+        middle = start + (limit - start) // 2
+        cut = max(text.rfind(mark, middle, limit) for mark in _SOFT_BREAKS) + 1
+        if cut > middle:
+            return cut, False
+        return max(limit, start + 1), True
+
+    @staticmethod
+    def _next_start(text: str, start: int, cut: int, overlap: int, hard: bool) -> int:
+        """
+        下一块的起点：重叠区域 [cut - overlap, cut) 内的第一个句子开头，其次是第一个标点之后；
+        都没有时，硬切的块从重叠区域开头开始，其他情况不重叠
+        """
+        if not overlap:
+            return cut
+        low = max(start + 1, cut - overlap)
+        for marks in (_SENTENCE_ENDS, _SOFT_BREAKS):
+            positions = [position for position in (text.find(mark, low - 1, cut - 1) for mark in marks) if position >= 0]
+            if positions:
+                return min(positions) + 1
+        return low if hard else cut
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(text[start:end])
+
+    @staticmethod
+    def _trim(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """去掉区间首尾的空白，区间为空时返回None"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if start < end else None
@@ -1,9 +1,23 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, FilterSelector, Range, PayloadSchemaType
+from qdrant_client.models import (
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig,
+    QuantizationSearchParams, SearchParams, VectorParamsDiff, Disabled
+)
 from openai import OpenAI
 from config import Config
-from typing import List, Optional, Dict, Any
+from services import qdrant_pool, vector_store
+from services.embedding_cache import EmbeddingCache
+from services.embedding_dispatcher import EmbeddingDispatcher
+from services.keyword_index import KeywordIndex, reciprocal_rank_fusion
+from services.search_cache import TTLCache
+from services.text_chunker import Chunk, TextChunker
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator
+import asyncio
+import functools
 import logging
+import threading
+import time
 import uuid
 import os
 
@@ -18,34 +32,125 @@ if Config.HF_ENDPOINT:
 # 尝试导入本地embedding模型（可选）
 try:
     from sentence_transformers import SentenceTransformer
-    LOCAL_EMBEDDING_AVAILABLE = True
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
-    LOCAL_EMBEDDING_AVAILABLE = False
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# EMBEDDING_BACKEND=onnx 时用ONNX Runtime推理（只需要onnxruntime和导出好的模型），否则用sentence-transformers
+from services import onnx_embedder
+ONNX_BACKEND = Config.EMBEDDING_BACKEND == "onnx" and onnx_embedder.ONNX_AVAILABLE
+LOCAL_EMBEDDING_AVAILABLE = SENTENCE_TRANSFORMERS_AVAILABLE or ONNX_BACKEND
+if not LOCAL_EMBEDDING_AVAILABLE:
     logger.info("sentence-transformers未安装，将尝试使用DeepSeek API生成向量")
 
+# 搜索和删除时过滤的payload字段及其索引类型
+PAYLOAD_INDEXES = {
+    "user_id": PayloadSchemaType.INTEGER,
+    "pdf_file_id": PayloadSchemaType.INTEGER,
+    "type": PayloadSchemaType.KEYWORD,
+}
+
+
+
+def quantization_config(mode: str = None):
+    """
+    集合的向量量化配置（QDRANT_QUANTIZATION）
+    
+    scalar: 每维压缩为int8，内存约为原始向量的1/4，召回率损失很小；
+    binary: 每维压缩为1比特，内存约为1/32，需要配合过采样和重新打分；
+    none: 不量化，返回None。
+    """
+    mode = (mode or Config.QDRANT_QUANTIZATION).lower()
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=Config.QDRANT_QUANTIZATION_ALWAYS_RAM)
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=Config.QDRANT_QUANTIZATION_ALWAYS_RAM))
+    if mode != "none":
+        logger.warning(f"未知的量化方式: {mode}，不使用量化")
+    return None
+
+
+def vectors_config(on_disk: bool = None) -> VectorParams:
+    """集合的向量参数（QDRANT_ON_DISK_VECTORS 为true时原始向量存放在磁盘上，只把量化向量留在内存中）"""
+    return VectorParams(
+        size=Config.EMBEDDING_DIMENSION,
+        distance=Distance.COSINE,
+        on_disk=Config.QDRANT_ON_DISK_VECTORS if on_disk is None else on_disk
+    )
+
+
+def search_params(mode: str = None) -> Optional[SearchParams]:
+    """
+    搜索参数：启用量化时先用量化向量取 limit × QDRANT_SEARCH_OVERSAMPLING 个候选，
+    再用原始向量重新打分（QDRANT_SEARCH_RESCORE），未启用量化时返回None
+    """
+    if quantization_config(mode) is None:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=Config.QDRANT_SEARCH_RESCORE,
+            oversampling=Config.QDRANT_SEARCH_OVERSAMPLING
+        )
+    )
+
+
+def collection_storage(collection_info) -> tuple:
+    """读取集合当前的 (量化方式, 原始向量是否存放在磁盘上)"""
+    quantization = collection_info.config.quantization_config
+    if isinstance(quantization, ScalarQuantization):
+        mode = "scalar"
+    elif isinstance(quantization, BinaryQuantization):
+        mode = "binary"
+    elif quantization is None:
+        mode = "none"
+    else:
+        mode = type(quantization).__name__
+    return mode, bool(collection_info.config.params.vectors.on_disk)
+
+
+# 向量点ID的命名空间：点ID由 (PDF文件ID, 类型, 块序号) 确定性生成，重复写入同一文档时原地覆盖
+POINT_ID_NAMESPACE = uuid.UUID("6f1c8a52-3f0e-4d3c-9a57-2b7c1e0d4a91")
+
+def point_id(pdf_file_id: int, point_type: str, chunk_index: int = 0) -> str:
+    """
+    生成确定性的向量点ID
+    
+    Args:
+        pdf_file_id: PDF文件ID
+        point_type: 向量类型（filename 或 content）
+        chunk_index: 文本块序号（文件名向量为0）
+        
+    Returns:
+        UUID字符串
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{pdf_file_id}:{point_type}:{chunk_index}"))
+
+def embedding_model_key() -> str:
+    """
+    向量缓存中区分模型的键：int8量化模型的向量与原模型略有差异，单独缓存；
+    float32的ONNX模型与PyTorch模型输出一致，共用缓存
+    """
+    if ONNX_BACKEND and Config.EMBEDDING_ONNX_QUANTIZE:
+        return f"{Config.EMBEDDING_MODEL}#onnx-int8"
+    return Config.EMBEDDING_MODEL
+
 class VectorService:
     """向量服务，用于语义搜索"""
     
     def __init__(self):
         """初始化向量服务"""
-        try:
-            # 初始化 Qdrant 客户端（添加超时配置）
-            self.qdrant_client = QdrantClient(
-                host=Config.QDRANT_HOST,
-                port=Config.QDRANT_PORT,
-                timeout=Config.QDRANT_TIMEOUT
-            )
-            # 测试连接
+        # 向量存储：Qdrant客户端（REST连接池或gRPC）或进程内的嵌入式存储，见 VECTOR_STORE
+        self.vector_store = vector_store.get_store()
+        
+        # 异步 Qdrant 客户端，供 async 接口使用（不阻塞事件循环）；嵌入式存储的异步接口在线程中调用
+        self.async_qdrant_client = None
+        if vector_store.is_qdrant(self.vector_store):
             try:
-                self.qdrant_client.get_collections()
-                logger.info(f"Qdrant客户端连接成功: {Config.QDRANT_HOST}:{Config.QDRANT_PORT}")
-            except Exception as test_error:
-                logger.warning(f"Qdrant连接测试失败: {str(test_error)}，但客户端已创建")
-                logger.warning("提示：请检查Qdrant服务是否运行，或网络连接是否正常")
-        except Exception as e:
-            logger.error(f"Qdrant客户端连接失败: {str(e)}")
-            logger.error("提示：请检查Qdrant服务是否运行在正确的地址和端口")
-            self.qdrant_client = None
+                self.async_qdrant_client = qdrant_pool.get_async_client()
+            except Exception as e:
+                logger.warning(f"异步Qdrant客户端创建失败: {str(e)}，异步接口将在线程中调用同步客户端")
         
         # 初始化 DeepSeek Embeddings 客户端
         try:
@@ -58,33 +163,216 @@ class VectorService:
             logger.error(f"DeepSeek Embeddings客户端初始化失败: {str(e)}")
             self.embeddings_client = None
         
-        # 不在这里加载模型，改为延迟加载（避免阻塞服务启动）
+        # 不在这里加载模型，改为延迟加载（避免阻塞服务启动）；可在后台调用 warm_up 提前加载
         self.local_embedder = None
-        self._model_loading = False  # 标记是否正在加载模型
+        self.model_error = None  # 最近一次模型加载失败的原因
+        self._model_lock = threading.Lock()
+        self._model_future = None  # 正在进行或已成功的加载，并发调用方等待同一次加载
+        
+        # 向量缓存（内存LRU + SQLite），相同文本不重复计算
+        self.embedding_cache = None
+        if Config.EMBEDDING_CACHE_ENABLED:
+            try:
+                self.embedding_cache = EmbeddingCache(model=embedding_model_key())
+            except Exception as e:
+                logger.error(f"向量缓存初始化失败: {str(e)}，将不使用缓存")
+        
+        # 搜索缓存：按用户缓存搜索结果，查询向量全局共享，集合统计短时间复用
+        self.search_cache = TTLCache(Config.SEARCH_CACHE_MAX_ITEMS, Config.SEARCH_CACHE_TTL) if Config.SEARCH_CACHE_ENABLED else None
+        self.query_embedding_cache = TTLCache(Config.QUERY_EMBEDDING_CACHE_ITEMS)
+        self.collection_stats_cache = TTLCache(1, Config.COLLECTION_STATS_TTL)
+        
+        # 并发请求的向量生成合并为批量计算（动态微批处理）
+        self.embedding_dispatcher = EmbeddingDispatcher(self._embed_texts) if Config.EMBEDDING_DISPATCH_ENABLED else None
+        
+        # 异步接口的模型推理在专用线程池中执行，不占用事件循环和默认线程池
+        self.inference_executor = ThreadPoolExecutor(max_workers=Config.EMBEDDING_INFERENCE_WORKERS, thread_name_prefix="embedding-inference")
+        
+        # 关键词倒排索引（BM25），与向量结果融合，也可以不经过embedding模型单独搜索
+        self.keyword_index = None
+        if Config.KEYWORD_INDEX_ENABLED:
+            try:
+                self.keyword_index = KeywordIndex()
+            except Exception as e:
+                logger.error(f"关键词索引初始化失败: {str(e)}，将只使用向量搜索")
         
         # 确保集合存在
         self._ensure_collection()
+        
+        # 关键词索引在后台加载（加载完成前关键词搜索结果不完整），为空时从向量payload回填
+        if self.keyword_index is not None:
+            threading.Thread(target=self._load_keyword_index, name="keyword-index-load", daemon=True).start()
     
     def _ensure_collection(self):
         """确保Qdrant集合存在"""
-        if not self.qdrant_client:
+        if not self.vector_store:
             return
         
         try:
             collection_name = Config.QDRANT_COLLECTION_NAME
-            if not self.qdrant_client.collection_exists(collection_name):
-                self.qdrant_client.create_collection(
+            existing = {collection.name for collection in self.vector_store.get_collections().collections}
+            if collection_name not in existing:
+                self.vector_store.create_collection(
                     collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=Config.EMBEDDING_DIMENSION,
-                        distance=Distance.COSINE
-                    )
+                    vectors_config=vectors_config(),
+                    quantization_config=quantization_config()
                 )
-                logger.info(f"创建Qdrant集合: {collection_name}")
+                logger.info(f"创建Qdrant集合: {collection_name}（量化: {Config.QDRANT_QUANTIZATION}, 原始向量存磁盘: {Config.QDRANT_ON_DISK_VECTORS}）")
             else:
                 logger.info(f"Qdrant集合已存在: {collection_name}")
+                current = collection_storage(self.vector_store.get_collection(collection_name))
+                if vector_store.is_qdrant(self.vector_store) and current != (Config.QDRANT_QUANTIZATION, Config.QDRANT_ON_DISK_VECTORS):
+                    logger.warning(
+                        f"集合的存储配置（量化: {current[0]}, 原始向量存磁盘: {current[1]}）与当前配置不一致，"
+                        f"可运行 fix_vectors.py 更新"
+                    )
         except Exception as e:
             logger.error(f"确保集合存在失败: {str(e)}")
+            return
+        
+        if Config.QDRANT_PAYLOAD_INDEXES:
+            self._ensure_payload_indexes()
+    
+    def update_storage_config(self) -> bool:
+        """
+        按当前配置更新已有集合的量化方式和原始向量存储位置（不需要重新生成向量，
+        Qdrant会在后台重建量化数据）
+        
+        Returns:
+            是否成功
+        """
+        if not self.vector_store:
+            return False
+        try:
+            self.vector_store.update_collection(
+                collection_name=Config.QDRANT_COLLECTION_NAME,
+                vectors_config={"": VectorParamsDiff(on_disk=Config.QDRANT_ON_DISK_VECTORS)},
+                quantization_config=quantization_config() or Disabled.DISABLED
+            )
+            logger.info(f"已更新集合存储配置: 量化 {Config.QDRANT_QUANTIZATION}, 原始向量存磁盘 {Config.QDRANT_ON_DISK_VECTORS}")
+            return True
+        except Exception as e:
+            logger.error(f"更新集合存储配置失败: {str(e)}")
+            return False
+    
+    def _ensure_payload_indexes(self):
+        """
+        检查并创建过滤字段的payload索引
+        
+        每次搜索都按 user_id 过滤、每次删除都按 pdf_file_id 过滤，
+        没有payload索引时Qdrant只能逐点检查payload，集合越大过滤搜索越慢。
+        """
+        collection_name = Config.QDRANT_COLLECTION_NAME
+        try:
+            payload_schema = self.vector_store.get_collection(collection_name).payload_schema or {}
+        except Exception as e:
+            logger.warning(f"读取payload索引失败: {str(e)}")
+            return
+        
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in payload_schema:
+                continue
+            if field_name == "user_id" and Config.QDRANT_USER_TENANT_INDEX:
+                field_schema = self._tenant_index_schema(field_schema)
+            try:
+                self.vector_store.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=True
+                )
+                logger.info(f"创建payload索引: {field_name}")
+            except Exception as e:
+                logger.warning(f"创建payload索引 {field_name} 失败: {str(e)}")
+    
+    @staticmethod
+    def _tenant_index_schema(default_schema):
+        """
+        user_id 的租户索引参数
+        
+        Qdrant 的 is_tenant 目前只支持keyword/uuid索引，而 user_id 存的是整数；
+        客户端支持整数租户索引时使用它，否则退化为只支持精确匹配的整数索引（不建range索引），
+        都不支持时使用普通整数索引。
+        """
+        try:
+            from qdrant_client.models import IntegerIndexParams
+        except ImportError:
+            logger.warning("当前qdrant-client版本不支持索引参数，user_id 使用普通整数索引")
+            return default_schema
+        fields = getattr(IntegerIndexParams, "model_fields", None) or getattr(IntegerIndexParams, "__fields__", {})
+        if "is_tenant" in fields:
+            return IntegerIndexParams(type="integer", lookup=True, range=False, is_tenant=True)
+        logger.warning("当前Qdrant不支持整数租户索引，user_id 使用只支持精确匹配的整数索引")
+        return IntegerIndexParams(type="integer", lookup=True, range=False)
+    
+    def _load_keyword_index(self):
+        """加载关键词索引，索引为空而向量集合中已有数据时回填"""
+        try:
+            self.keyword_index.load()
+        except Exception as e:
+            logger.warning(f"加载关键词索引失败: {str(e)}")
+            return
+        if len(self.keyword_index) == 0 and self.vector_store:
+            self._backfill_keyword_index()
+    
+    def _backfill_keyword_index(self):
+        """
+        从向量点的payload回填关键词索引（启用关键词索引前已生成向量的文档，
+        不需要重新生成向量；在后台线程中执行，回填完成前关键词搜索结果不完整）
+        """
+        try:
+            total = 0
+            offset = None
+            while True:
+                records, offset = self.vector_store.scroll(
+                    collection_name=Config.QDRANT_COLLECTION_NAME,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=["pdf_file_id", "user_id", "type", "chunk_index", "text", "original_filename"],
+                    with_vectors=False
+                )
+                documents: Dict[tuple, list] = {}
+                for record in records:
+                    payload = record.payload or {}
+                    if payload.get("pdf_file_id") is None or payload.get("user_id") is None:
+                        continue
+                    chunk_index = None if payload.get("type") == "filename" else payload.get("chunk_index", 0)
+                    key = (payload["pdf_file_id"], payload["user_id"], payload.get("original_filename", ""))
+                    documents.setdefault(key, []).append((chunk_index, payload.get("text", "")))
+                for (pdf_file_id, user_id, filename), chunks in documents.items():
+                    self.keyword_index.add(pdf_file_id, user_id, filename, chunks)
+                    total += len(chunks)
+                if offset is None:
+                    break
+            if total:
+                logger.info(f"关键词索引回填完成: {total} 个条目")
+        except Exception as e:
+            logger.warning(f"回填关键词索引失败: {str(e)}")
+    
+    def _index_points(self, points: List[PointStruct]):
+        """把已写入向量存储的向量点写入关键词索引（写入成功后才调用，关键词索引与向量保持一致）"""
+        documents: Dict[tuple, List[tuple]] = {}
+        for point in points:
+            payload = point.payload
+            key = (payload["pdf_file_id"], payload["user_id"], payload.get("original_filename", ""))
+            chunk_index = None if payload["type"] == "filename" else payload.get("chunk_index", 0)
+            documents.setdefault(key, []).append((chunk_index, payload.get("text", "")))
+        for (pdf_file_id, user_id, filename), items in documents.items():
+            self._index_keywords(items, pdf_file_id, user_id, filename)
+    
+    def _index_keywords(self, items: List[tuple], pdf_file_id: int, user_id: int, filename: str):
+        """
+        把一批条目写入关键词索引（失败只记录警告，不影响向量写入）
+        
+        Args:
+            items: (块序号, 文本) 列表，块序号为None表示文件名
+        """
+        if self.keyword_index is None or not items:
+            return
+        try:
+            self.keyword_index.add(pdf_file_id, user_id, filename, items)
+        except Exception as e:
+            logger.warning(f"写入关键词索引失败: {str(e)}")
     
     def _split_text(self, text: str) -> List[str]:
         """
@@ -99,129 +387,104 @@ class VectorService:
         """
         if not text:
             return []
+        return list(self.iter_chunks([text], paged=False))
+    
+    def iter_chunks(self, pages: Iterable[str], paged: bool = True) -> Iterator[str]:
+        """逐页惰性分块，只产出文本（参数见 iter_chunk_spans）"""
+        for chunk in self.iter_chunk_spans(pages, paged):
+            yield chunk.text
+    
+    def iter_chunk_spans(self, pages: Iterable[str], paged: bool = True) -> Iterator[Chunk]:
+        """
+        逐页惰性分块（生成器）：每读入一页就产出该页的文本块，不需要先拼接全文
         
-        import re
-        
-        chunks = []
-        chunk_size = Config.TEXT_CHUNK_SIZE
-        overlap = Config.TEXT_CHUNK_OVERLAP
-        
-        # 首先按段落分割（双换行、段落标记等）
-        # 支持多种段落分隔符
-        paragraph_separators = ['\n\n', '\r\n\r\n', '\n\r\n\r']
-        paragraphs = [text]
-        
-        for sep in paragraph_separators:
-            new_paragraphs = []
-            for para in paragraphs:
-                new_paragraphs.extend(para.split(sep))
-            paragraphs = new_paragraphs
+        段落和页面是分块边界，过长的段落按句子切分，相邻块重叠 TEXT_CHUNK_OVERLAP；
+        过短的块（不超过10个字符）只在它是最后一个块时保留。
         
-        # 处理每个段落
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
+        Args:
+            pages: 各页文本（可以是边解析边产出的生成器）
+            paged: pages 是否为PDF的各页；为False时（整篇文本）块的页码为None
             
-            # 如果段落长度在合理范围内，直接作为一个块
-            if len(para) <= chunk_size:
-                chunks.append(para)
+        Yields:
+            文本块（带在全文中的字符偏移和页码）
+        """
+        chunker = self._text_chunker()
+        chunks = chunker.split_pages(pages) if paged else (
+            chunk for text in pages if text for chunk in chunker.split(text)
+        )
+        short_tail = None
+        for chunk in chunks:
+            if len(chunk.text) > 10:  # 至少10个字符
+                short_tail = None
+                yield chunk
             else:
-                # 段落太长，按句子分割
-                # 支持中文和英文句子结束符
-                sentence_endings = r'[。！？\n]|\.\s+|!\s+|\?\s+'
-                sentences = re.split(sentence_endings, para)
-                
-                current_chunk = ""
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence:
-                        continue
-                    
-                    # 如果当前块加上新句子不超过限制，添加到当前块
-                    if len(current_chunk) + len(sentence) + 1 <= chunk_size:
-                        if current_chunk:
-                            current_chunk += " " + sentence
-                        else:
-                            current_chunk = sentence
-                    else:
-                        # 当前块已满，保存并开始新块
-                        if current_chunk:
-                            chunks.append(current_chunk)
-                        
-                        # 如果单个句子就超过限制，需要强制分割
-                        if len(sentence) > chunk_size:
-                            # 按字符数强制分割，但尽量在标点处分割
-                            start = 0
-                            while start < len(sentence):
-                                end = start + chunk_size
-                                if end < len(sentence):
-                                    # 尝试在标点符号处分割
-                                    punctuation = ['，', ',', '；', ';', '、', '：', ':']
-                                    best_split = end
-                                    for punct in punctuation:
-                                        last_punct = sentence.rfind(punct, start, end)
-                                        if last_punct > start:
-                                            best_split = last_punct + 1
-                                            break
-                                    
-                                    chunk = sentence[start:best_split]
-                                    if chunk:
-                                        chunks.append(chunk)
-                                    start = best_split
-                                else:
-                                    chunk = sentence[start:]
-                                    if chunk:
-                                        chunks.append(chunk)
-                                    break
-                            current_chunk = ""
-                        else:
-                            current_chunk = sentence
-                
-                # 添加最后一个块
-                if current_chunk:
-                    chunks.append(current_chunk)
-        
-        # 如果没有分到任何块（可能是没有段落分隔符），使用原来的方法
-        if not chunks:
-            start = 0
-            while start < len(text):
-                end = start + chunk_size
-                chunk = text[start:end]
-                chunks.append(chunk)
-                
-                # 如果有重叠，下次从重叠位置开始
-                if end < len(text):
-                    start = end - overlap
-                else:
-                    break
+                short_tail = chunk
+        if short_tail:  # 最后一个块即使短也保留
+            yield short_tail
+    
+    def _text_chunker(self) -> TextChunker:
+        """
+        按配置创建分块器：TEXT_CHUNK_UNIT 为 token 时用本地模型的分词器计算长度
+        （与模型的最大输入长度对应），模型不可用时按字符计算
+        """
+        length_function = None
+        if Config.TEXT_CHUNK_UNIT == "token":
+            if LOCAL_EMBEDDING_AVAILABLE:
+                self._ensure_model_loaded()
+            tokenizer = getattr(self.local_embedder, "tokenizer", None)
+            if tokenizer is not None:
+                length_function = lambda text: len(tokenizer.tokenize(text))
+            else:
+                logger.warning("TEXT_CHUNK_UNIT=token 需要本地embedding模型的分词器，改为按字符分块")
+        return TextChunker(Config.TEXT_CHUNK_SIZE, Config.TEXT_CHUNK_OVERLAP, length_function)
+    
+    def _ensure_model_loaded(self, timeout: float = None) -> bool:
+        """
+        确保模型已加载（延迟加载，避免阻塞服务启动）
         
-        # 过滤空块和过短的块（除非是最后一个）
-        filtered_chunks = []
-        for i, chunk in enumerate(chunks):
-            chunk = chunk.strip()
-            if chunk and len(chunk) > 10:  # 至少10个字符
-                filtered_chunks.append(chunk)
-            elif chunk and i == len(chunks) - 1:  # 最后一个块即使短也保留
-                filtered_chunks.append(chunk)
+        只有第一个调用方加载模型，同时到达的调用方等待同一次加载的结果，而不是直接返回失败；
+        加载失败后，之后的调用会重新尝试。
         
-        return filtered_chunks if filtered_chunks else chunks
-    
-    def _ensure_model_loaded(self):
-        """确保模型已加载（延迟加载，避免阻塞服务启动）"""
+        Args:
+            timeout: 等待其他调用方加载完成的最长时间（秒），None表示一直等待
+            
+        Returns:
+            模型是否可用
+        """
         if self.local_embedder is not None:
             return True
         
-        if self._model_loading:
-            # 如果正在加载，等待一下
-            import time
-            time.sleep(0.1)
-            return self.local_embedder is not None
-        
         if not LOCAL_EMBEDDING_AVAILABLE:
             return False
         
-        self._model_loading = True
+        with self._model_lock:
+            if self.local_embedder is not None:
+                return True
+            future = self._model_future
+            owner = future is None
+            if owner:
+                future = self._model_future = Future()
+        
+        if not owner:
+            try:
+                return future.result(timeout)
+            except FutureTimeoutError:
+                logger.warning("等待embedding模型加载超时")
+                return False
+        
+        loaded = False
+        try:
+            loaded = self._load_model()
+        finally:
+            if not loaded:
+                # 加载失败时允许之后的调用重新尝试
+                with self._model_lock:
+                    self._model_future = None
+            future.set_result(loaded)
+        return loaded
+    
+    def _load_model(self) -> bool:
+        """加载本地embedding模型（由 _ensure_model_loaded 中第一个调用方执行）"""
         try:
             logger.info("开始加载本地embedding模型（首次使用时加载）...")
             
@@ -234,7 +497,17 @@ class VectorService:
             model_name = Config.EMBEDDING_MODEL
             logger.info(f"加载embedding模型: {model_name}")
             logger.info(f"当前HF_ENDPOINT环境变量: {os.environ.get('HF_ENDPOINT', '未设置')}")
+            if ONNX_BACKEND:
+                self.local_embedder = onnx_embedder.load_embedder(model_name)
+                if self.local_embedder is not None:
+                    self.model_error = None
+                    return True
+                if not SENTENCE_TRANSFORMERS_AVAILABLE:
+                    self.model_error = "ONNX向量模型加载失败"
+                    return False
+                logger.warning("改用sentence-transformers（PyTorch）推理")
             self.local_embedder = SentenceTransformer(model_name)
+            self.model_error = None
             logger.info(f"本地embedding模型加载成功: {model_name}")
             return True
         except Exception as e:
@@ -245,9 +518,65 @@ class VectorService:
             logger.warning("3. 手动下载模型到本地缓存目录")
             logger.warning("4. 使用DeepSeek Embeddings API（如果支持）")
             self.local_embedder = None
+            self.model_error = str(e)
+            return False
+    
+    def warm_up(self) -> bool:
+        """
+        预热：加载本地模型并做一次推理（服务启动后在后台调用，第一个请求不用等待模型加载）
+        
+        Returns:
+            本地模型是否可用
+        """
+        if not self._ensure_model_loaded():
+            return False
+        try:
+            start = time.perf_counter()
+            self.local_embedder.encode(["预热 warm up"], batch_size=1, convert_to_numpy=True, show_progress_bar=False)
+            logger.info(f"embedding模型预热完成，首次推理耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+            return True
+        except Exception as e:
+            logger.warning(f"embedding模型预热失败: {str(e)}")
             return False
-        finally:
-            self._model_loading = False
+    
+    def embedder_status(self) -> Dict[str, Any]:
+        """
+        向量生成的就绪状态
+        
+        - loaded: 本地模型已加载
+        - loading: 正在加载（请求会等待这次加载完成），未就绪
+        - not_loaded: 未加载；关闭预热（EMBEDDING_WARMUP=false）时按设计由第一个请求加载，视为就绪
+        - failed: 本地模型加载失败；配置了Embeddings API客户端时改用API生成向量，视为就绪
+        - api / unavailable: 没有本地模型，是否配置了API客户端
+        
+        Returns:
+            {"ready": 是否可以生成向量, "status": 上述状态, "fallback": 是否使用API兜底, "backend": 本地推理后端, "error": 失败原因}
+        """
+        fallback = False
+        if self.local_embedder is not None:
+            status = "loaded"
+            ready = True
+        elif LOCAL_EMBEDDING_AVAILABLE:
+            future = self._model_future
+            if future is not None and not future.done():
+                status = "loading"
+                ready = False
+            elif self.model_error:
+                status = "failed"
+                fallback = ready = self.embeddings_client is not None
+            else:
+                status = "not_loaded"
+                ready = not Config.EMBEDDING_WARMUP
+        else:
+            status = "api" if self.embeddings_client else "unavailable"
+            ready = self.embeddings_client is not None
+        return {
+            "ready": ready,
+            "status": status,
+            "fallback": fallback,
+            "backend": Config.EMBEDDING_BACKEND if LOCAL_EMBEDDING_AVAILABLE else None,
+            "error": self.model_error,
+        }
     
     def _generate_embedding(self, text: str) -> Optional[List[float]]:
         """
@@ -266,6 +595,51 @@ class VectorService:
         """
         if not text:
             return None
+        return self.embed_batch([text])[0]
+    
+    def embed_batch(self, texts: List[str], batch_size: int = None) -> List[Optional[List[float]]]:
+        """
+        批量生成文本向量
+        
+        本地模型每 batch_size 条文本做一次前向计算，API每 batch_size 条文本发送一次请求，
+        比逐条调用少了大量重复的调度和网络开销。已缓存的文本直接返回缓存的向量（只缓存本地模型生成的向量）；
+        启用微批处理时，并发调用方的文本会与其他请求合并成一批计算。
+        
+        Args:
+            texts: 要生成向量的文本列表
+            batch_size: 每批文本数，默认使用 Config.EMBEDDING_BATCH_SIZE
+            
+        Returns:
+            与 texts 一一对应的向量列表，空文本或生成失败的位置为None
+        """
+        batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        
+        # 先查向量缓存，只为未命中的文本生成向量
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        if self.embedding_cache:
+            try:
+                results = self.embedding_cache.get_many(texts)
+            except Exception as e:
+                logger.warning(f"读取向量缓存失败: {str(e)}")
+        missing = [i for i, text in enumerate(texts) if text and results[i] is None]
+        if not missing:
+            return results
+        
+        missing_texts = [texts[i] for i in missing]
+        if self.embedding_dispatcher:
+            embeddings = self.embedding_dispatcher.embed(missing_texts, batch_size)
+        else:
+            embeddings = self._embed_texts(missing_texts, batch_size)
+        for i, embedding in zip(missing, embeddings):
+            results[i] = embedding
+        return results
+    
+    def _embed_texts(self, texts: List[str], batch_size: int) -> List[Optional[List[float]]]:
+        """直接批量生成向量（由 embed_batch 或微批分发线程调用）"""
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        indexed = [(i, text) for i, text in enumerate(texts) if text]
+        if not indexed:
+            return results
         
         # 延迟加载模型（首次使用时才加载，避免阻塞服务启动）
         if LOCAL_EMBEDDING_AVAILABLE:
@@ -274,35 +648,184 @@ class VectorService:
         # 方法1：使用本地embedding模型（推荐，免费且稳定）
         if self.local_embedder:
             try:
-                embedding = self.local_embedder.encode(text, convert_to_numpy=True)
-                # sentence-transformers通常返回384维，需要调整维度或使用适配层
-                embedding_list = embedding.tolist()
-                logger.debug(f"使用本地embedding模型生成向量成功，维度: {len(embedding_list)}")
-                # 注意：如果维度不匹配，需要调整Qdrant集合的配置
-                return embedding_list
+                embeddings = self.local_embedder.encode(
+                    [text for _, text in indexed],
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+                for (i, _), embedding in zip(indexed, embeddings):
+                    results[i] = embedding.tolist()
+                logger.debug(f"使用本地embedding模型生成向量成功，数量: {len(indexed)}，维度: {len(results[indexed[0][0]])}")
+                # 只缓存本地模型生成的向量（API兜底生成的向量来自其他模型，不能按本地模型的键缓存）
+                if self.embedding_cache:
+                    try:
+                        self.embedding_cache.put_many(texts, results)
+                    except Exception as e:
+                        logger.warning(f"写入向量缓存失败: {str(e)}")
+                return results
             except Exception as e:
                 logger.warning(f"本地embedding生成失败: {str(e)}")
         
-        # 方法2：尝试使用DeepSeek的embeddings接口
+        # 方法2：尝试使用DeepSeek的embeddings接口（每批一次请求）
         if self.embeddings_client:
+            for start in range(0, len(indexed), batch_size):
+                batch = indexed[start:start + batch_size]
+                try:
+                    response = self.embeddings_client.embeddings.create(
+                        model="text-embedding-3-small",  # 尝试标准模型名
+                        input=[text for _, text in batch]
+                    )
+                    if response and response.data:
+                        for item in response.data:
+                            results[batch[item.index][0]] = item.embedding
+                        logger.debug(f"使用DeepSeek embeddings接口生成向量成功，数量: {len(batch)}")
+                except Exception as e1:
+                    logger.debug(f"DeepSeek embeddings接口不可用: {str(e1)}")
+                    break
+        
+        # 如果都失败，记录警告
+        if all(result is None for result in results):
+            logger.warning("无法生成向量，建议安装sentence-transformers或配置其他embedding服务")
+        return results
+    
+    @staticmethod
+    def _filename_point(pdf_file_id: int, user_id: int, filename: str, vector: List[float]) -> PointStruct:
+        """构造文件名向量点"""
+        return PointStruct(
+            id=point_id(pdf_file_id, "filename"),
+            vector=vector,
+            payload={
+                "pdf_file_id": pdf_file_id,
+                "user_id": user_id,
+                "type": "filename",
+                "text": filename,
+                "original_filename": filename
+            }
+        )
+    
+    @staticmethod
+    def _content_point(pdf_file_id: int, user_id: int, filename: str, chunk_index: int, chunk: Chunk, vector: List[float]) -> PointStruct:
+        """构造文本块向量点（payload中带块在全文中的字符偏移和页码）"""
+        return PointStruct(
+            id=point_id(pdf_file_id, "content", chunk_index),
+            vector=vector,
+            payload={
+                "pdf_file_id": pdf_file_id,
+                "user_id": user_id,
+                "type": "content",
+                "chunk_index": chunk_index,
+                "text": chunk.text,
+                "start_offset": chunk.start,
+                "end_offset": chunk.end,
+                "page": chunk.page,
+                "original_filename": filename
+            }
+        )
+    
+    def _add_filename_vector(self, pdf_file_id: int, user_id: int, filename: str):
+        """为文件名生成向量并写入Qdrant（失败只记录警告）"""
+        logger.debug(f"开始为文件名生成向量: {filename}")
+        filename_embedding = self._generate_embedding(filename)
+        if filename_embedding:
             try:
-                response = self.embeddings_client.embeddings.create(
-                    model="text-embedding-3-small",  # 尝试标准模型名
-                    input=text
+                point = self._filename_point(pdf_file_id, user_id, filename, filename_embedding)
+                self.vector_store.upsert(
+                    collection_name=Config.QDRANT_COLLECTION_NAME,
+                    points=[point]
                 )
-                
-                if response and response.data:
-                    embedding = response.data[0].embedding
-                    logger.debug(f"使用DeepSeek embeddings接口生成向量成功，维度: {len(embedding)}")
-                    return embedding
-            except Exception as e1:
-                logger.debug(f"DeepSeek embeddings接口不可用: {str(e1)}")
+                self._invalidate_user(user_id)
+                self._index_points([point])
+                logger.info(f"文件名向量已添加: {filename}")
+            except Exception as upsert_error:
+                logger.warning(f"添加文件名向量失败: {str(upsert_error)}")
+    
+    def copy_document(
+        self,
+        source_pdf_file_id: int,
+        pdf_file_id: int,
+        user_id: int,
+        filename: str,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> bool:
+        """
+        复用同内容文档已生成的分块向量（内容相同的PDF无需重新分块和向量化）
         
-        # 如果都失败，记录警告
-        logger.warning("无法生成向量，建议安装sentence-transformers或配置其他embedding服务")
-        return None
+        读取源文档的内容向量，替换payload中的文件ID、用户ID和文件名后写入；
+        文件名向量按新文件名重新生成。
+        
+        Args:
+            source_pdf_file_id: 已有向量的源PDF文件ID
+            pdf_file_id: 目标PDF文件ID
+            user_id: 目标用户ID
+            filename: 目标文件名
+            progress_callback: 进度回调，参数为(阶段, 已完成数, 总数)
+            
+        Returns:
+            是否成功（源文档没有内容向量时返回False，调用方应改为重新生成）
+        """
+        if not self.vector_store:
+            return False
+        
+        try:
+            points = []
+            offset = None
+            while True:
+                records, offset = self.vector_store.scroll(
+                    collection_name=Config.QDRANT_COLLECTION_NAME,
+                    scroll_filter=Filter(
+                        must=[
+                            FieldCondition(key="pdf_file_id", match=MatchValue(value=source_pdf_file_id)),
+                            FieldCondition(key="type", match=MatchValue(value="content"))
+                        ]
+                    ),
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+                for record in records:
+                    payload = dict(record.payload)
+                    payload.update({
+                        "pdf_file_id": pdf_file_id,
+                        "user_id": user_id,
+                        "original_filename": filename
+                    })
+                    points.append(PointStruct(
+                        id=point_id(pdf_file_id, "content", payload.get("chunk_index", 0)),
+                        vector=record.vector,
+                        payload=payload
+                    ))
+                if offset is None:
+                    break
+            
+            if not points:
+                logger.info(f"源文档没有可复用的向量: PDF ID={source_pdf_file_id}")
+                return False
+            
+            self._add_filename_vector(pdf_file_id, user_id, filename)
+            
+            batch_size = 50
+            for i in range(0, len(points), batch_size):
+                if not self._upsert_points(points[i:i + batch_size]):
+                    return False
+                if progress_callback:
+                    progress_callback("upsert", min(i + batch_size, len(points)), len(points))
+            
+            logger.info(f"复用文档向量成功: {source_pdf_file_id} -> {pdf_file_id}, 块数={len(points)}")
+            return True
+        except Exception as e:
+            logger.error(f"复用文档向量失败: {str(e)}")
+            return False
     
-    def add_document(self, pdf_file_id: int, user_id: int, filename: str, text_content: str) -> bool:
+    def add_document(
+        self,
+        pdf_file_id: int,
+        user_id: int,
+        filename: str,
+        text_content: str,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> bool:
         """
         添加文档向量到Qdrant
         
@@ -311,13 +834,47 @@ class VectorService:
             user_id: 用户ID
             filename: 文件名
             text_content: 文本内容
+            progress_callback: 进度回调，参数为(阶段, 已完成数, 总数)，阶段为 chunk/embed/upsert
             
         Returns:
             是否成功
         """
-        if not self.qdrant_client or not text_content:
+        if not self.vector_store or not text_content:
             logger.warning("Qdrant客户端未初始化或文本内容为空")
             return False
+        logger.debug(f"开始分块处理文本内容，原始长度: {len(text_content)} 字符")
+        return self.add_document_pages(pdf_file_id, user_id, filename, [text_content], progress_callback, paged=False)
+    
+    def add_document_pages(
+        self,
+        pdf_file_id: int,
+        user_id: int,
+        filename: str,
+        pages: Iterable[str],
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        paged: bool = True
+    ) -> bool:
+        """
+        流式添加文档向量：逐页分块、向量化，每凑满一批就写入Qdrant
+        
+        pages 可以是边解析边产出的生成器，解析后面的页面时前面的块已经在写入；
+        内存中只保留当前一批向量，不会同时持有全文的所有块和向量。
+        调用方需要自行消费完 pages 中剩余的页面（本方法失败时可能提前返回）。
+        
+        Args:
+            pdf_file_id: PDF文件ID
+            user_id: 用户ID
+            filename: 文件名
+            pages: 各页文本
+            progress_callback: 进度回调，参数为(阶段, 已完成数, 目前已知的总数)，阶段为 chunk/embed/upsert
+            paged: pages 是否为PDF的各页（决定payload中是否记录页码）
+            
+        Returns:
+            是否成功
+        """
+        if not self.vector_store:
+            logger.warning("Qdrant客户端未初始化")
+            return False
         
         try:
             # 检查模型是否可用
@@ -329,188 +886,447 @@ class VectorService:
                 logger.error("请检查：1. 模型是否成功加载 2. DeepSeek API是否配置正确")
                 return False
             
-            # 1. 处理文件名（也生成向量，用于搜索文件名）
-            logger.debug(f"开始为文件名生成向量: {filename}")
-            filename_embedding = self._generate_embedding(filename)
-            if filename_embedding:
-                try:
-                    filename_point_id = str(uuid.uuid4())
-                    self.qdrant_client.upsert(
-                        collection_name=Config.QDRANT_COLLECTION_NAME,
-                        points=[
-                            PointStruct(
-                                id=filename_point_id,
-                                vector=filename_embedding,
-                                payload={
-                                    "pdf_file_id": pdf_file_id,
-                                    "user_id": user_id,
-                                    "type": "filename",
-                                    "text": filename,
-                                    "original_filename": filename
-                                }
-                            )
-                        ]
-                    )
-                    logger.info(f"文件名向量已添加: {filename}")
-                except Exception as upsert_error:
-                    logger.warning(f"添加文件名向量失败: {str(upsert_error)}")
-            
-            # 2. 处理文本内容（分块处理）
-            logger.debug(f"开始分块处理文本内容，原始长度: {len(text_content)} 字符")
-            text_chunks = self._split_text(text_content)
-            logger.debug(f"文本分块完成，共 {len(text_chunks)} 个块")
+            # 文件名也生成向量（用于搜索文件名），与第一批文本块一起批量生成
+            # 待生成向量的条目：(块序号, 文本, 文本块)，块序号为None表示文件名
+            pending = [(None, filename, None)]
+            embed_batch_size = Config.EMBEDDING_BATCH_SIZE
+            batch_size = 50  # 每批写入50个点，避免一次性插入太多数据导致超时
             points = []
+            chunk_count = 0
+            upserted = 0
             
-            for idx, chunk in enumerate(text_chunks):
-                chunk_embedding = self._generate_embedding(chunk)
-                if chunk_embedding:
-                    point_id = str(uuid.uuid4())
-                    points.append(
-                        PointStruct(
-                            id=point_id,
-                            vector=chunk_embedding,
-                            payload={
-                                "pdf_file_id": pdf_file_id,
-                                "user_id": user_id,
-                                "type": "content",
-                                "chunk_index": idx,
-                                "text": chunk,
-                                "original_filename": filename
-                            }
-                        )
-                    )
+            for idx, chunk in enumerate(self.iter_chunk_spans(pages, paged)):
+                chunk_count = idx + 1
+                if progress_callback:
+                    progress_callback("chunk", chunk_count, chunk_count)
+                pending.append((idx, chunk.text, chunk))
+                if len(pending) < embed_batch_size:
+                    continue
+                
+                points.extend(self._embed_points(pending, pdf_file_id, user_id, filename))
+                pending = []
+                if progress_callback:
+                    progress_callback("embed", chunk_count, chunk_count)
+                if len(points) >= batch_size:
+                    if not self._upsert_points(points):
+                        return False
+                    upserted += sum(1 for point in points if point.payload["type"] == "content")
+                    points = []
+                    if progress_callback:
+                        progress_callback("upsert", upserted, chunk_count)
             
+            if pending:
+                points.extend(self._embed_points(pending, pdf_file_id, user_id, filename))
+                if progress_callback:
+                    progress_callback("embed", chunk_count, chunk_count)
             if points:
-                try:
-                    # 分批插入，避免一次性插入太多数据导致超时
-                    batch_size = 50  # 每批50个点
-                    for i in range(0, len(points), batch_size):
-                        batch = points[i:i + batch_size]
-                        self.qdrant_client.upsert(
-                            collection_name=Config.QDRANT_COLLECTION_NAME,
-                            points=batch
-                        )
-                        logger.debug(f"已插入向量批次 {i//batch_size + 1}/{(len(points) + batch_size - 1)//batch_size}")
-                    
-                    logger.info(f"文档向量已添加: PDF ID={pdf_file_id}, 块数={len(points)}")
-                    return True
-                except Exception as upsert_error:
-                    logger.error(f"插入文档向量失败: {str(upsert_error)}")
-                    logger.error("可能原因：Qdrant服务响应慢或网络问题")
+                if not self._upsert_points(points):
                     return False
-            else:
-                logger.warning(f"未能生成任何向量: PDF ID={pdf_file_id}")
-                return False
+                upserted += sum(1 for point in points if point.payload["type"] == "content")
+                if progress_callback:
+                    progress_callback("upsert", upserted, chunk_count)
+            
+            logger.debug(f"文本分块完成，共 {chunk_count} 个块")
+            if upserted:
+                # 点ID是确定性的，重新生成时已原地覆盖，只需删除多出来的旧块
+                self._delete_stale_chunks(pdf_file_id, chunk_count)
+                logger.info(f"文档向量已添加: PDF ID={pdf_file_id}, 块数={upserted}")
+                return True
+            logger.warning(f"未能生成任何向量: PDF ID={pdf_file_id}")
+            return False
                 
         except Exception as e:
             logger.error(f"添加文档向量失败: {str(e)}")
             return False
     
-    def search(self, query: str, user_id: int, limit: int = 10, score_threshold: float = 0.5) -> List[Dict[str, Any]]:
+    def _embed_points(self, items: List[tuple], pdf_file_id: int, user_id: int, filename: str) -> List[PointStruct]:
         """
-        语义搜索
+        批量生成一批条目的向量并构造向量点（生成失败的条目跳过；写入成功后由 _upsert_points 写入关键词索引）
+        
+        Args:
+            items: (块序号, 文本, 文本块) 列表，块序号为None表示文件名
+            
+        Returns:
+            向量点列表
+        """
+        embeddings = self.embed_batch([text for _, text, _ in items])
+        points = []
+        for (chunk_index, text, chunk), embedding in zip(items, embeddings):
+            if not embedding:
+                continue
+            if chunk_index is None:
+                points.append(self._filename_point(pdf_file_id, user_id, filename, embedding))
+            else:
+                points.append(self._content_point(pdf_file_id, user_id, filename, chunk_index, chunk, embedding))
+        return points
+    
+    def _upsert_points(self, points: List[PointStruct]) -> bool:
+        """写入一批向量点（并使相关用户的搜索缓存失效），写入成功后再写入关键词索引"""
+        try:
+            self.vector_store.upsert(
+                collection_name=Config.QDRANT_COLLECTION_NAME,
+                points=points
+            )
+            for user_id in {point.payload["user_id"] for point in points}:
+                self._invalidate_user(user_id)
+        except Exception as upsert_error:
+            logger.error(f"插入文档向量失败: {str(upsert_error)}")
+            logger.error("可能原因：Qdrant服务响应慢或网络问题")
+            return False
+        self._index_points(points)
+        return True
+    
+    def get_collection_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取集合统计（缓存 COLLECTION_STATS_TTL 秒，写入或删除向量后失效）
+        
+        Returns:
+            {"points_count": 向量点数}，获取失败返回None
+        """
+        stats = self.collection_stats_cache.get(Config.QDRANT_COLLECTION_NAME)
+        if stats is not None:
+            return stats
+        try:
+            return self._remember_stats(self.vector_store.get_collection(Config.QDRANT_COLLECTION_NAME))
+        except Exception as info_error:
+            logger.warning(f"无法获取集合信息: {str(info_error)}")
+            return None
+    
+    async def get_collection_stats_async(self, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        获取集合统计的异步版本（使用同一个缓存）
+        
+        Args:
+            use_cache: 为False时直接请求向量存储（就绪检查），结果仍写入缓存
+        """
+        if use_cache:
+            stats = self.collection_stats_cache.get(Config.QDRANT_COLLECTION_NAME)
+            if stats is not None:
+                return stats
+        try:
+            if self.async_qdrant_client:
+                collection_info = await self.async_qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
+            else:
+                collection_info = await self._run_blocking(self.vector_store.get_collection, Config.QDRANT_COLLECTION_NAME)
+            return self._remember_stats(collection_info)
+        except Exception as info_error:
+            logger.warning(f"无法获取集合信息: {str(info_error)}")
+            return None
+    
+    def _remember_stats(self, collection_info) -> Dict[str, Any]:
+        """从集合信息中取出统计并写入缓存"""
+        stats = {"points_count": collection_info.points_count}
+        logger.info(f"Qdrant集合 '{Config.QDRANT_COLLECTION_NAME}' 中共有 {stats['points_count']} 个向量点")
+        self.collection_stats_cache.put(Config.QDRANT_COLLECTION_NAME, stats)
+        return stats
+    
+    def _invalidate_user(self, user_id: int):
+        """用户的文档向量变化后，清除该用户的搜索结果缓存和集合统计"""
+        if self.search_cache:
+            self.search_cache.discard_where(lambda key: key[0] == user_id)
+        self.collection_stats_cache.clear()
+    
+    def search(
+        self,
+        query: str,
+        user_id: int,
+        limit: int = 10,
+        score_threshold: float = 0.5,
+        group_size: int = 1,
+        mode: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索用户的文档（按文件分组：每个文件只返回一条结果）
         
         Args:
             query: 搜索查询文本
             user_id: 用户ID（只搜索该用户的文档）
-            limit: 返回结果数量
-            score_threshold: 相似度阈值（0-1）
+            limit: 返回的文件数量
+            score_threshold: 向量相似度阈值（0-1，关键词结果不受阈值限制）
+            group_size: 每个文件返回的匹配片段数，大于1时结果中带 snippets 列表
+            mode: hybrid（向量和关键词结果按倒数排名融合）/ vector / keyword（不需要embedding模型），
+                默认使用 Config.SEARCH_MODE
             
         Returns:
-            搜索结果列表
+            搜索结果列表，每个文件一条，按相关度降序；match_source 为命中的搜索方式
+        """
+        if not query:
+            return []
+        mode = self._search_mode(mode)
+        
+        # 相同用户的相同查询直接返回缓存的结果（用户的文档变化时失效）
+        normalized_query = " ".join(query.split())
+        cache_key = (user_id, normalized_query, limit, score_threshold, group_size, mode)
+        cached = self._cached_search(cache_key, query)
+        if cached is not None:
+            return cached
+        
+        vector_results = None
+        if mode != "keyword":
+            vector_results = self._vector_search(query, normalized_query, user_id, limit, score_threshold, group_size)
+        keyword_results = self._keyword_search(query, user_id, limit, group_size) if mode != "vector" else None
+        return self._merge_results(cache_key, query, mode, vector_results, keyword_results, limit)
+    
+    async def search_async(
+        self,
+        query: str,
+        user_id: int,
+        limit: int = 10,
+        score_threshold: float = 0.5,
+        group_size: int = 1,
+        mode: str = None
+    ) -> List[Dict[str, Any]]:
         """
-        if not self.qdrant_client or not query:
+        搜索的异步版本（供 async 接口使用，不阻塞事件循环）
+        
+        查询向量在专用的推理线程池中生成（包括首次搜索时的模型加载），Qdrant请求使用异步客户端；
+        关键词搜索在默认线程池中与向量搜索同时执行（索引写入时持有同一把锁，命中结果还要查SQLite）。
+        参数和返回值与 search 相同。
+        """
+        if not query:
             return []
+        mode = self._search_mode(mode)
+        
+        normalized_query = " ".join(query.split())
+        cache_key = (user_id, normalized_query, limit, score_threshold, group_size, mode)
+        cached = self._cached_search(cache_key, query)
+        if cached is not None:
+            return cached
         
+        keyword_task = None
+        if mode != "vector":
+            keyword_task = asyncio.ensure_future(self._run_blocking(self._keyword_search, query, user_id, limit, group_size))
+        
+        vector_results = None
+        if mode != "keyword":
+            if self.async_qdrant_client:
+                vector_results = await self._vector_search_async(query, normalized_query, user_id, limit, score_threshold, group_size)
+            else:
+                vector_results = await self._run_blocking(
+                    self._vector_search, query, normalized_query, user_id, limit, score_threshold, group_size
+                )
+        keyword_results = await keyword_task if keyword_task else None
+        return self._merge_results(cache_key, query, mode, vector_results, keyword_results, limit)
+    
+    def _search_mode(self, mode: Optional[str]) -> str:
+        """确定搜索方式（未启用关键词索引时只能使用向量搜索）"""
+        mode = (mode or Config.SEARCH_MODE).lower()
+        if mode not in ("hybrid", "vector", "keyword"):
+            logger.warning(f"未知的搜索方式: {mode}，使用hybrid")
+            mode = "hybrid"
+        if self.keyword_index is None:
+            return "vector"
+        return mode
+    
+    def _vector_search(
+        self, query: str, normalized_query: str, user_id: int, limit: int, score_threshold: float, group_size: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """向量搜索（分组），失败返回None（结果不写入缓存）"""
+        if not self.vector_store:
+            return None
         try:
-            # 生成查询向量
-            logger.info(f"开始生成查询向量: '{query}'")
-            query_embedding = self._generate_embedding(query)
+            query_embedding = self._query_embedding(query, normalized_query)
             if not query_embedding:
-                logger.warning("无法生成查询向量，可能原因：模型未加载或网络问题")
-                return []
-            
-            logger.info(f"查询向量生成成功，维度: {len(query_embedding)}")
+                return None
             
-            # 先检查集合中是否有数据
-            try:
-                collection_info = self.qdrant_client.get_collection(Config.QDRANT_COLLECTION_NAME)
-                points_count = collection_info.points_count
-                logger.info(f"Qdrant集合 '{Config.QDRANT_COLLECTION_NAME}' 中共有 {points_count} 个向量点")
-                
-                if points_count == 0:
-                    logger.warning("Qdrant集合为空，没有可搜索的数据。请先上传PDF文件并生成向量。")
-                    return []
-            except Exception as info_error:
-                logger.warning(f"无法获取集合信息: {str(info_error)}")
+            # 先检查集合中是否有数据（使用缓存的集合统计，不必每次请求都查询Qdrant）
+            stats = self.get_collection_stats()
+            if stats and stats["points_count"] == 0:
+                logger.warning("Qdrant集合为空，没有可搜索的数据。请先上传PDF文件并生成向量。")
+                return []
             
-            # 搜索（只搜索该用户的文档）
             try:
-                logger.info(f"开始搜索，用户ID: {user_id}, 阈值: {score_threshold}, 限制: {limit}")
-                search_results = self.qdrant_client.search(
-                    collection_name=Config.QDRANT_COLLECTION_NAME,
-                    query_vector=query_embedding,
-                    query_filter=Filter(
-                        must=[
-                            FieldCondition(
-                                key="user_id",
-                                match=MatchValue(value=user_id)
-                            )
-                        ]
-                    ),
-                    limit=limit * 2,  # 获取更多结果，然后过滤
-                    score_threshold=0.0,  # 先不设阈值，获取所有结果
-                    timeout=Config.QDRANT_TIMEOUT
-                )
-                logger.info(f"Qdrant返回 {len(search_results)} 个原始结果")
-                
-                # 手动过滤相似度阈值
-                filtered_results = [r for r in search_results if r.score >= score_threshold]
-                logger.info(f"经过阈值 {score_threshold} 过滤后，剩余 {len(filtered_results)} 个结果")
-                
-                if len(filtered_results) == 0 and len(search_results) > 0:
-                    logger.warning(f"所有结果都被阈值 {score_threshold} 过滤掉了。最高相似度: {max(r.score for r in search_results):.4f}")
-                    logger.warning("建议：降低相似度阈值或检查查询词是否与文档内容相关")
-                
-                search_results = filtered_results[:limit]  # 限制返回数量
-                
+                logger.info(f"开始搜索，用户ID: {user_id}, 阈值: {score_threshold}, 限制: {limit}, 每个文件片段数: {group_size}")
+                groups = self.vector_store.search_groups(
+                    **self._search_groups_args(query_embedding, user_id, limit, score_threshold, group_size)
+                ).groups
             except Exception as search_error:
                 logger.error(f"Qdrant搜索操作失败: {str(search_error)}")
                 logger.error("可能原因：Qdrant服务响应慢、网络问题或集合不存在")
-                return []
+                return None
             
-            # 格式化结果
-            results = []
-            seen_files = set()  # 避免重复文件
+            return self._format_groups(groups, score_threshold, group_size)
             
-            for result in search_results:
-                payload = result.payload
-                pdf_file_id = payload.get("pdf_file_id")
-                
-                # 如果已经包含该文件，跳过（只返回每个文件的最佳匹配）
-                if pdf_file_id in seen_files:
-                    continue
-                
-                seen_files.add(pdf_file_id)
-                results.append({
-                    "pdf_file_id": pdf_file_id,
-                    "filename": payload.get("original_filename", ""),
-                    "text": payload.get("text", ""),
-                    "type": payload.get("type", "content"),  # filename 或 content
-                    "score": result.score,  # 相似度分数
-                    "chunk_index": payload.get("chunk_index")
-                })
+        except Exception as e:
+            logger.error(f"搜索失败: {str(e)}")
+            return None
+    
+    async def _vector_search_async(
+        self, query: str, normalized_query: str, user_id: int, limit: int, score_threshold: float, group_size: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """向量搜索的异步版本（使用异步Qdrant客户端），失败返回None"""
+        try:
+            query_embedding = await self._run_inference(self._query_embedding, query, normalized_query)
+            if not query_embedding:
+                return None
             
-            logger.info(f"搜索完成: 查询='{query}', 结果数={len(results)}")
-            return results
+            stats = await self.get_collection_stats_async()
+            if stats and stats["points_count"] == 0:
+                logger.warning("Qdrant集合为空，没有可搜索的数据。请先上传PDF文件并生成向量。")
+                return []
+            
+            try:
+                logger.info(f"开始搜索，用户ID: {user_id}, 阈值: {score_threshold}, 限制: {limit}, 每个文件片段数: {group_size}")
+                groups = (await self.async_qdrant_client.search_groups(
+                    **self._search_groups_args(query_embedding, user_id, limit, score_threshold, group_size)
+                )).groups
+            except Exception as search_error:
+                logger.error(f"Qdrant搜索操作失败: {str(search_error)}")
+                logger.error("可能原因：Qdrant服务响应慢、网络问题或集合不存在")
+                return None
+            
+            return self._format_groups(groups, score_threshold, group_size)
             
         except Exception as e:
             logger.error(f"搜索失败: {str(e)}")
+            return None
+    
+    def _keyword_search(self, query: str, user_id: int, limit: int, group_size: int) -> Optional[List[Dict[str, Any]]]:
+        """关键词（BM25）搜索，失败返回None"""
+        try:
+            return self.keyword_index.search(query, user_id, limit, group_size)
+        except Exception as e:
+            logger.error(f"关键词搜索失败: {str(e)}")
+            return None
+    
+    def _merge_results(
+        self,
+        cache_key: tuple,
+        query: str,
+        mode: str,
+        vector_results: Optional[List[Dict[str, Any]]],
+        keyword_results: Optional[List[Dict[str, Any]]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        合并向量和关键词结果并写入缓存
+        
+        hybrid 模式按倒数排名融合（两路都命中的文件排在前面），某一路失败时只使用另一路，
+        失败的结果不写入缓存。
+        """
+        sources = [(name, results) for name, results in (("vector", vector_results), ("keyword", keyword_results)) if results is not None]
+        if not sources:
             return []
+        if len(sources) == 1:
+            results = [dict(result, match_source=sources[0][0]) for result in sources[0][1]]
+        else:
+            results = reciprocal_rank_fusion(sources, limit, Config.SEARCH_RRF_K)
+        
+        logger.info(f"搜索完成: 查询='{query}', 方式={mode}, 结果数={len(results)}")
+        if self.search_cache and (mode != "hybrid" or len(sources) == 2):
+            self.search_cache.put(cache_key, [dict(result) for result in results])
+        return results
+    
+    def _cached_search(self, cache_key: tuple, query: str) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存的搜索结果（返回副本），未命中返回None"""
+        if not self.search_cache:
+            return None
+        cached = self.search_cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.info(f"搜索命中缓存: 查询='{query}', 结果数={len(cached)}")
+        return [dict(result) for result in cached]
+    
+    def _query_embedding(self, query: str, normalized_query: str) -> Optional[List[float]]:
+        """生成查询向量（热门查询的向量在所有用户之间共享），失败返回None"""
+        query_embedding = self.query_embedding_cache.get(normalized_query)
+        if query_embedding is not None:
+            return query_embedding
+        logger.info(f"开始生成查询向量: '{query}'")
+        query_embedding = self._generate_embedding(query)
+        if not query_embedding:
+            logger.warning("无法生成查询向量，可能原因：模型未加载或网络问题")
+            return None
+        self.query_embedding_cache.put(normalized_query, query_embedding)
+        logger.info(f"查询向量生成成功，维度: {len(query_embedding)}")
+        return query_embedding
+    
+    @staticmethod
+    def _search_groups_args(query_embedding: List[float], user_id: int, limit: int, score_threshold: float, group_size: int) -> Dict[str, Any]:
+        """
+        分组搜索的参数（只搜索该用户的文档）：由Qdrant按 pdf_file_id 分组并在服务端应用阈值，
+        一个长文档占满前几名时也能返回 limit 个不同的文件
+        """
+        return {
+            "collection_name": Config.QDRANT_COLLECTION_NAME,
+            "query_vector": query_embedding,
+            "group_by": "pdf_file_id",
+            "query_filter": Filter(
+                must=[
+                    FieldCondition(
+                        key="user_id",
+                        match=MatchValue(value=user_id)
+                    )
+                ]
+            ),
+            "limit": limit,
+            "group_size": group_size,
+            "score_threshold": score_threshold,
+            "with_payload": ["pdf_file_id", "original_filename", "text", "type", "chunk_index", "page", "start_offset", "end_offset"],
+            "search_params": search_params(),
+            "timeout": Config.QDRANT_TIMEOUT
+        }
+    
+    def _format_groups(self, groups: list, score_threshold: float, group_size: int) -> List[Dict[str, Any]]:
+        """格式化分组结果（每组的第一条是该文件的最佳匹配）"""
+        logger.info(f"Qdrant返回 {len(groups)} 个文件")
+        if not groups:
+            logger.warning(f"没有相似度达到阈值 {score_threshold} 的结果")
+            logger.warning("建议：降低相似度阈值或检查查询词是否与文档内容相关")
+        
+        results = []
+        for group in groups:
+            hits = [self._format_hit(hit) for hit in group.hits]
+            result = dict(hits[0])
+            if group_size > 1:
+                result["snippets"] = hits
+            results.append(result)
+        return results
+    
+    @staticmethod
+    def _format_hit(hit) -> Dict[str, Any]:
+        """把Qdrant的搜索结果点转换为返回给调用方的字典"""
+        payload = hit.payload
+        return {
+            "pdf_file_id": payload.get("pdf_file_id"),
+            "filename": payload.get("original_filename", ""),
+            "text": payload.get("text", ""),
+            "type": payload.get("type", "content"),  # filename 或 content
+            "score": hit.score,  # 相似度分数
+            "chunk_index": payload.get("chunk_index"),
+            "page": payload.get("page"),  # 页码（整篇文本入库或旧数据为None）
+            "offsets": [payload["start_offset"], payload["end_offset"]] if "start_offset" in payload else None  # 在全文中的字符偏移
+        }
+    
+    async def _run_inference(self, func: Callable, *args):
+        """在推理线程池中执行向量生成等CPU密集的调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.inference_executor, functools.partial(func, *args))
+    
+    async def _run_blocking(self, func: Callable, *args):
+        """在默认线程池中执行其他阻塞调用（同步Qdrant请求、整篇文档入库）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+    
+    async def add_document_async(
+        self,
+        pdf_file_id: int,
+        user_id: int,
+        filename: str,
+        text_content: str,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> bool:
+        """
+        添加文档向量的异步版本
+        
+        分块、批量生成向量和分批写入都在线程中完成（向量生成本身经由微批分发线程），
+        事件循环只等待结果；参数和返回值与 add_document 相同。
+        """
+        return await self._run_blocking(self.add_document, pdf_file_id, user_id, filename, text_content, progress_callback)
     
     def delete_document(self, pdf_file_id: int, user_id: int) -> bool:
         """
-        删除文档的所有向量
+        删除文档的所有向量（按过滤条件在服务端一次删除，不受文档块数限制）
         
         Args:
             pdf_file_id: PDF文件ID
@@ -519,47 +1335,89 @@ class VectorService:
         Returns:
             是否成功
         """
-        if not self.qdrant_client:
+        if not self.vector_store:
             return False
+        self._remove_keywords(pdf_file_id)
         
         try:
-            # 先搜索所有相关的点
-            # 注意：Qdrant的删除需要先找到所有点ID，这里使用scroll API
-            from qdrant_client.models import ScrollRequest, Filter, FieldCondition, MatchValue
-            
-            scroll_result = self.qdrant_client.scroll(
+            self.vector_store.delete(
                 collection_name=Config.QDRANT_COLLECTION_NAME,
-                scroll_filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="pdf_file_id",
-                            match=MatchValue(value=pdf_file_id)
-                        ),
-                        FieldCondition(
-                            key="user_id",
-                            match=MatchValue(value=user_id)
-                        )
-                    ]
-                ),
-                limit=1000  # 假设每个文档最多1000个点
+                points_selector=self._document_selector(pdf_file_id, user_id),
+                wait=True
             )
-            
-            # 提取所有点ID
-            point_ids = [point.id for point in scroll_result[0]]
-            
-            if point_ids:
-                # 删除所有点
-                self.qdrant_client.delete(
-                    collection_name=Config.QDRANT_COLLECTION_NAME,
-                    points_selector=point_ids
-                )
-                logger.info(f"删除文档向量成功: PDF ID={pdf_file_id}, 点数={len(point_ids)}")
-                return True
-            else:
-                logger.info(f"未找到要删除的向量: PDF ID={pdf_file_id}")
-                return True
+            self._invalidate_user(user_id)
+            logger.info(f"删除文档向量成功: PDF ID={pdf_file_id}")
+            return True
+                
+        except Exception as e:
+            logger.error(f"删除文档向量失败: {str(e)}")
+            return False
+    
+    async def delete_document_async(self, pdf_file_id: int, user_id: int) -> bool:
+        """删除文档向量的异步版本，参数和返回值与 delete_document 相同"""
+        if not self.vector_store:
+            return False
+        if not self.async_qdrant_client:
+            return await self._run_blocking(self.delete_document, pdf_file_id, user_id)
+        self._remove_keywords(pdf_file_id)
+        
+        try:
+            await self.async_qdrant_client.delete(
+                collection_name=Config.QDRANT_COLLECTION_NAME,
+                points_selector=self._document_selector(pdf_file_id, user_id),
+                wait=True
+            )
+            self._invalidate_user(user_id)
+            logger.info(f"删除文档向量成功: PDF ID={pdf_file_id}")
+            return True
                 
         except Exception as e:
             logger.error(f"删除文档向量失败: {str(e)}")
             return False
+    
+    def _remove_keywords(self, pdf_file_id: int, from_chunk: Optional[int] = None):
+        """从关键词索引中删除文档的条目（from_chunk 不为None时只删除块序号不小于它的文本块），失败只记录警告"""
+        if self.keyword_index is None:
+            return
+        try:
+            self.keyword_index.remove_document(pdf_file_id, from_chunk)
+        except Exception as e:
+            logger.warning(f"删除关键词索引失败: {str(e)}")
+    
+    @staticmethod
+    def _document_selector(pdf_file_id: int, user_id: int) -> FilterSelector:
+        """选中某个文档全部向量点的过滤条件"""
+        return FilterSelector(
+            filter=Filter(
+                must=[
+                    FieldCondition(
+                        key="pdf_file_id",
+                        match=MatchValue(value=pdf_file_id)
+                    ),
+                    FieldCondition(
+                        key="user_id",
+                        match=MatchValue(value=user_id)
+                    )
+                ]
+            )
+        )
+    
+    def _delete_stale_chunks(self, pdf_file_id: int, chunk_count: int):
+        """删除重新生成向量后多出来的旧文本块（新文本的块数比上次少时）"""
+        self._remove_keywords(pdf_file_id, from_chunk=chunk_count)
+        try:
+            self.vector_store.delete(
+                collection_name=Config.QDRANT_COLLECTION_NAME,
+                points_selector=FilterSelector(
+                    filter=Filter(
+                        must=[
+                            FieldCondition(key="pdf_file_id", match=MatchValue(value=pdf_file_id)),
+                            FieldCondition(key="type", match=MatchValue(value="content")),
+                            FieldCondition(key="chunk_index", range=Range(gte=chunk_count))
+                        ]
+                    )
+                )
+            )
+        except Exception as e:
+            logger.warning(f"清理旧文本块向量失败: {str(e)}")
 
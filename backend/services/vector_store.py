@@ -0,0 +1,595 @@
+from config import Config
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    CollectionStatus, Distance, FieldCondition, Filter, FilterSelector, GroupsResult, MatchValue, PointGroup,
+    PointIdsList, PointStruct, Range, Record, ScoredPoint
+)
+from services import qdrant_pool
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import atexit
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入HNSW索引库（可选，未安装时嵌入式存储始终使用暴力计算）
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+# 嵌入式存储按列保存、可用于过滤和分组的payload字段（其余字段只保存在payload JSON中）
+INT_COLUMNS = ("user_id", "pdf_file_id", "chunk_index")
+STR_COLUMNS = ("type",)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    获取向量存储（进程内共享）
+
+    VECTOR_STORE 为 qdrant 时使用Qdrant客户端；embedded 时使用进程内的嵌入式存储；
+    auto 时先连接Qdrant，连接不上再退回嵌入式存储。两者提供相同的接口（QdrantClient 的常用方法）。
+
+    Returns:
+        QdrantClient 或 EmbeddedVectorStore，都不可用时返回None
+    """
+    global _store
+    with _store_lock:
+        if _store is not None:
+            return _store
+
+        backend = Config.VECTOR_STORE
+        if backend in ("qdrant", "auto"):
+            try:
+                client = qdrant_pool.get_client()
+                try:
+                    client.get_collections()
+                    logger.info(f"Qdrant客户端连接成功: {Config.QDRANT_HOST}:{Config.QDRANT_PORT}")
+                    _store = client
+                    return _store
+                except Exception as test_error:
+                    if backend == "qdrant":
+                        logger.warning(f"Qdrant连接测试失败: {str(test_error)}，但客户端已创建")
+                        logger.warning("提示：请检查Qdrant服务是否运行，或网络连接是否正常")
+                        _store = client
+                        return _store
+                    logger.warning(f"Qdrant连接失败: {str(test_error)}，改用嵌入式向量存储")
+            except Exception as e:
+                logger.error(f"Qdrant客户端连接失败: {str(e)}")
+                if backend == "qdrant":
+                    logger.error("提示：请检查Qdrant服务是否运行在正确的地址和端口")
+                    return None
+
+        try:
+            _store = EmbeddedVectorStore(Config.EMBEDDED_STORE_PATH)
+            logger.info(f"使用嵌入式向量存储: {Config.EMBEDDED_STORE_PATH}")
+        except Exception as e:
+            logger.error(f"嵌入式向量存储初始化失败: {str(e)}")
+        return _store
+
+
+def is_qdrant(store) -> bool:
+    """是否为Qdrant客户端（异步客户端、量化等只对Qdrant有意义）"""
+    return isinstance(store, QdrantClient)
+
+
+class EmbeddedCollection:
+    """
+    嵌入式存储中的一个集合
+
+    向量归一化后保存在内存映射文件 vectors.f32 中（按行号存放，删除的行会被复用），
+    点ID和payload保存在SQLite中，过滤字段在内存中按列保存为NumPy数组。
+    点数少于 EMBEDDED_HNSW_THRESHOLD 时按过滤条件暴力计算余弦相似度；
+    超过后（并且安装了hnswlib）建立HNSW图索引，索引文件 hnsw.bin 与数据一起持久化。
+    """
+
+    def __init__(self, path: str, size: int = None):
+        """
+        Args:
+            path: 集合目录
+            size: 向量维度（新建集合时必需，已有集合从 meta.json 读取）
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.size = json.load(f)["size"]
+        else:
+            if not size:
+                raise ValueError(f"集合不存在: {path}")
+            self.size = size
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"size": size}, f)
+
+        self._conn = sqlite3.connect(os.path.join(path, "points.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, point_id TEXT UNIQUE NOT NULL, payload TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._generation = self._state("generation")
+
+        rows = self._conn.execute("SELECT row, point_id, payload FROM points ORDER BY row").fetchall()
+        self._capacity = 0
+        self._vectors = None
+        self._ids: Dict[int, Any] = {}
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._int_columns = {name: np.zeros(0, dtype=np.int64) for name in INT_COLUMNS}
+        self._str_columns = {name: np.zeros(0, dtype=object) for name in STR_COLUMNS}
+        self._grow(max((rows[-1][0] + 1) if rows else 0, 1024))
+        for row, point_key, payload in rows:
+            self._set_row(row, json.loads(point_key), json.loads(payload))
+        next_row = (rows[-1][0] + 1) if rows else 0
+        self._free = [row for row in range(next_row) if not self._alive[row]]
+        self._next_row = next_row
+
+        self._index = None
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+        self._load_index()
+
+    # ---------- 存储 ----------
+
+    def _state(self, key: str) -> int:
+        row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _grow(self, min_rows: int):
+        """扩大向量文件和列数组的容量"""
+        capacity = max(self._capacity * 2, min_rows, 1024)
+        vectors_path = os.path.join(self.path, "vectors.f32")
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        with open(vectors_path, "ab") as f:
+            f.truncate(max(os.path.getsize(vectors_path), capacity * self.size * 4))
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.size))
+
+        extra = capacity - self._capacity
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for name in INT_COLUMNS:
+            self._int_columns[name] = np.concatenate([self._int_columns[name], np.full(extra, -1, dtype=np.int64)])
+        for name in STR_COLUMNS:
+            self._str_columns[name] = np.concatenate([self._str_columns[name], np.full(extra, None, dtype=object)])
+        self._capacity = capacity
+        if getattr(self, "_index", None) is not None:
+            self._index.resize_index(capacity)
+
+    def _set_row(self, row: int, point_key: Any, payload: Dict[str, Any]):
+        """更新行号对应的ID和过滤列"""
+        self._ids[row] = point_key
+        self._rows[json.dumps(point_key)] = row
+        self._alive[row] = True
+        for name in INT_COLUMNS:
+            value = payload.get(name)
+            self._int_columns[name][row] = value if isinstance(value, int) else -1
+        for name in STR_COLUMNS:
+            self._str_columns[name][row] = payload.get(name)
+
+    def _bump_generation(self):
+        self._generation += 1
+        self._conn.execute("INSERT OR REPLACE INTO state VALUES ('generation', ?)", (self._generation,))
+
+    def count(self) -> int:
+        return int(self._alive.sum())
+
+    # ---------- HNSW索引 ----------
+
+    def _load_index(self):
+        """读取持久化的HNSW索引，与数据不一致（进程异常退出）时重新建立"""
+        if not HNSWLIB_AVAILABLE:
+            return
+        index_path = os.path.join(self.path, "hnsw.bin")
+        if os.path.exists(index_path) and self._state("index_generation") == self._generation:
+            try:
+                index = hnswlib.Index(space="cosine", dim=self.size)
+                index.load_index(index_path, max_elements=self._capacity)
+                self._index = index
+                return
+            except Exception as e:
+                logger.warning(f"读取HNSW索引失败: {str(e)}，将重新建立")
+        self._maybe_build_index()
+
+    def _maybe_build_index(self):
+        """点数达到阈值后建立HNSW索引"""
+        if not HNSWLIB_AVAILABLE or self._index is not None or self.count() < Config.EMBEDDED_HNSW_THRESHOLD:
+            return
+        start = time.perf_counter()
+        rows = np.nonzero(self._alive)[0]
+        index = hnswlib.Index(space="cosine", dim=self.size)
+        index.init_index(max_elements=self._capacity, ef_construction=200, M=16)
+        for offset in range(0, len(rows), 10000):
+            batch = rows[offset:offset + 10000]
+            index.add_items(np.asarray(self._vectors[batch]), batch)
+        self._index = index
+        self._index_dirty = True
+        self._save_index(force=True)
+        logger.info(f"建立HNSW索引: {len(rows)} 个向量, 耗时 {time.perf_counter() - start:.1f}秒")
+
+    def _save_index(self, force: bool = False):
+        """持久化HNSW索引（写入频繁时最多每 EMBEDDED_INDEX_SAVE_SECONDS 秒保存一次）"""
+        if self._index is None or not self._index_dirty:
+            return
+        if not force and time.monotonic() - self._index_saved_at < Config.EMBEDDED_INDEX_SAVE_SECONDS:
+            return
+        index_path = os.path.join(self.path, "hnsw.bin")
+        self._index.save_index(index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        self._conn.execute("INSERT OR REPLACE INTO state VALUES ('index_generation', ?)", (self._generation,))
+        self._conn.commit()
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+
+    # ---------- 读写 ----------
+
+    def upsert(self, points: List[PointStruct]):
+        with self._lock:
+            rows = []
+            records = []
+            for point in points:
+                key = json.dumps(point.id)
+                row = self._rows.get(key)
+                if row is None:
+                    if self._free:
+                        row = self._free.pop()
+                    else:
+                        row = self._next_row
+                        self._next_row += 1
+                        if row >= self._capacity:
+                            self._grow(row + 1)
+                vector = np.asarray(point.vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                self._vectors[row] = vector / norm if norm else vector
+                payload = point.payload or {}
+                self._set_row(row, point.id, payload)
+                rows.append(row)
+                records.append((row, key, json.dumps(payload, ensure_ascii=False)))
+            self._vectors.flush()
+            self._conn.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?)", records)
+            self._bump_generation()
+            self._conn.commit()
+
+            if self._index is not None:
+                self._index.add_items(np.asarray(self._vectors[rows]), rows)
+                self._index_dirty = True
+                self._save_index()
+            else:
+                self._maybe_build_index()
+
+    def delete(self, mask: np.ndarray):
+        with self._lock:
+            rows = np.nonzero(mask & self._alive[:len(mask)])[0].tolist()
+            if not rows:
+                return
+            for row in rows:
+                self._alive[row] = False
+                del self._rows[json.dumps(self._ids.pop(row))]
+                if self._index is not None:
+                    self._index.mark_deleted(row)
+            self._free.extend(rows)
+            self._conn.executemany("DELETE FROM points WHERE row = ?", [(row,) for row in rows])
+            self._bump_generation()
+            self._conn.commit()
+            if self._index is not None:
+                self._index_dirty = True
+                self._save_index()
+
+    def mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        """把过滤条件转换为行掩码（只支持按列保存的字段上的 must / must_not 条件）"""
+        with self._lock:
+            return self._mask(query_filter)
+
+    def _mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        mask = self._alive.copy()
+        if query_filter is None:
+            return mask
+        for condition in query_filter.must or []:
+            mask &= self._condition_mask(condition)
+        for condition in query_filter.must_not or []:
+            mask &= ~self._condition_mask(condition)
+        if query_filter.should:
+            raise ValueError("嵌入式向量存储不支持 should 过滤条件")
+        return mask
+
+    def _condition_mask(self, condition) -> np.ndarray:
+        if not isinstance(condition, FieldCondition):
+            raise ValueError(f"嵌入式向量存储不支持的过滤条件: {type(condition).__name__}")
+        if condition.key in self._int_columns:
+            column = self._int_columns[condition.key]
+        elif condition.key in self._str_columns:
+            column = self._str_columns[condition.key]
+        else:
+            raise ValueError(f"嵌入式向量存储不支持按字段 {condition.key} 过滤")
+        if isinstance(condition.match, MatchValue):
+            return column == condition.match.value
+        if isinstance(condition.range, Range):
+            result = np.ones(len(column), dtype=bool)
+            bounds = condition.range
+            if bounds.gte is not None:
+                result &= column >= bounds.gte
+            if bounds.gt is not None:
+                result &= column > bounds.gt
+            if bounds.lte is not None:
+                result &= column <= bounds.lte
+            if bounds.lt is not None:
+                result &= column < bounds.lt
+            return result
+        raise ValueError(f"嵌入式向量存储不支持字段 {condition.key} 上的该类过滤条件")
+
+    def ranked(self, vector, mask: np.ndarray, wanted: int) -> Iterator[Tuple[int, float]]:
+        """
+        按相似度降序产出满足掩码的 (行号, 分数)
+
+        满足条件的点较少（如按用户过滤后）或没有HNSW索引时，直接对这些点暴力计算；
+        否则先从HNSW索引取 wanted 个近邻，调用方还要更多结果时加倍重新查询。
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        total = int(mask.sum())
+        if total == 0:
+            return
+        if self._index is None or total < Config.EMBEDDED_HNSW_THRESHOLD:
+            yield from self._brute_force(query, mask)
+            return
+
+        returned = set()  # 已产出的行号：加大 k 重新查询时，近似索引返回的顺序可能变化，按行号去重而不是按位置跳过
+        k = max(wanted, 16)
+        while True:
+            k = min(k, total)
+            try:
+                with self._lock:
+                    self._index.set_ef(max(k * 2, Config.EMBEDDED_HNSW_EF))
+                    labels, distances = self._index.knn_query(
+                        query, k=k, filter=lambda label: label < len(mask) and bool(mask[label])
+                    )
+            except RuntimeError:
+                # 过滤条件太严格，HNSW图中找不到 k 个满足条件的点，改为暴力计算
+                for row, score in self._brute_force(query, mask):
+                    if row not in returned:
+                        yield row, score
+                return
+            for label, distance in zip(labels[0].tolist(), distances[0].tolist()):
+                if label not in returned:
+                    returned.add(label)
+                    yield int(label), 1.0 - float(distance)
+            if k >= total:
+                return
+            k *= 2
+
+    def _brute_force(self, query: np.ndarray, mask: np.ndarray) -> List[Tuple[int, float]]:
+        """对满足掩码的所有行计算余弦相似度（向量已归一化，即点积），按分数降序返回"""
+        with self._lock:
+            rows = np.nonzero(mask[:self._capacity])[0]
+            scores = np.asarray(self._vectors[rows]) @ query
+        order = np.argsort(-scores, kind="stable")
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def record(self, row: int, with_payload, with_vectors: bool = False) -> Tuple[Any, Optional[Dict[str, Any]], Optional[List[float]]]:
+        """读取一行的 (ID, payload, 向量)"""
+        with self._lock:
+            payload = None
+            if with_payload:
+                payload = json.loads(self._conn.execute("SELECT payload FROM points WHERE row = ?", (row,)).fetchone()[0])
+                if isinstance(with_payload, (list, tuple)):
+                    payload = {key: payload[key] for key in with_payload if key in payload}
+            vector = self._vectors[row].tolist() if with_vectors else None
+            return self._ids[row], payload, vector
+
+    def close(self):
+        with self._lock:
+            self._save_index(force=True)
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.close()
+
+
+class EmbeddedVectorStore:
+    """
+    进程内的嵌入式向量存储（Qdrant的替代实现）
+
+    提供 VectorService 和命令行工具使用的 QdrantClient 方法子集，参数和返回值与QdrantClient一致，
+    单机部署和测试不需要外部服务，查询也没有网络往返。
+    数据保存在 root 目录下，每个集合一个子目录；同一目录只能由一个进程打开。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._collections: Dict[str, EmbeddedCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        atexit.register(self.close)
+
+    def _collection(self, collection_name: str) -> EmbeddedCollection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                path = os.path.join(self.root, collection_name)
+                if not os.path.exists(os.path.join(path, "meta.json")):
+                    raise ValueError(f"Collection {collection_name} not found")
+                collection = EmbeddedCollection(path)
+                self._collections[collection_name] = collection
+            return collection
+
+    # ---------- 集合管理 ----------
+
+    def get_collections(self):
+        names = [name for name in sorted(os.listdir(self.root)) if os.path.exists(os.path.join(self.root, name, "meta.json"))]
+        return SimpleNamespace(collections=[SimpleNamespace(name=name) for name in names])
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        if vectors_config.distance != Distance.COSINE:
+            raise ValueError("嵌入式向量存储只支持余弦相似度")
+        with self._lock:
+            self._collections[collection_name] = EmbeddedCollection(os.path.join(self.root, collection_name), vectors_config.size)
+        return True
+
+    def recreate_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        self.delete_collection(collection_name)
+        return self.create_collection(collection_name, vectors_config, **kwargs)
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection:
+                collection.close()
+            path = os.path.join(self.root, collection_name)
+            if not os.path.exists(path):
+                return False
+            shutil.rmtree(path)
+            return True
+
+    def get_collection(self, collection_name: str):
+        collection = self._collection(collection_name)
+        count = collection.count()
+        return SimpleNamespace(
+            status=CollectionStatus.GREEN,
+            points_count=count,
+            vectors_count=count,
+            payload_schema={name: "column" for name in INT_COLUMNS + STR_COLUMNS},
+            config=SimpleNamespace(
+                params=SimpleNamespace(vectors=SimpleNamespace(size=collection.size, distance=Distance.COSINE, on_disk=True)),
+                quantization_config=None
+            )
+        )
+
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs) -> bool:
+        """过滤字段已按列保存，无需额外索引"""
+        return True
+
+    def update_collection(self, collection_name: str, **kwargs) -> bool:
+        """嵌入式存储没有量化和存储位置配置"""
+        return True
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, **kwargs):
+        collection = self._collection(collection_name)
+        return SimpleNamespace(count=int(collection.mask(count_filter).sum()))
+
+    # ---------- 点操作 ----------
+
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs):
+        self._collection(collection_name).upsert(points)
+
+    def delete(self, collection_name: str, points_selector, **kwargs):
+        collection = self._collection(collection_name)
+        if isinstance(points_selector, FilterSelector):
+            mask = collection.mask(points_selector.filter)
+        elif isinstance(points_selector, Filter):
+            mask = collection.mask(points_selector)
+        else:
+            ids = points_selector.points if isinstance(points_selector, PointIdsList) else points_selector
+            mask = np.zeros_like(collection._alive)
+            for point_key in ids:
+                row = collection._rows.get(json.dumps(point_key))
+                if row is not None:
+                    mask[row] = True
+        collection.delete(mask)
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload=True,
+        with_vectors: bool = False,
+        **kwargs
+    ) -> Tuple[List[Record], Optional[int]]:
+        """按行号顺序分页读取，offset 为上一页返回的下一行号"""
+        collection = self._collection(collection_name)
+        rows = np.nonzero(collection.mask(scroll_filter))[0]
+        rows = rows[rows >= (offset or 0)]
+        records = []
+        for row in rows[:limit].tolist():
+            point_key, payload, vector = collection.record(row, with_payload, with_vectors)
+            records.append(Record(id=point_key, payload=payload, vector=vector))
+        next_offset = int(rows[limit]) if len(rows) > limit else None
+        return records, next_offset
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector,
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        with_payload=True,
+        **kwargs
+    ) -> List[ScoredPoint]:
+        collection = self._collection(collection_name)
+        hits = []
+        for row, score in collection.ranked(query_vector, collection.mask(query_filter), limit):
+            if len(hits) >= limit or (score_threshold is not None and score < score_threshold):
+                break
+            hits.append(self._scored_point(collection, row, score, with_payload))
+        return hits
+
+    def search_groups(
+        self,
+        collection_name: str,
+        query_vector,
+        group_by: str,
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        group_size: int = 1,
+        score_threshold: Optional[float] = None,
+        with_payload=True,
+        **kwargs
+    ) -> GroupsResult:
+        """按 group_by 字段分组搜索：返回最多 limit 组，每组最多 group_size 个结果，组按最佳结果降序"""
+        collection = self._collection(collection_name)
+        if group_by in collection._int_columns:
+            column = collection._int_columns[group_by]
+        elif group_by in collection._str_columns:
+            column = collection._str_columns[group_by]
+        else:
+            raise ValueError(f"嵌入式向量存储不支持按字段 {group_by} 分组")
+
+        groups: Dict[Any, List[ScoredPoint]] = {}
+        full = 0
+        for row, score in collection.ranked(query_vector, collection.mask(query_filter), limit * group_size * 4):
+            if score_threshold is not None and score < score_threshold:
+                break
+            key = column[row].item() if hasattr(column[row], "item") else column[row]
+            hits = groups.get(key)
+            if hits is None:
+                if len(groups) >= limit:
+                    continue
+                hits = groups[key] = []
+            if len(hits) < group_size:
+                hits.append(self._scored_point(collection, row, score, with_payload))
+                if len(hits) == group_size:
+                    full += 1
+                    if full == limit:
+                        break
+        return GroupsResult(groups=[PointGroup(id=key, hits=hits) for key, hits in groups.items()])
+
+    @staticmethod
+    def _scored_point(collection: EmbeddedCollection, row: int, score: float, with_payload) -> ScoredPoint:
+        point_key, payload, _ = collection.record(row, with_payload)
+        return ScoredPoint(id=point_key, version=0, score=score, payload=payload, vector=None)
+
+    def close(self):
+        """保存HNSW索引并关闭所有集合"""
+        with self._lock:
+            for collection in self._collections.values():
+                try:
+                    collection.close()
+                except Exception as e:
+                    logger.debug(f"关闭嵌入式集合失败: {str(e)}")
+            self._collections.clear()
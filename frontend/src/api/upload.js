@@ -12,6 +12,11 @@ export const uploadPDF = (file) => {
   })
 }
 
+// 查询入库任务状态
+export const getJobStatus = (jobId) => {
+  return api.get(`/jobs/${jobId}`)
+}
+
 // 获取文件列表
 export const getFiles = (skip = 0, limit = 10) => {
   return api.get('/files', {